@@ -0,0 +1,84 @@
+"""
+Memory taken by resources loaded from the expanded list json, regular classes vs the compact ones.
+
+    python benchmarks/memory_footprint.py [count]
+"""
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fmc_rest_client.resources import *
+
+
+def host_json(i):
+    return {
+        'id': '005056A1-0B2C-0ed3-0000-%012d' % i,
+        'type': 'Host',
+        'name': 'host-%d' % i,
+        'value': '10.%d.%d.%d' % (i >> 16 & 255, i >> 8 & 255, i & 255),
+        'description': ' ',
+        'overridable': False,
+        'links': {'self': 'https://fmc/api/fmc_config/v1/domain/d/object/hosts/%d' % i},
+        'metadata': {
+            'timestamp': 1500000000000 + i,
+            'lastUser': {'name': 'admin'},
+            'domain': {'name': 'Global', 'id': 'e276abec-e0f2-11e3-8169-6d9ed49b625f', 'type': 'Domain'},
+            'readOnly': {'state': False}
+        }
+    }
+
+
+def rule_json(i):
+    refs = lambda kind, n: {'objects': [{'type': kind, 'id': '%s-%d-%d' % (kind, i, j), 'name': '%s-%d' % (kind, j)}
+                                        for j in range(n)]}
+    return {
+        'id': '005056A1-0B2C-0ed3-0000-%012d' % i,
+        'type': 'AccessRule',
+        'name': 'rule-%d' % i,
+        'action': 'ALLOW',
+        'enabled': True,
+        'sendEventsToFMC': False,
+        'logBegin': False,
+        'logEnd': True,
+        'sourceZones': refs('SecurityZone', 1),
+        'destinationZones': refs('SecurityZone', 1),
+        'sourceNetworks': refs('Network', 3),
+        'destinationNetworks': refs('Host', 2),
+        'destinationPorts': refs('ProtocolPortObject', 2),
+        'links': {'self': 'https://fmc/api/fmc_config/v1/domain/d/policy/accesspolicies/p/accessrules/%d' % i},
+        'metadata': {
+            'ruleIndex': i + 1,
+            'section': 'Default',
+            'category': '--Undefined--',
+            'accessPolicy': {'type': 'AccessPolicy', 'id': 'p', 'name': 'policy'},
+            'timestamp': 1500000000000 + i,
+            'domain': {'name': 'Global', 'id': 'e276abec-e0f2-11e3-8169-6d9ed49b625f', 'type': 'Domain'},
+            'readOnly': {'state': False}
+        }
+    }
+
+
+def measure(resource_class, json_list):
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    resources = []
+    for json in json_list:
+        resource = resource_class()
+        resource.json_load(json)
+        resources.append(resource)
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return used / len(resources)
+
+
+if __name__ == '__main__':
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    for title, json_func, regular, compact in [('Host', host_json, Host, CompactHost),
+                                               ('AccessRule', rule_json, AccessRule, CompactAccessRule)]:
+        json_list = [json_func(i) for i in range(count)]
+        regular_size = measure(regular, json_list)
+        compact_size = measure(compact, json_list)
+        print('{:<12} {:>8.0f} bytes/object {:>8.0f} bytes/object compact ({:.0%})'.format(
+            title, regular_size, compact_size, compact_size / regular_size))
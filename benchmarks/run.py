@@ -0,0 +1,261 @@
+"""
+Benchmarks of the client hot paths against the in-process FMC simulator.
+
+    python benchmarks/run.py [--count 5000] [--latency 0.0] [--repeat 5] [--only list_plain,bulk_create_1000]
+    python benchmarks/run.py --save benchmarks/baseline.json
+    python benchmarks/run.py --compare benchmarks/baseline.json
+
+Each benchmark is run repeat times after a warm up run, and reports
+ * throughput, items (objects listed, created, serialized or loaded, or REST calls) per second
+ * p50 and p99 of the run time
+ * CPU time per run
+ * peak memory allocated during a run, measured in an extra run with tracemalloc
+CPU time and memory include the simulator, which runs in the same process.
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import threading
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fmc_rest_client import FMCRestClient
+from fmc_rest_client.core.base_resources import ObjectJSONEncoder, json_dump
+from fmc_rest_client.resources import *
+from fmc_rest_client.simulator import FMCSimulator
+from memory_footprint import host_json, rule_json
+
+BENCHMARKS = []
+
+
+def benchmark(func):
+    BENCHMARKS.append(func)
+    return func
+
+
+class Environment:
+    """ Simulator and settings shared by the benchmarks """
+    def __init__(self, count, latency):
+        self.count = count
+        self.simulator = FMCSimulator(rate_limit=0, max_concurrent=0, latency=latency)
+        self.simulator.start()
+
+    def client(self, **kwargs):
+        return FMCRestClient(self.simulator.url, 'admin', 'admin', rate_limit=None, **kwargs)
+
+    def hosts(self):
+        return [Host('host-{}'.format(i), '10.{}.{}.{}'.format(i >> 16 & 255, i >> 8 & 255, i & 255))
+                for i in range(self.count)]
+
+    def seed_hosts(self):
+        path = Host().get_api_path()
+        if len(self.simulator.objects(path)) != self.count:
+            self.simulator.clear()
+            self.simulator.add_objects(path, [host_json(i) for i in range(self.count)])
+
+    def close(self):
+        self.simulator.stop()
+
+
+######## Benchmarks ###########
+# each returns the function to benchmark, which returns the number of items it processed
+
+@benchmark
+def list_plain(env):
+    env.seed_hosts()
+    client = env.client()
+    return lambda: len(client.list(Host()))
+
+
+@benchmark
+def list_concurrent(env):
+    env.seed_hosts()
+    client = env.client()
+    return lambda: len(client.list(Host(), concurrent=True))
+
+
+@benchmark
+def list_iterator(env):
+    env.seed_hosts()
+    client = env.client()
+    return lambda: sum(1 for _ in client.list_iterator(Host()))
+
+
+@benchmark
+def list_iterator_prefetch(env):
+    env.seed_hosts()
+    client = env.client()
+    return lambda: sum(1 for _ in client.list_iterator(Host(), prefetch=2))
+
+
+def _bulk_create(env, bulk_limit):
+    client = env.client()
+    hosts = env.hosts()
+
+    def run():
+        env.simulator.clear()
+        return len(client.create(hosts, bulk_limit=bulk_limit))
+    return run
+
+
+@benchmark
+def bulk_create_100(env):
+    return _bulk_create(env, 100)
+
+
+@benchmark
+def bulk_create_500(env):
+    return _bulk_create(env, 500)
+
+
+@benchmark
+def bulk_create_1000(env):
+    return _bulk_create(env, 1000)
+
+
+@benchmark
+def json_dump_bulk(env):
+    hosts = env.hosts()
+
+    def run():
+        json_dump(hosts, pretty=False, full_dump=False)
+        return len(hosts)
+    return run
+
+
+@benchmark
+def object_json_encoder(env):
+    hosts = env.hosts()
+
+    def run():
+        json.dumps(hosts, cls=ObjectJSONEncoder)
+        return len(hosts)
+    return run
+
+
+def _json_load(resource_class, items):
+    def run():
+        for item in items:
+            resource = resource_class()
+            resource.json_load(item)
+        return len(items)
+    return run
+
+
+@benchmark
+def json_load_hosts(env):
+    return _json_load(Host, [host_json(i) for i in range(env.count)])
+
+
+@benchmark
+def json_load_access_rules(env):
+    return _json_load(AccessRule, [rule_json(i) for i in range(env.count)])
+
+
+@benchmark
+def reauth_concurrent(env):
+    """ All tokens expire, then 8 threads make 10 calls each """
+    env.seed_hosts()
+    client = env.client()
+    threads_count = 8
+    calls = 10
+
+    def call():
+        for _ in range(calls):
+            client.list(Host(), limit=25)
+
+    def run():
+        env.simulator.expire_tokens()
+        threads = [threading.Thread(target=call) for _ in range(threads_count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return threads_count * calls
+    return run
+
+
+######## Runner ###########
+
+def _percentile(values, percent):
+    values = sorted(values)
+    index = min(len(values) - 1, int(round(percent / 100.0 * (len(values) - 1))))
+    return values[index]
+
+
+def measure(func, repeat):
+    func()  # warm up
+    times = []
+    cpu_times = []
+    items = 0
+    for _ in range(repeat):
+        cpu_start = time.process_time()
+        start = time.perf_counter()
+        items = func()
+        times.append(time.perf_counter() - start)
+        cpu_times.append(time.process_time() - cpu_start)
+    tracemalloc.start()
+    func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    total = sum(times)
+    return {'items': items, 'throughput': items * repeat / total if total else 0.0,
+            'p50': _percentile(times, 50), 'p99': _percentile(times, 99),
+            'cpu': sum(cpu_times) / repeat, 'peak_memory': peak}
+
+
+def _print_results(results, baseline=None):
+    print('{:<24} {:>8} {:>12} {:>10} {:>10} {:>10} {:>11}'.format(
+        'benchmark', 'items', 'items/s', 'p50 ms', 'p99 ms', 'cpu ms', 'peak KiB'))
+    for name, result in results.items():
+        line = '{:<24} {:>8} {:>12.0f} {:>10.1f} {:>10.1f} {:>10.1f} {:>11.0f}'.format(
+            name, result['items'], result['throughput'], result['p50'] * 1000, result['p99'] * 1000,
+            result['cpu'] * 1000, result['peak_memory'] / 1024)
+        if baseline and name in baseline['results']:
+            base = baseline['results'][name]
+            line += '  throughput {:+.0%} p50 {:+.0%} peak {:+.0%}'.format(
+                result['throughput'] / base['throughput'] - 1, result['p50'] / base['p50'] - 1,
+                result['peak_memory'] / base['peak_memory'] - 1)
+        print(line)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmarks of the FMC REST client')
+    parser.add_argument('--count', type=int, default=5000, help='objects per benchmark')
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds the simulator takes per call')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--only', help='comma separated benchmarks to run')
+    parser.add_argument('--save', metavar='FILE', help='save the results as a baseline')
+    parser.add_argument('--compare', metavar='FILE', help='compare the results with a saved baseline')
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.WARNING)
+
+    selected = BENCHMARKS
+    if args.only:
+        names = args.only.split(',')
+        selected = [func for func in BENCHMARKS if func.__name__ in names]
+    env = Environment(args.count, args.latency)
+    results = {}
+    try:
+        for func in selected:
+            results[func.__name__] = measure(func(env), args.repeat)
+    finally:
+        env.close()
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    _print_results(results, baseline)
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump({'python': sys.version.split()[0], 'count': args.count, 'latency': args.latency,
+                       'repeat': args.repeat, 'results': results}, f, indent=2, sort_keys=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,3 +1,15 @@
 from fmc_rest_client.core.base_clients import FMCBaseRestClient
 from fmc_rest_client.core.base_clients import FMCRestClient
 from fmc_rest_client.core.base_clients import ResourceException
+from fmc_rest_client.core.base_clients import BatchResult
+from fmc_rest_client.core.base_clients import BulkCreateResult
+from fmc_rest_client.core.base_clients import TransferStats
+from fmc_rest_client.core.async_clients import AsyncFMCRestClient
+from fmc_rest_client.core.rate_limiter import RateLimiter
+from fmc_rest_client.core.codec import set_codec
+from fmc_rest_client.core.metrics import CallEvent, CallMetrics, CallTracer
+from fmc_rest_client.core.cache import ResourceCache
+from fmc_rest_client.core.name_index import NameIndex
+from fmc_rest_client.core.sync import ResourceSync, SyncDelta
+from fmc_rest_client.core.snapshot import SnapshotStore
+from fmc_rest_client.core.inventory import JsonLinesWriter, RestoreResult, export_resources, read_json_lines, restore_resources
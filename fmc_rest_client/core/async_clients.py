@@ -0,0 +1,623 @@
+import asyncio
+import logging
+import time
+
+from fmc_rest_client.core.base_clients import BULK_FETCH_LIMIT, LIST_MAX_WORKERS, POOL_MAXSIZE
+from fmc_rest_client.core.base_clients import BATCH_MAX_WORKERS, BatchResult
+from fmc_rest_client.core.base_clients import BULK_MAX_WORKERS, split_bulk_payload
+from fmc_rest_client.core.base_clients import STREAM_CHUNK_SIZE, REAUTH_RETRIES, REQUEST_RETRIES, RETRY_REAUTH
+from fmc_rest_client.core.base_clients import ClientStateMixin
+from fmc_rest_client.core.base_clients import ResourceException
+from fmc_rest_client.core.base_clients import ListPageParser, parse_list_response, process_response
+from fmc_rest_client.core.base_clients import _json_chunks, ACCEPT_ENCODING, encode_body
+from fmc_rest_client.core.base_clients import LogTruncated, log_payload
+from fmc_rest_client.core.rate_limiter import FMC_RATE_LIMIT, FMC_RATE_BURST
+from fmc_rest_client.core.metrics import CallEvent, emit, endpoint_template
+from fmc_rest_client.core.name_index import NameIndex
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+logger = logging.getLogger('FMC_REST_CLIENT')
+
+
+class AsyncRESTListIterator:
+    """
+        Async iterator for REST List Resource, use it with 'async for'.
+        The first page is fetched on first iteration, total is known after that.
+    """
+    def __init__(self, resource, rest_client, lazy=False):
+        self.current_index = 0
+        self.offset = 0
+        self.resource = resource
+        self.rest_client = rest_client
+        self.lazy = lazy
+        self.list_cache = None
+        self.total = None
+        self.page_size = None
+        # same as in RESTListIterator
+        self._listed_at = None
+        self._size_changed = False
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if self.list_cache is None:
+            self._listed_at = time.time()
+            self.list_cache, paging = await self.rest_client._list(self.resource, lazy=self.lazy)
+            self.total = paging['count']
+            self.page_size = paging['limit']
+        if self.current_index < self.total:
+            cache_size = len(self.list_cache)
+            if self.current_index == self.offset + cache_size:
+                #fetch next page if we are done reading cached page
+                self.offset = self.current_index
+                logger.debug('Fetching page starting at offset %s', self.offset)
+                self.list_cache, paging = await self.rest_client._list(self.resource, self.offset, lazy=self.lazy)
+                if paging['count'] != self.total:
+                    logger.warning("Resource size changed on server")
+                    self._size_changed = True
+                self.total = paging['count']
+                if self.current_index >= self.total or len(self.list_cache) == 0:
+                    logger.warning("Resource size got reduced than current iteration")
+                    raise StopAsyncIteration()
+            resource = self.list_cache[self.current_index - self.offset]
+            self.current_index += 1
+            return resource
+        else:
+            if self._listed_at is not None and not self._size_changed:
+                self.rest_client._listed_all(self.resource.get_api_path(), self._listed_at)
+            self._listed_at = None
+            raise StopAsyncIteration()
+
+
+class AsyncRESTListStreamIterator:
+    """
+        Async counterpart of RESTListStreamIterator, resources are returned as they are parsed from the response.
+        Call aclose() if not iterating till the end.
+    """
+    def __init__(self, resource, rest_client, lazy=False):
+        self.resource = resource
+        self.rest_client = rest_client
+        self.lazy = lazy
+        self.total = None
+        self._resources = self._iterate()
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        return await self._resources.__anext__()
+
+    async def aclose(self):
+        """ Closes the response of the current page """
+        await self._resources.aclose()
+
+    async def _iterate(self):
+        offset = 0
+        url_path = self.resource.get_api_path()
+        listed_at = time.time()
+        complete = True
+        while self.total is None or offset < self.total:
+            logger.debug('Fetching page starting at offset %s', offset)
+            chunks = await self.rest_client.rest_call('list', url_path, offset=offset, expanded=True, stream=True)
+            parser = ListPageParser(self.resource, offset, BULK_FETCH_LIMIT, self.lazy,
+                                    self.rest_client._cache_listed(url_path))
+            try:
+                async for chunk in chunks:
+                    for resource in parser.feed(chunk):
+                        yield resource
+                for resource in parser.close():
+                    yield resource
+            finally:
+                await chunks.aclose()
+            paging = parser.paging()
+            if self.total is not None and paging['count'] != self.total:
+                logger.warning("Resource size changed on server")
+                complete = False
+            self.total = paging['count']
+            if parser.item_count == 0:
+                complete = self.total == 0
+                break
+            offset += parser.item_count
+        if complete:
+            self.rest_client._listed_all(url_path, listed_at)
+
+
+def _wire_size(response, size):
+    """ Bytes of the response body received over the wire, older aiohttp only tells the decompressed size """
+    return getattr(response.content, 'total_raw_bytes', size)
+
+
+async def _response_chunks(response, transfer_stats, event=None):
+    """ Same as base_clients._response_chunks, releases the response when done or closed """
+    size = 0
+    try:
+        async for chunk in response.content.iter_chunked(STREAM_CHUNK_SIZE):
+            size += len(chunk)
+            yield chunk
+    finally:
+        wire_size = _wire_size(response, size)
+        transfer_stats.add_received(size, wire_size)
+        if event is not None:
+            event.bytes_received = wire_size
+        response.release()
+
+
+async def _async_chunks(chunks):
+    for chunk in chunks:
+        yield chunk
+
+
+class AsyncFMCRestClient(ClientStateMixin):
+    """
+        asyncio client for FMC REST API, having the same methods as FMCRestClient but as coroutines.
+        Needs aiohttp, install it using 'pip install fmc_rest_client[async]'.
+
+        async with AsyncFMCRestClient(server, username, password) as fmc:
+            hosts = await fmc.list(Host())
+
+        Calls are rate limited same as FMCRestClient, the rate_limiter can be shared with sync clients.
+        Auth token is refreshed before expiry, concurrent 401s wait on a single refresh.
+        compress_requests, transfer_stats, metrics, hooks, cache, snapshot_store and name indexes are same as in
+        FMCRawRestClient, hooks are called in the event loop.
+    """
+    def __init__(self, server, username=None, password=None, auth_token=None, domain='default',
+                 keep_alive=True, pool_maxsize=POOL_MAXSIZE,
+                 rate_limit=FMC_RATE_LIMIT, rate_burst=FMC_RATE_BURST, rate_limiter=None, compress_requests=False,
+                 cache=None, snapshot_store=None):
+        if aiohttp is None:
+            raise ImportError('AsyncFMCRestClient needs aiohttp, install it using pip install fmc_rest_client[async]')
+        self.server = server
+        self.username = username
+        self.password = password
+        self.auth_token = auth_token
+        self._init_state(domain, rate_limit, rate_burst, rate_limiter, compress_requests, cache, snapshot_store)
+        self._auth_lock = None
+        self.keep_alive = keep_alive
+        self.pool_maxsize = pool_maxsize
+        self.session = None
+
+    async def connect(self):
+        """ Creates the HTTP session and generates the auth token if not provided """
+        if self.session is None:
+            connector = aiohttp.TCPConnector(limit_per_host=self.pool_maxsize, force_close=not self.keep_alive,
+                                             ssl=False)
+            self.session = aiohttp.ClientSession(connector=connector)
+            self._auth_lock = asyncio.Lock()
+        if not self.auth_token:
+            self.auth_token = await self.get_auth_token()
+        return self
+
+    async def close(self):
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    async def __aenter__(self):
+        return await self.connect()
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    async def get_auth_token(self):
+        api_auth_path = "/api/fmc_platform/v1/auth/generatetoken"
+        auth_url = self.server + api_auth_path
+        try:
+            headers = {'Content-Type': 'application/json'}
+            logger.debug('Connecting to %s', auth_url)
+            auth = aiohttp.BasicAuth(self.username, self.password)
+            if self.rate_limiter:
+                await self.rate_limiter.acquire_async()
+            async with self.session.post(auth_url, headers=headers, auth=auth) as response:
+                auth_token = response.headers.get('X-auth-access-token', None)
+                refresh_token = response.headers.get('X-auth-refresh-token', None)
+            if auth_token is None:
+                logger.error('auth_token not found.')
+                raise ResourceException(ResourceException.AUTH_FAILED)
+            else:
+                logger.debug('Got auth_token - %s', auth_token)
+            self._token_issued(refresh_token, refreshed=False)
+            return auth_token
+        except ResourceException as e:
+            raise e
+        except Exception as err:
+            raise Exception('Error in generating auth token --> ' + str(err))
+
+    async def refresh_auth_token(self):
+        """ Gets a new auth token using the refresh token, FMC allows it 3 times for a generated token """
+        api_refresh_path = "/api/fmc_platform/v1/auth/refreshtoken"
+        refresh_url = self.server + api_refresh_path
+        headers = {'Content-Type': 'application/json', 'X-auth-access-token': self.auth_token,
+                   'X-auth-refresh-token': self.refresh_token}
+        logger.debug('Refreshing auth token using %s', refresh_url)
+        if self.rate_limiter:
+            await self.rate_limiter.acquire_async()
+        async with self.session.post(refresh_url, headers=headers) as response:
+            auth_token = response.headers.get('X-auth-access-token', None)
+            refresh_token = response.headers.get('X-auth-refresh-token', self.refresh_token)
+            if auth_token is None:
+                logger.debug('Refresh of auth_token failed with status %s', response.status)
+                raise ResourceException(ResourceException.AUTH_FAILED)
+        self._token_issued(refresh_token, refreshed=True)
+        return auth_token
+
+    async def _renew_auth_token(self, stale_token):
+        """ Replaces stale_token, only one coroutine renews while others with the same stale_token wait for it """
+        async with self._auth_lock:
+            if self.auth_token != stale_token:
+                return self.auth_token  # renewed meanwhile
+            auth_token = None
+            if self._can_refresh():
+                try:
+                    auth_token = await self.refresh_auth_token()
+                except Exception as e:
+                    logger.debug('Refresh of auth token failed, generating new. %s', e)
+            if auth_token is None:
+                auth_token = await self.get_auth_token()
+            self.reauth_count += 1
+            self.auth_token = auth_token
+            return auth_token
+
+    async def _ensure_fresh_token(self):
+        if self._token_expiring():
+            await self._renew_auth_token(self.auth_token)
+
+    async def rest_call(self, method, url_path, post_data=None, offset=0, expanded=False, limit=BULK_FETCH_LIMIT,
+                        stream=False):
+        """ Same as FMCRawRestClient.rest_call, with stream the chunks are returned as an async generator """
+        start_time = time.monotonic()
+        event = CallEvent(method, endpoint_template(url_path))
+        streamed = False
+        try:
+            if self.session is None:
+                await self.connect()
+            variables = {'DOMAIN': self.domain}
+            url = self.server + url_path.format(**variables)
+            if url[-1] == '/':
+                url = url[:-1]
+            event.url = url
+            logger.debug('REST Call: [%s] %s?offset=%s&limit=%s', method.upper(), url, offset, limit)
+            retries = {'reauth': REAUTH_RETRIES, 'request': REQUEST_RETRIES}
+            while True:
+                try:
+                    await self._ensure_fresh_token()
+                    auth_token = self.auth_token
+                    headers = {'Content-Type': 'application/json', 'X-auth-access-token': auth_token,  'Authorization' : 'Bearer ' + auth_token,
+                               'Accept-Encoding': ACCEPT_ENCODING}
+                    if self.rate_limiter:
+                        event.throttle_wait += await self.rate_limiter.acquire_async()
+                    status_code, response_json = await self._rest_call(method, url, post_data, headers, offset, expanded, limit,
+                                                                       stream, event)
+                    if event.bytes_received is None:
+                        streamed = True
+                        return self._report_streamed(response_json, event, start_time)
+                    return response_json
+                except ResourceException as e:
+                    wait = self._retry_after(e, event, retries)
+                    while wait == RETRY_REAUTH:
+                        try:
+                            await self._renew_auth_token(auth_token)
+                            wait = None
+                        except ResourceException as renew_error:
+                            wait = self._retry_after(renew_error, event, retries)
+                    if wait is None:
+                        continue
+                    if self.rate_limiter:
+                        self.rate_limiter.pause(wait)
+                    else:
+                        await asyncio.sleep(wait)
+                        event.throttle_wait += wait
+        except Exception as e:
+            event.error = e
+            logger.error('REST called failed: %s', e)
+            raise e
+        finally:
+            if not streamed:
+                event.latency = time.monotonic() - start_time
+                logger.debug('REST call completed in %.3fs', event.latency)
+                emit(self.hooks, event)
+
+    async def _report_streamed(self, chunks, event, start_time):
+        """ Same as FMCRawRestClient._report_streamed """
+        try:
+            async for chunk in chunks:
+                yield chunk
+        except Exception as e:
+            event.error = e
+            raise e
+        finally:
+            await chunks.aclose()
+            event.latency = time.monotonic() - start_time
+            logger.debug('REST call completed in %.3fs', event.latency)
+            emit(self.hooks, event)
+
+    async def _rest_call(self, method, url, post_data, headers, offset=0, expanded=False, limit=BULK_FETCH_LIMIT,
+                         stream=False, event=None):
+        data = None
+        try:
+            params = None
+            if method == 'list':
+                params = {'limit': limit, 'offset': offset, 'expanded': str(expanded)}
+            http_method = {'create': 'POST', 'list': 'GET'}.get(method, method.upper())
+            if http_method not in ['POST', 'PUT', 'GET', 'DELETE']:
+                raise Exception('Unknown method ' + method)
+            body = None
+            body_headers = headers
+            if post_data is not None:
+                log_payload(method, post_data)
+                body, body_headers, size = encode_body(post_data, headers, self.compress_requests)
+                self.transfer_stats.add_sent(size, len(body))
+            else:
+                self.transfer_stats.add_sent(0, 0)
+            response = await self.session.request(http_method, url, data=body, headers=body_headers, params=params)
+            if response.status == 415 and body_headers is not headers:
+                logger.warning('Server does not accept compressed requests, sending them uncompressed.')
+                self.compress_requests = False
+                response.release()
+                if event is not None:
+                    event.bytes_sent += len(body)
+                body = post_data.encode('utf-8')
+                self.transfer_stats.add_sent(len(body), len(body))
+                response = await self.session.request(http_method, url, data=body, headers=headers, params=params)
+            if event is not None:
+                event.status_code = response.status
+                event.bytes_sent += len(body) if body is not None else 0
+            if stream and response.status == 200:
+                # released by the chunks generator, which sets bytes_received
+                if event is not None:
+                    event.bytes_received = None
+                return response.status, _response_chunks(response, self.transfer_stats, event)
+            try:
+                data = await response.read()
+            finally:
+                response.release()
+            wire_size = _wire_size(response, len(data))
+            self.transfer_stats.add_received(len(data), wire_size)
+            if event is not None:
+                event.bytes_received += wire_size
+            response_json = process_response(method, str(response.url), response.status, data, response.headers)
+            if stream:
+                return response.status, _async_chunks(_json_chunks(response_json))
+            return response.status, response_json
+        except aiohttp.ClientError as err:
+            logger.error('Error in connection --> %s', err)
+            raise Exception(str(err))
+        except ValueError as e:
+            logger.error('Error with response %s', LogTruncated(data))
+            raise e
+
+    async def _list(self, resource, offset=None, limit=None, lazy=False, stream=False):
+        if not offset:
+            offset = 0
+        if not limit or limit > BULK_FETCH_LIMIT:
+            limit = BULK_FETCH_LIMIT
+        url_path = resource.get_api_path()
+        if stream:
+            chunks = await self.rest_call('list', url_path, offset=offset, expanded=True, limit=limit, stream=True)
+            parser = ListPageParser(resource, offset, limit, lazy, self._cache_listed(url_path))
+            objs = []
+            async for chunk in chunks:
+                objs.extend(parser.feed(chunk))
+            objs.extend(parser.close())
+            return objs, parser.paging()
+        json_resp = await self.rest_call('list', url_path, offset=offset, expanded=True, limit=limit)
+        put_items = self._cache_listed(url_path)
+        if put_items is not None and 'items' in json_resp:
+            put_items(json_resp['items'])
+        return parse_list_response(resource, json_resp, offset, limit, lazy)
+
+    ######## Raw HTTP calls ###########
+    ## these uses the raw payload which is json ##
+    async def post(self, url_path, data):
+        json_resp = await self.rest_call('post', url_path, data)
+        if json_resp:
+            self._created(url_path, json_resp)
+        return json_resp
+
+    async def put(self, url_path, data):
+        try:
+            json_resp = await self.rest_call('put', url_path, data)
+        finally:
+            self._invalidate_cached(url_path)
+        if json_resp:
+            self._updated(url_path, json_resp)
+        return json_resp
+
+    ######## Resource calls ###########
+    async def _single_create(self, resource):
+        url_path = resource.get_api_path()
+        post_data = resource.json(pretty=False, full_dump=False)
+        json_resp = await self.post(url_path, post_data)
+        resource.json_load(json_resp)
+        return resource
+
+    async def _bulk_create(self, resources, bulk_limit=BULK_FETCH_LIMIT, max_workers=BULK_MAX_WORKERS):
+        """
+        Once a chunk fails no more chunks are posted, the error of the failed chunk is raised with the resources
+        created by the others in its created attribute, see FMCBaseRestClient._bulk_create.
+        """
+        url_path = resources[0].get_api_path() + '?bulk=true'
+        semaphore = asyncio.Semaphore(max_workers)
+        failed = []
+
+        async def post_chunk(chunk):
+            async with semaphore:
+                if failed:  # not posted after a chunk failed
+                    return None
+                try:
+                    return await self.post(url_path, chunk[1])
+                except Exception as e:
+                    failed.append(e)
+                    raise
+
+        json_resps = await asyncio.gather(*[post_chunk(chunk) for chunk in split_bulk_payload(resources, bulk_limit)],
+                                          return_exceptions=True)
+        new_resources = []
+        for json_resp in json_resps:
+            if json_resp is None or isinstance(json_resp, BaseException):
+                continue
+            for item in json_resp['items']:
+                resource = resources[0].__class__()
+                resource.json_load(item)
+                new_resources.append(resource)
+        if failed:
+            failed[0].created = new_resources
+            raise failed[0]
+        return new_resources
+
+    async def create(self, resource, bulk_limit=BULK_FETCH_LIMIT, max_workers=BULK_MAX_WORKERS):
+        if isinstance(resource, list) and len(resource) > 0:
+            if 'POST' in resource[0].__class__.bulk_operations:
+                return await self._bulk_create(resource, bulk_limit, max_workers)
+            response_resources = []
+            for item in resource:
+                item = await self._single_create(item)
+                response_resources.append(item)
+            return response_resources
+        else:
+            if isinstance(resource, list):
+                resource = resource[0]
+            return await self._single_create(resource)
+
+    async def load(self, resource):
+        url_path = resource.get_api_path()
+        if resource.id:
+            json_resp = None
+            if self.cache is not None:
+                json_resp = self.cache.get(self.domain, url_path, resource.id)
+            if json_resp is None:
+                json_resp = await self.rest_call('get', url_path + '/' + str(resource.id))
+                if self.cache is not None:
+                    self.cache.put(self.domain, url_path, resource.id, json_resp)
+            resource.json_load(json_resp)
+            return resource
+        else:
+            return await self.list(resource)
+
+    async def get(self, resource):
+        if isinstance(resource, str):
+            return await self.rest_call('get', resource)
+        else:
+            return await self.load(resource)
+
+    async def update(self, resource):
+        url_path = resource.get_api_path()
+        if resource.id:
+            url_path += '/' + str(resource.id)
+        post_data = resource.json(pretty=False, full_dump=False)
+        json_resp = await self.put(url_path, post_data)
+        resource.json_load(json_resp)
+        return resource
+
+    async def remove(self, resource):
+        url_path = resource.get_api_path()
+        if resource.id:
+            url_path += '/' + str(resource.id)
+        return await self.delete(url_path)
+
+    async def delete(self, resource):
+        if isinstance(resource, str):
+            try:
+                json_resp = await self.rest_call('delete', resource)
+            finally:
+                self._invalidate_cached(resource)
+            self._removed(resource)
+            return json_resp
+        else:
+            return await self.remove(resource)
+
+    async def name_index(self, resource, refresh=False):
+        """ Same as FMCBaseRestClient.name_index """
+        url_path = resource.get_api_path()
+        index = self._name_indexes.get(url_path)
+        if index is None or refresh:
+            if index is None:
+                index = NameIndex(resource)
+            index.rebuild([item async for item in AsyncRESTListStreamIterator(resource, self)])
+            self._name_indexes[url_path] = index
+        return index
+
+    async def get_by_name(self, resource, name, refresh=False):
+        return (await self.name_index(resource, refresh)).get(name)
+
+    async def _run_batch(self, operation, resources, max_workers):
+        semaphore = asyncio.Semaphore(max_workers)
+
+        async def run(resource):
+            async with semaphore:
+                try:
+                    return BatchResult(resource, await operation(resource))
+                except Exception as e:
+                    return BatchResult(resource, error=e)
+
+        return list(await asyncio.gather(*[run(resource) for resource in resources]))
+
+    async def create_many(self, resources, max_workers=BATCH_MAX_WORKERS):
+        """ Creates resources one by one concurrently, returns a BatchResult per resource in the input order """
+        return await self._run_batch(self._single_create, resources, max_workers)
+
+    async def update_many(self, resources, max_workers=BATCH_MAX_WORKERS):
+        return await self._run_batch(self.update, resources, max_workers)
+
+    async def remove_many(self, resources, max_workers=BATCH_MAX_WORKERS):
+        return await self._run_batch(self.remove, resources, max_workers)
+
+    async def list(self, resource, offset=0, limit=0, concurrent=False, max_workers=LIST_MAX_WORKERS, lazy=False,
+                   stream=False):
+        """
+        :param offset: index of the first record to return
+        :param limit: if 0 then all the records are returned
+        :param concurrent: fetch the pages after the first one concurrently, results are still in offset order
+        :param max_workers: max number of pages fetched at a time when concurrent is True
+        :param lazy: return lazy views over the json, see LazyResource
+        :param stream: parse the pages as they are received, keeps the memory used by a page close to its resources
+        """
+        if limit < 0:
+            limit = 0
+        listed_at = time.time()
+        objs, paging = await self._list(resource, offset=offset, limit=limit, lazy=lazy, stream=stream)
+        if len(objs) == 0:
+            if offset == 0 and paging['count'] == 0:
+                self._listed_all(resource.get_api_path(), listed_at)
+            return objs
+        end = paging['count']
+        if limit > 0:
+            end = min(end, offset + limit)
+        page_size = paging['limit'] if paging['limit'] > 0 else len(objs)
+        offsets = range(offset + len(objs), end, page_size)
+
+        if concurrent and len(offsets) > 1:
+            semaphore = asyncio.Semaphore(max_workers)
+
+            async def fetch_page(page_offset):
+                async with semaphore:
+                    return (await self._list(resource, offset=page_offset, limit=min(page_size, end - page_offset),
+                                             lazy=lazy, stream=stream))[0]
+
+            for page in await asyncio.gather(*[fetch_page(page_offset) for page_offset in offsets]):
+                objs.extend(page)
+        else:
+            for page_offset in offsets:
+                page = (await self._list(resource, offset=page_offset, limit=min(page_size, end - page_offset),
+                                         lazy=lazy, stream=stream))[0]
+                if len(page) == 0:
+                    break
+                objs.extend(page)
+        if limit > 0:
+            objs = objs[0:limit]
+        elif offset == 0 and len(objs) == paging['count']:
+            self._listed_all(resource.get_api_path(), listed_at)
+        return objs
+
+    def list_iterator(self, resource, lazy=False, stream=False):
+        """
+        :param lazy: iterate over lazy views of the resources, see LazyResource
+        :param stream: return the resources as they are parsed from the response, see AsyncRESTListStreamIterator
+        """
+        if stream:
+            return AsyncRESTListStreamIterator(resource, self, lazy)
+        return AsyncRESTListIterator(resource, self, lazy)
@@ -1,9 +1,18 @@
-import json
+import gzip
 import logging
+import threading
 import time
-from datetime import datetime
-from fmc_rest_client.core.base_resources import json_dump
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import parsedate_to_datetime
+from fmc_rest_client.core.base_resources import json_dump, lazy_resource
+from fmc_rest_client.core.codec import get_codec
+from fmc_rest_client.core.json_stream import ItemsStreamParser
+from fmc_rest_client.core.metrics import CallEvent, CallMetrics, emit, endpoint_template
+from fmc_rest_client.core.name_index import NameIndex
+from fmc_rest_client.core.rate_limiter import RateLimiter, FMC_RATE_LIMIT, FMC_RATE_BURST
 import requests
+from requests.adapters import HTTPAdapter
 # Disable  InsecureRequestWarning: Unverified HTTPS request is being made.
 from requests.packages.urllib3.exceptions import InsecureRequestWarning
 
@@ -18,8 +27,42 @@ NAME_EXISTS_ERROR = ['already exists',
 INVALID_NAME_ERROR = ['Invalid Object Name']
 
 TOO_MANY_REQUESTS = 'Too Many Requests'
+# seconds to wait on 429 when server doesn't send Retry-After
+TOO_MANY_REQUESTS_WAIT = 5
+# times a REST call is retried after renewing the auth token, and after a 429
+REAUTH_RETRIES = 3
+REQUEST_RETRIES = 5
+# returned by ClientStateMixin._retry_after when the auth token is to be renewed before retrying
+RETRY_REAUTH = 'reauth'
 
 BULK_FETCH_LIMIT=1000
+# FMC auth token is valid for 30 minutes and can be refreshed 3 times, after that a new token is generated
+TOKEN_LIFETIME = 30 * 60
+TOKEN_REFRESH_MARGIN = 60
+TOKEN_MAX_REFRESH = 3
+# max parallel page fetches for concurrent list
+LIST_MAX_WORKERS = 4
+# max parallel calls for create_many, update_many and remove_many
+BATCH_MAX_WORKERS = 4
+# FMC rejects payloads bigger than 2048000 bytes
+BULK_POST_MAX_BYTES = 2048000
+# max parallel bulk POSTs
+BULK_MAX_WORKERS = 4
+# HTTP statuses of calls rejected for their payload, a failed bulk create is split only on these, see is_payload_error
+PAYLOAD_ERROR_STATUS = [400, 413]
+
+# HTTP connection pool defaults, see FMCRawRestClient
+POOL_CONNECTIONS = 10
+POOL_MAXSIZE = 10
+# bytes read at a time from the response body when streaming list pages
+STREAM_CHUNK_SIZE = 64 * 1024
+# response encodings asked for, requests and aiohttp decode them transparently
+ACCEPT_ENCODING = 'gzip, deflate'
+# request bodies smaller than this aren't worth compressing, see FMCRawRestClient compress_requests
+COMPRESS_MIN_BYTES = 1024
+COMPRESS_LEVEL = 6
+# characters of request and response bodies logged, bulk payloads can be megabytes
+LOG_PAYLOAD_LIMIT = 1024
 
 class ResourceException(Exception):
     GENERIC = 'generic'
@@ -30,22 +73,367 @@ class ResourceException(Exception):
     TOO_MANY_REQUESTS = 'too-many-requests'
 
 
-    def __init__(self, code, message=None):
+    def __init__(self, code, message=None, retry_after=None, status_code=None):
         self.code = code
         self.message = message
+        # seconds to wait before retrying, as asked by the server
+        self.retry_after = retry_after
+        # HTTP status of the failed call, set for the errors not having a specific code
+        self.status_code = status_code
+
+class BatchResult:
+    """
+        Outcome for one resource of a batch operation like create_many.
+        result is the value returned by the operation, error the exception raised if it failed.
+    """
+    def __init__(self, resource, result=None, error=None):
+        self.resource = resource
+        self.result = result
+        self.error = error
+
+    @property
+    def ok(self):
+        return self.error is None
+
+    def __repr__(self):
+        return 'BatchResult({}, ok={})'.format(getattr(self.resource, 'name', self.resource), self.ok)
+
+class BulkCreateResult:
+    """
+        Outcome of create with recover=True.
+        created has the resources created in FMC, existing the input resources whose name already exists in FMC
+        and failed a BatchResult with the error for each input resource which couldn't be created.
+    """
+    def __init__(self):
+        self.created = []
+        self.existing = []
+        self.failed = []
+
+    def extend(self, other):
+        self.created.extend(other.created)
+        self.existing.extend(other.existing)
+        self.failed.extend(other.failed)
+
+    def __repr__(self):
+        return 'BulkCreateResult(created={}, existing={}, failed={})'.format(
+            len(self.created), len(self.existing), len(self.failed))
+
+class TransferStats:
+    """
+        Bytes of request and response bodies as sent and received over the wire, and before compression or
+        after decompression. Thread safe, shared by all the calls of a client.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.requests = 0
+            self.compressed_requests = 0
+            self.bytes_sent = 0
+            self.bytes_sent_uncompressed = 0
+            self.bytes_received = 0
+            self.bytes_received_uncompressed = 0
+
+    def add_sent(self, uncompressed, wire):
+        with self._lock:
+            self.requests += 1
+            if wire != uncompressed:
+                self.compressed_requests += 1
+            self.bytes_sent += wire
+            self.bytes_sent_uncompressed += uncompressed
+
+    def add_received(self, uncompressed, wire):
+        with self._lock:
+            self.bytes_received += wire
+            self.bytes_received_uncompressed += uncompressed
+
+    def snapshot(self):
+        """ Counters as a dict, with the compression ratios of sent and received bytes """
+        with self._lock:
+            stats = {'requests': self.requests, 'compressed_requests': self.compressed_requests,
+                     'bytes_sent': self.bytes_sent, 'bytes_sent_uncompressed': self.bytes_sent_uncompressed,
+                     'bytes_received': self.bytes_received,
+                     'bytes_received_uncompressed': self.bytes_received_uncompressed}
+        stats['sent_ratio'] = stats['bytes_sent_uncompressed'] / stats['bytes_sent'] if stats['bytes_sent'] else 1.0
+        stats['received_ratio'] = (stats['bytes_received_uncompressed'] / stats['bytes_received']
+                                   if stats['bytes_received'] else 1.0)
+        return stats
+
+    def __repr__(self):
+        return ('TransferStats(requests={requests}, sent={bytes_sent}/{bytes_sent_uncompressed}, '
+                'received={bytes_received}/{bytes_received_uncompressed})').format(**self.snapshot())
+
+
+def encode_body(post_data, headers, compress):
+    """
+        Returns the request body as bytes and the headers to send it with, the body is gzipped when compress is
+        True and it is at least COMPRESS_MIN_BYTES. Also returns the uncompressed size.
+    """
+    body = post_data.encode('utf-8')
+    size = len(body)
+    if compress and size >= COMPRESS_MIN_BYTES:
+        body = gzip.compress(body, COMPRESS_LEVEL)
+        headers = dict(headers, **{'Content-Encoding': 'gzip'})
+    return body, headers, size
+
+
+def _retry_after_seconds(value):
+    """ Retry-After header can either be seconds or a HTTP date """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        try:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
+
+class LogTruncated:
+    """
+        Log argument for a body, str or bytes, which is formatted to its first LOG_PAYLOAD_LIMIT characters and only
+        when the log record is emitted.
+    """
+    __slots__ = ('value',)
+
+    def __init__(self, value):
+        self.value = value
+
+    def __str__(self):
+        value = self.value
+        if value is None:
+            return 'None'
+        text = value[:LOG_PAYLOAD_LIMIT]
+        if isinstance(text, bytes):
+            text = text.decode('utf-8', 'replace')
+        if len(value) > LOG_PAYLOAD_LIMIT:
+            text += '... ({} more)'.format(len(value) - LOG_PAYLOAD_LIMIT)
+        return text
+
+
+def log_payload(method, post_data):
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug('%s payload: %s', method, LogTruncated(post_data))
+
+
+def process_response(method, url, status_code, data, headers=None):
+    """
+        Maps the HTTP status and body of a REST call to the json response or ResourceException.
+        data is the body as bytes, decoded by the JSON codec without a separate text decoding step.
+    """
+    # print('Status code is: ' + str(status_code))
+    if status_code == 200 or status_code == 201 or status_code == 202:
+        # print(method + ' was successful...')
+        response_json = get_codec().loads(data)
+        # print(json.dumps(json_resp,sort_keys=True,indent=4, separators=(',', ': ')))
+        return response_json
+    elif status_code == 401:
+        logger.debug('Re-authenticating ...')
+        raise ResourceException(ResourceException.AUTH_FAILED)
+    elif status_code == 404 and method == 'list':  # today REST API returns 404 when the list is empty
+        return {}
+    elif status_code == 405 and (method == 'create' or method == 'post'):
+        raise ResourceException(ResourceException.READ_ONLY)
+    elif status_code == 400 and (method == 'create' or method == 'post'):
+        response_json = get_codec().loads(data)
+        desc = response_json['error']['messages'][0]['description']
+
+        for error in NAME_EXISTS_ERROR:
+            if error in desc:
+                raise ResourceException(ResourceException.NAME_EXISTS, status_code=status_code)
+        for error in INVALID_NAME_ERROR:
+            if error in desc:
+                raise ResourceException(ResourceException.INVALID_OBJECT_NAME, status_code=status_code)
+        raise ResourceException(ResourceException.GENERIC, desc, status_code=status_code)
+    elif status_code == 429:
+        try:
+            reason_phrase = get_codec().loads(data)['reasonPhrase']
+        except (ValueError, TypeError, KeyError):
+            reason_phrase = TOO_MANY_REQUESTS
+        retry_after = _retry_after_seconds(headers.get('Retry-After')) if headers else None
+        raise ResourceException(ResourceException.TOO_MANY_REQUESTS, reason_phrase, retry_after)
+    else:
+        if isinstance(data, bytes):
+            data = data.decode('utf-8', 'replace')
+        args = {'method': method.upper(), 'url': url, 'status_code': status_code, 'response': data}
+        msg = '[{method}] {url}\n\tHTTP Error:{status_code}, Response Data: {response}'.format(**args)
+        raise ResourceException(ResourceException.GENERIC, msg, status_code=status_code)
+
+
+def parse_list_response(resource, json_resp, offset, limit, lazy=False):
+    """
+        Builds resources of type same as resource from a list response, returns them along with the paging info.
+        With lazy True the resources are lazy views over the json items, see LazyResource.
+    """
+    objs = []
+    # print(json_resp['items'])
+    if 'items' in json_resp:
+        objs = _load_list_items(resource, json_resp['items'], lazy)
+    return objs, _list_paging(json_resp, offset, limit, len(objs))
+
+
+def _load_list_items(resource, items, lazy):
+    if lazy:
+        return [lazy_resource(resource.__class__, json_obj) for json_obj in items]
+    objs = []
+    for json_obj in items:
+        obj = resource.__class__(json_obj['name'])
+        obj.json_load(json_obj)
+        objs.append(obj)
+    return objs
+
+
+def _list_paging(json_resp, offset, limit, item_count):
+    paging = {}
+    if 'paging' in json_resp:
+        paging['pages'] = int(json_resp['paging']['pages'])
+        paging['offset'] = int(json_resp['paging']['offset'])
+        paging['count'] = int(json_resp['paging']['count'])
+        paging['limit'] = int(json_resp['paging']['limit'])
+    else:  # empty list
+        paging = {'pages': 0, 'offset': offset, 'count': item_count, 'limit': limit}
+    return paging
+
+
+class ListPageParser:
+    """
+        Streaming counterpart of parse_list_response, the response body is fed in chunks as it is received and
+        the resources are built as soon as their json is parsed, so a page is never held as the raw body, its
+        decoded string and the json tree at the same time.
+        Paging comes after the items in FMC response, it is known only once the whole body is parsed.
+        on_items is called with the json items parsed from each chunk, e.g. to cache them.
+    """
+    def __init__(self, resource, offset, limit, lazy=False, on_items=None):
+        self.resource = resource
+        self.offset = offset
+        self.limit = limit
+        self.lazy = lazy
+        self.on_items = on_items
+        self.item_count = 0
+        self._parser = ItemsStreamParser()
+
+    def feed(self, data):
+        """ Parses the next chunk of the body, returns the resources completed by it """
+        return self._load(self._parser.feed(data))
+
+    def close(self):
+        """ Parses the rest of the body, returns the remaining resources """
+        return self._load(self._parser.close())
+
+    def _load(self, items):
+        if self.on_items is not None and items:
+            self.on_items(items)
+        objs = _load_list_items(self.resource, items, self.lazy)
+        self.item_count += len(objs)
+        return objs
+
+    def paging(self):
+        return _list_paging(self._parser.fields, self.offset, self.limit, self.item_count)
+
+
+def parse_list_stream(resource, chunks, offset, limit, lazy=False, on_items=None):
+    """ Same as parse_list_response but for the response body as an iterable of byte chunks """
+    parser = ListPageParser(resource, offset, limit, lazy, on_items)
+    objs = []
+    for chunk in chunks:
+        objs.extend(parser.feed(chunk))
+    objs.extend(parser.close())
+    return objs, parser.paging()
+
+
+def split_resource_path(url_path):
+    """ Splits the url path of a resource into the api path of its type and its id """
+    path, _, id = url_path.partition('?')[0].rstrip('/').rpartition('/')
+    return path, id
+
+
+def _response_chunks(response, transfer_stats=None, event=None):
+    """
+        Yields the body of a streamed response in chunks, closes the response when done or closed.
+        The bytes received are set as bytes_received of event, a CallEvent, then.
+    """
+    size = 0
+    try:
+        for chunk in response.iter_content(STREAM_CHUNK_SIZE):
+            size += len(chunk)
+            yield chunk
+    finally:
+        wire_size = response.raw.tell()
+        if transfer_stats is not None:
+            transfer_stats.add_received(size, wire_size)
+        if event is not None:
+            event.bytes_received = wire_size
+        response.close()
+
+
+def _json_chunks(json_resp):
+    yield get_codec().dumps(json_resp).encode('utf-8')
+
+
+def is_payload_error(e):
+    """
+        True when e is a ResourceException for a call rejected because of its payload, e.g. a bad resource in a bulk
+        create, and not one failed by the server like 5xx.
+    """
+    return isinstance(e, ResourceException) and (
+        e.code in [ResourceException.NAME_EXISTS, ResourceException.INVALID_OBJECT_NAME] or
+        e.status_code in PAYLOAD_ERROR_STATUS)
+
+
+def split_bulk_payload(resources, bulk_limit=BULK_FETCH_LIMIT, max_bytes=BULK_POST_MAX_BYTES):
+    """
+        Splits resources in chunks having at most bulk_limit resources and payload of at most max_bytes.
+        Returns list of (chunk resources, chunk json payload).
+        A resource bigger than max_bytes goes alone in its chunk.
+    """
+    chunks = []
+    items = []
+    size = 2  # []
+    start = 0
+    for index, resource in enumerate(resources):
+        item = json_dump(resource, pretty=False, full_dump=False)
+        item_size = len(item.encode('utf-8')) + 1  # including separator
+        if items and (len(items) >= bulk_limit or size + item_size > max_bytes):
+            chunks.append((resources[start:index], '[' + ','.join(items) + ']'))
+            items = []
+            size = 2
+            start = index
+        items.append(item)
+        size += item_size
+    if items:
+        chunks.append((resources[start:], '[' + ','.join(items) + ']'))
+    return chunks
+
 
 class RESTListIterator:
     """
         Iterator for REST List Resource
+        With prefetch > 0, up to that many next pages are fetched in background while the current page is consumed,
+        so at most prefetch + 1 pages are held in memory.
+        With lazy True the resources are lazy views over the json, see LazyResource.
+        Use it in a with block, or call close(), to stop the prefetch when not iterating till the end.
     """
-    def __init__(self, resource, rest_client):
+    def __init__(self, resource, rest_client, prefetch=0, lazy=False):
         self.current_index = 0
         self.offset = 0
         self.resource = resource
         self.rest_client = rest_client
-        self.list_cache, paging = rest_client._list(resource)
+        self.lazy = lazy
+        # time the listing started, to drop the resources not listed from the snapshot store, None once done
+        self._listed_at = time.time()
+        self._size_changed = False
+        self.list_cache, paging = rest_client._list(resource, lazy=lazy)
         self.total = paging['count']
         self.page_size = paging['limit']
+        self.prefetch = prefetch
+        self._executor = None
+        self._pending = deque()  # (offset, future) of pages being prefetched, in offset order
+        self._next_fetch_offset = len(self.list_cache)
+        if prefetch > 0:
+            self._executor = ThreadPoolExecutor(max_workers=prefetch)
+            self._schedule_prefetch()
 
     def __iter__(self):
         return self
@@ -53,41 +441,347 @@ class RESTListIterator:
     def __next__(self):
         return self.next()
 
+    def _schedule_prefetch(self):
+        while len(self._pending) < self.prefetch and 0 < self._next_fetch_offset < self.total:
+            future = self._executor.submit(self.rest_client._list, self.resource, self._next_fetch_offset,
+                                           lazy=self.lazy)
+            self._pending.append((self._next_fetch_offset, future))
+            self._next_fetch_offset += self.page_size
+
+    def _cancel_prefetch(self):
+        while self._pending:
+            self._pending.popleft()[1].cancel()
+
+    def _fetch_page(self, offset):
+        if self._pending and self._pending[0][0] == offset:
+            return self._pending.popleft()[1].result()
+        self._cancel_prefetch()
+        return self.rest_client._list(self.resource, offset, lazy=self.lazy)
+
+    def close(self):
+        """ Stops the background prefetch """
+        if self._executor:
+            self._cancel_prefetch()
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
     def next(self):
         if self.current_index < self.total:
-            cache_size = len(self.list_cache)
-            logger.debug('Fetching item number {} out of {}'.format(self.current_index, self.total))
-            logger.debug('Current offset {} and Cache size {}'.format(self.offset, cache_size))
-            if self.current_index == self.offset + cache_size:
+            if self.current_index == self.offset + len(self.list_cache):
                 #fetch next page if we are done reading cached page
                 self.offset = self.current_index
-                logger.debug('Fetching page starting at offset {}'.format(self.offset))
-                self.list_cache, paging = self.rest_client._list(self.resource, self.offset)
+                logger.debug('Fetching page starting at offset %s', self.offset)
+                self.list_cache, paging = self._fetch_page(self.offset)
                 if paging['count'] != self.total:
                     logger.warning("Resource size changed on server")
+                    self._size_changed = True
+                    # pages in flight were computed for the old size, fetch again from the current offset
+                    self._cancel_prefetch()
+                    self._next_fetch_offset = self.offset + len(self.list_cache)
                 self.total = paging['count']
-                if self.current_index > self.total:
+                if self.current_index >= self.total or len(self.list_cache) == 0:
                     logger.warning("Resource size got reduced than current iteration")
+                    self.close()
                     raise StopIteration("Resource size got reduced.")
+                if self._executor:
+                    self._schedule_prefetch()
             resource = self.list_cache[self.current_index - self.offset]
             self.current_index += 1
             return resource
         else:
+            self.close()
+            if self._listed_at is not None and not self._size_changed:
+                self.rest_client._listed_all(self.resource.get_api_path(), self._listed_at)
+            self._listed_at = None
             raise StopIteration()
 
-class FMCRawRestClient(object):
-    def __init__(self, server, username=None, password=None, auth_token=None, domain='default'):
-        self.server = server
-        self.username = username
-        self.password = password
-        self.auth_token = auth_token
+class RESTListStreamIterator:
+    """
+        Iterator for REST List Resource which parses the pages as they are received and returns the resources
+        one by one, so only the resource being parsed is held besides the ones already returned.
+        Response of the current page stays open while iterating, use it in a with block or call close() if not
+        iterating till the end.
+        total is known once the first page is read.
+    """
+    def __init__(self, resource, rest_client, lazy=False):
+        self.resource = resource
+        self.rest_client = rest_client
+        self.lazy = lazy
+        self.total = None
+        self._resources = self._iterate()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return next(self._resources)
+
+    def next(self):
+        return next(self._resources)
+
+    def close(self):
+        """ Closes the response of the current page """
+        self._resources.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def _iterate(self):
+        offset = 0
+        url_path = self.resource.get_api_path()
+        listed_at = time.time()
+        complete = True
+        while self.total is None or offset < self.total:
+            logger.debug('Fetching page starting at offset %s', offset)
+            chunks = self.rest_client.rest_call('list', url_path, offset=offset, expanded=True, stream=True)
+            parser = ListPageParser(self.resource, offset, BULK_FETCH_LIMIT, self.lazy,
+                                    self.rest_client._cache_listed(url_path))
+            try:
+                for chunk in chunks:
+                    for resource in parser.feed(chunk):
+                        yield resource
+                for resource in parser.close():
+                    yield resource
+            finally:
+                chunks.close()
+            paging = parser.paging()
+            if self.total is not None and paging['count'] != self.total:
+                logger.warning("Resource size changed on server")
+                complete = False
+            self.total = paging['count']
+            if parser.item_count == 0:
+                complete = self.total == 0
+                break
+            offset += parser.item_count
+        if complete:
+            self.rest_client._listed_all(url_path, listed_at)
+
+
+def list_items(rest_client, resource):
+    """
+        Yields the json items of all the pages of the type of resource, parsed as the pages are received, for the
+        callers needing the json as FMC sent it rather than resources, e.g. to export or compare it.
+    """
+    url_path = resource.get_api_path()
+    offset = 0
+    total = None
+    while total is None or offset < total:
+        chunks = rest_client.rest_call('list', url_path, offset=offset, expanded=True, limit=BULK_FETCH_LIMIT,
+                                       stream=True)
+        parser = ItemsStreamParser()
+        count = 0
+        try:
+            for chunk in chunks:
+                for item in parser.feed(chunk):
+                    count += 1
+                    yield item
+            for item in parser.close():
+                count += 1
+                yield item
+        finally:
+            chunks.close()
+        total = _list_paging(parser.fields, offset, BULK_FETCH_LIMIT, count)['count']
+        if count == 0:
+            break
+        offset += count
+
+
+class ClientStateMixin(object):
+    """
+        State of FMCRawRestClient and AsyncFMCRestClient which doesn't depend on the HTTP transport - the token
+        lifetime, the hooks, and the cache, snapshot store and name indexes kept current with the REST calls,
+        along with how a failed call is retried.
+    """
+    def _init_state(self, domain, rate_limit, rate_burst, rate_limiter, compress_requests, cache, snapshot_store):
+        self.refresh_token = None
+        # monotonic time at which auth_token expires, None when not known e.g. token passed by the caller
+        self.token_expires_at = None
+        self.token_refresh_count = 0
         self.reauth_count = 0
         if domain is None:
             domain = 'default'
         self.domain = domain
+        if rate_limiter is None and rate_limit:
+            rate_limiter = RateLimiter(rate_limit, rate_burst)
+        self.rate_limiter = rate_limiter
+        self.compress_requests = compress_requests
+        self.transfer_stats = TransferStats()
+        self.metrics = CallMetrics()
+        self.hooks = [self.metrics]
+        self.cache = cache
+        self.snapshot_store = snapshot_store
+        # api path -> NameIndex
+        self._name_indexes = {}
+
+    def add_hook(self, hook):
+        """
+            hook is called with a CallEvent after each REST call, from the thread which made the call.
+            It should be quick, exceptions from it are logged and ignored.
+        """
+        self.hooks.append(hook)
+
+    def remove_hook(self, hook):
+        self.hooks.remove(hook)
+
+    ######## Auth token ###########
+    def _token_issued(self, refresh_token, refreshed):
+        self.refresh_token = refresh_token
+        self.token_expires_at = time.monotonic() + TOKEN_LIFETIME
+        self.token_refresh_count = self.token_refresh_count + 1 if refreshed else 0
+
+    def _token_expiring(self):
+        """ True if the auth token expires within TOKEN_REFRESH_MARGIN and is to be renewed before the next call """
+        return self.token_expires_at is not None and time.monotonic() >= self.token_expires_at - TOKEN_REFRESH_MARGIN
+
+    def _can_refresh(self):
+        """ True if the auth token can be refreshed, else a new one is to be generated """
+        return bool(self.refresh_token) and self.token_refresh_count < TOKEN_MAX_REFRESH
+
+    ######## Retries ###########
+    def _retry_after(self, error, event, retries):
+        """
+            Decides how a REST call failing with error is retried, retries is the dict of the re-auths and retries
+            left, {'reauth': REAUTH_RETRIES, 'request': REQUEST_RETRIES} for a new call, updated by it.
+            Returns RETRY_REAUTH when the auth token is to be renewed before retrying, else the seconds to wait
+            before retrying. Raises error when it is not to be retried.
+        """
+        if isinstance(error, ResourceException):
+            if error.code == ResourceException.AUTH_FAILED and retries['reauth'] > 0:
+                retries['reauth'] -= 1
+                event.reauths += 1
+                logger.debug('Retrying re-auth, retry left %s.', retries['reauth'])
+                return RETRY_REAUTH
+            if error.code == ResourceException.TOO_MANY_REQUESTS and retries['request'] > 0:
+                retries['request'] -= 1
+                event.retries += 1
+                wait = error.retry_after if error.retry_after is not None else TOO_MANY_REQUESTS_WAIT
+                logger.debug('Too many requests, retrying after %ss.', wait)
+                return wait
+        raise error
+
+    ######## Cache, snapshot store and name indexes ###########
+    def _cache_listed(self, url_path):
+        """
+            Returns the callback putting the json items listed from url_path in the cache and the snapshot store,
+            None without them
+        """
+        stores = [store for store in (self.cache, self.snapshot_store) if store is not None]
+        if not stores:
+            return None
+        domain = self.domain
+
+        def put_items(items):
+            for store in stores:
+                store.put_items(domain, url_path, items)
+        return put_items
+
+    def _listed_all(self, url_path, listed_at):
+        """
+            Called when all the resources at url_path got listed by a listing started at listed_at, time.time(),
+            drops the resources it didn't return from the snapshot store
+        """
+        if self.snapshot_store is not None:
+            self.snapshot_store.prune(self.domain, url_path, listed_at)
+
+    def _invalidate_cached(self, url_path):
+        """ Drops the resource at url_path, which ends with its id, from the cache and the snapshot store """
+        path, id = split_resource_path(url_path)
+        for store in (self.cache, self.snapshot_store):
+            if store is not None:
+                store.invalidate(self.domain, path, id)
+
+    def _created(self, url_path, json_resp):
+        """ Adds the resources created by a POST to url_path to the name index and snapshot store """
+        path = url_path.partition('?')[0]
+        items = json_resp['items'] if 'items' in json_resp else [json_resp]
+        index = self._name_indexes.get(path)
+        if index is not None:
+            index.add_json(items)
+        if self.snapshot_store is not None:
+            self.snapshot_store.put_items(self.domain, path, items)
+
+    def _updated(self, url_path, json_resp):
+        path, id = split_resource_path(url_path)
+        index = self._name_indexes.get(path)
+        if index is not None:
+            index.add_json([json_resp])
+        if self.snapshot_store is not None:
+            self.snapshot_store.put(self.domain, path, id, json_resp)
+
+    def _removed(self, url_path):
+        path, id = split_resource_path(url_path)
+        index = self._name_indexes.get(path)
+        if index is not None:
+            index.discard(id)
+
+
+class FMCRawRestClient(ClientStateMixin):
+    """
+        REST client owning a pooled HTTP session, connections to FMC are kept alive and reused across calls.
+        pool_connections is the number of host pools to cache, pool_maxsize the max connections kept per host.
+        Set keep_alive False to close the connection after every call.
+        All calls go through a token bucket rate limiter allowing rate_limit calls per minute with rate_burst burst,
+        pass rate_limiter to share one limiter across clients using the same user, or rate_limit=None to disable.
+        The auth token is refreshed before it expires, and a 401 seen by many threads at once results in a single
+        refresh which the other threads wait for.
+        Compressed responses are asked for. With compress_requests True the POST and PUT bodies, like bulk creates,
+        are sent gzipped as well, until the server rejects one with 415 after which they are sent uncompressed.
+        transfer_stats has the bytes sent and received, to see what compression saves.
+        Each REST call is reported as a CallEvent to the hooks, see add_hook. metrics, a CallMetrics, is one of them
+        and aggregates the calls per endpoint.
+        With cache, a ResourceCache, load is served from the json of the resources listed or loaded before. PUT and
+        DELETE calls through the client invalidate the resource they change.
+        With snapshot_store, a SnapshotStore, the resources listed, created and updated are written into it and the
+        removed ones dropped. A complete list of a type also drops the stored resources it didn't return, e.g.
+        removed by others. The client doesn't read from the store, load calls FMC or uses the cache.
+        The name indexes, see FMCBaseRestClient.name_index, are kept current with the POST, PUT and DELETE calls
+        through the client.
+    """
+    def __init__(self, server, username=None, password=None, auth_token=None, domain='default',
+                 keep_alive=True, pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE,
+                 rate_limit=FMC_RATE_LIMIT, rate_burst=FMC_RATE_BURST, rate_limiter=None, compress_requests=False,
+                 cache=None, snapshot_store=None):
+        self.server = server
+        self.username = username
+        self.password = password
+        self.auth_token = auth_token
+        self._init_state(domain, rate_limit, rate_burst, rate_limiter, compress_requests, cache, snapshot_store)
+        self._auth_lock = threading.Lock()
+        self.keep_alive = keep_alive
+        self.session = self._create_session(pool_connections, pool_maxsize)
         if not self.auth_token:
             self.auth_token = self.get_auth_token()
 
+    def _create_session(self, pool_connections, pool_maxsize):
+        session = requests.Session()
+        # pool_block makes callers wait for a free connection instead of opening throw away connections
+        adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize, pool_block=True)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        session.verify = False
+        if not self.keep_alive:
+            session.headers['Connection'] = 'close'
+        return session
+
+    def close(self):
+        """ Closes the pooled connections to FMC """
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
     def get_auth_token(self):
         api_auth_path = "/api/fmc_platform/v1/auth/generatetoken"
         auth_url = self.server + api_auth_path
@@ -96,15 +790,18 @@ class FMCRawRestClient(object):
             # r = requests.post(auth_url, headers=headers, auth=requests.auth.HTTPBasicAuth(username,password), verify='/path/to/ssl_certificate/')
             headers = {'Content-Type': 'application/json'}
             logger.debug('Connecting to %s', auth_url)
-            response = requests.post(auth_url, headers=headers,
-                                     auth=requests.auth.HTTPBasicAuth(self.username, self.password), verify=False)
+            if self.rate_limiter:
+                self.rate_limiter.acquire()
+            response = self.session.post(auth_url, headers=headers,
+                                         auth=requests.auth.HTTPBasicAuth(self.username, self.password))
             auth_headers = response.headers
             auth_token = auth_headers.get('X-auth-access-token', default=None)
             if auth_token is None:
                 logger.error('auth_token not found.')
                 raise ResourceException(ResourceException.AUTH_FAILED)
             else:
-                logger.debug('Got auth_token - ' + auth_token)
+                logger.debug('Got auth_token - %s', auth_token)
+            self._token_issued(auth_headers.get('X-auth-refresh-token', default=None), refreshed=False)
             return auth_token
         except ResourceException as e:
             raise e
@@ -112,6 +809,49 @@ class FMCRawRestClient(object):
             # logger.debug('Error in generating auth token --> '+str(err))
             raise Exception('Error in generating auth token --> ' + str(err))
 
+    def refresh_auth_token(self):
+        """ Gets a new auth token using the refresh token, FMC allows it 3 times for a generated token """
+        api_refresh_path = "/api/fmc_platform/v1/auth/refreshtoken"
+        refresh_url = self.server + api_refresh_path
+        headers = {'Content-Type': 'application/json', 'X-auth-access-token': self.auth_token,
+                   'X-auth-refresh-token': self.refresh_token}
+        logger.debug('Refreshing auth token using %s', refresh_url)
+        if self.rate_limiter:
+            self.rate_limiter.acquire()
+        response = self.session.post(refresh_url, headers=headers)
+        auth_headers = response.headers
+        auth_token = auth_headers.get('X-auth-access-token', default=None)
+        if auth_token is None:
+            logger.debug('Refresh of auth_token failed with status %s', response.status_code)
+            raise ResourceException(ResourceException.AUTH_FAILED)
+        self._token_issued(auth_headers.get('X-auth-refresh-token', default=self.refresh_token), refreshed=True)
+        return auth_token
+
+    def _renew_auth_token(self, stale_token):
+        """
+            Replaces stale_token with a refreshed or newly generated token.
+            Only one thread renews, others calling with the same stale_token wait and reuse its result.
+        """
+        with self._auth_lock:
+            if self.auth_token != stale_token:
+                return self.auth_token  # renewed by another thread meanwhile
+            auth_token = None
+            if self._can_refresh():
+                try:
+                    auth_token = self.refresh_auth_token()
+                except Exception as e:
+                    logger.debug('Refresh of auth token failed, generating new. %s', e)
+            if auth_token is None:
+                auth_token = self.get_auth_token()
+            self.reauth_count += 1
+            self.auth_token = auth_token
+            return auth_token
+
+    def _ensure_fresh_token(self):
+        """ Renews the token proactively if it is about to expire """
+        if self._token_expiring():
+            self._renew_auth_token(self.auth_token)
+
     def _validate_rest_call_params(self, method, url_path, post_data):
         if not method.upper() in ['POST', 'PUT', 'DELETE', 'GET', 'LIST']:
             raise Exception('Unsupported method: ' + method)
@@ -120,125 +860,154 @@ class FMCRawRestClient(object):
         if post_data and not str == type(post_data):
             raise Exception('Post data type is ' + type(post_data).__name__ + ' while string expected.')
 
-    def rest_call(self, method, url_path, post_data=None, offset=0, expanded=False):
-        start_time = datetime.now().replace(microsecond=0)
-        end_time = start_time
+    def rest_call(self, method, url_path, post_data=None, offset=0, expanded=False, limit=BULK_FETCH_LIMIT,
+                  stream=False):
+        """
+        :param stream: return the body of successful response as a generator of byte chunks read as they are
+            received, instead of the parsed json. Closing the generator closes the response.
+        """
+        start_time = time.monotonic()
+        event = CallEvent(method, endpoint_template(url_path))
+        streamed = False
         try:
             self._validate_rest_call_params(method, url_path, post_data)
             variables = {'DOMAIN': self.domain}
             url = self.server + url_path.format(**variables)
             if url[-1] == '/':
                 url = url[:-1]
-            logger.debug('REST Call: [' + method.upper() + '] ' + url + '?offset=' + str(offset))
+            event.url = url
+            logger.debug('REST Call: [%s] %s?offset=%s&limit=%s', method.upper(), url, offset, limit)
             # print(headers)
-            reauth_retry_count = 3
-            request_retry_count = 5
+            retries = {'reauth': REAUTH_RETRIES, 'request': REQUEST_RETRIES}
             while True:
                 try:
-                    headers = {'Content-Type': 'application/json', 'X-auth-access-token': self.auth_token,  'Authorization' : 'Bearer ' + self.auth_token}
-                    status_code, response_json =  self._rest_call(method, url, post_data, headers, offset, expanded)
+                    self._ensure_fresh_token()
+                    auth_token = self.auth_token
+                    headers = {'Content-Type': 'application/json', 'X-auth-access-token': auth_token,  'Authorization' : 'Bearer ' + auth_token,
+                               'Accept-Encoding': ACCEPT_ENCODING}
+                    if self.rate_limiter:
+                        event.throttle_wait += self.rate_limiter.acquire()
+                    status_code, response_json =  self._rest_call(method, url, post_data, headers, offset, expanded, limit,
+                                                                  stream, event)
+                    if event.bytes_received is None:
+                        # body not read yet, the event is reported once it is
+                        streamed = True
+                        return self._report_streamed(response_json, event, start_time)
                     return response_json
                 except ResourceException as e:
-                    if e.code == ResourceException.AUTH_FAILED and reauth_retry_count > 0:
-                        #we may get auth-failed when calling get_auth_token as well, that's why this retry loop
-                        while True:
-                            try:
-                                reauth_retry_count -= 1
-                                logger.debug('Retrying re-auth, retry left {}.'.format(reauth_retry_count))
-                                self.auth_token = self.get_auth_token()
-                                break # break inner loop for get_auth_token
-                            except ResourceException as e:
-                                if e.code == ResourceException.AUTH_FAILED and reauth_retry_count > 0:
-                                    continue
-                                else:
-                                    raise e
-                    elif e.code == ResourceException.TOO_MANY_REQUESTS and request_retry_count > 0:
-                        request_retry_count -= 1
-                        time.sleep(5)
+                    wait = self._retry_after(e, event, retries)
+                    #we may get auth-failed when calling get_auth_token as well, that's why this retry loop
+                    while wait == RETRY_REAUTH:
+                        try:
+                            self._renew_auth_token(auth_token)
+                            wait = None
+                        except ResourceException as renew_error:
+                            wait = self._retry_after(renew_error, event, retries)
+                    if wait is None:
+                        continue
+                    if self.rate_limiter:
+                        # hold back other threads as well, acquire waits for it before next try
+                        self.rate_limiter.pause(wait)
                     else:
-                        raise e
+                        time.sleep(wait)
+                        event.throttle_wait += wait
         except Exception as e:
-            logger.error('REST called failed: ' + str(e))
+            event.error = e
+            logger.error('REST called failed: %s', e)
             raise e
         finally:
-            end_time = datetime.now().replace(microsecond=0)
-            logger.debug('REST call completed in ' + str(end_time - start_time))
+            if not streamed:
+                event.latency = time.monotonic() - start_time
+                logger.debug('REST call completed in %.3fs', event.latency)
+                emit(self.hooks, event)
 
-    def _rest_call(self, method, url, post_data, headers, offset=0, expanded=False):
+    def _report_streamed(self, chunks, event, start_time):
+        """ Yields the chunks of a streamed response, reports event to the hooks once they are read or closed """
+        try:
+            yield from chunks
+        except Exception as e:
+            event.error = e
+            raise e
+        finally:
+            event.latency = time.monotonic() - start_time
+            logger.debug('REST call completed in %.3fs', event.latency)
+            emit(self.hooks, event)
+
+    def _rest_call(self, method, url, post_data, headers, offset=0, expanded=False, limit=BULK_FETCH_LIMIT,
+                   stream=False, event=None):
+        """ event, a CallEvent, gets the status and bytes of the call """
         response = None
         data = None
         try:
-            response = self._http_request(method, url, post_data, headers, offset, expanded)
+            response = self._http_request(method, url, post_data, headers, offset, expanded, limit, stream)
+            if response is not None and response.status_code == 415 and 'Content-Encoding' in response.request.headers:
+                logger.warning('Server does not accept compressed requests, sending them uncompressed.')
+                self.compress_requests = False
+                if event is not None:
+                    event.bytes_sent += len(response.request.body or b'')
+                response.close()
+                response = self._http_request(method, url, post_data, headers, offset, expanded, limit, stream)
             if response is not None:
                 status_code = response.status_code
-                data = response.text
-                # print('Status code is: ' + str(status_code))
-                if status_code == 200 or status_code == 201 or status_code == 202:
-                    # print(method + ' was successful...')
-                    response_json = json.loads(data)
-                    # print(json.dumps(json_resp,sort_keys=True,indent=4, separators=(',', ': ')))
-                    return status_code, response_json
-                elif status_code == 401:
-                    logger.debug('Re-authenticating ...')
-                    raise ResourceException(ResourceException.AUTH_FAILED)
-                        #self._rest_call(method, url, post_data, headers, offset, expanded)
-                elif status_code == 404 and method == 'list':  # today REST API returns 404 when the list is empty
-                    return [], 0
-                elif status_code == 405 and (method == 'create' or method == 'post'):
-                    raise ResourceException(ResourceException.READ_ONLY)
-                elif status_code == 400 and (method == 'create' or method == 'post'):
-                    response_json = json.loads(data)
-                    desc = response_json['error']['messages'][0]['description']
-
-                    for error in NAME_EXISTS_ERROR:
-                        if error in desc:
-                            raise ResourceException(ResourceException.NAME_EXISTS)
-                    for error in INVALID_NAME_ERROR:
-                        if error in desc:
-                            raise ResourceException(ResourceException.INVALID_OBJECT_NAME)
-                    raise ResourceException(ResourceException.GENERIC, desc)
-                elif (status_code == 429) and (method == 'create' or method == 'post'):
-                    response_json = json.loads(data)
-                    reason_phrase = response_json['reasonPhrase']
-                    raise ResourceException(ResourceException.TOO_MANY_REQUESTS, reason_phrase)
-                else:
-                    args = {'method': method.upper(), 'url': response.url, 'status_code': response.status_code,
-                             'response': response.text}
-                    msg = '[{method}] {url}\n\tHTTP Error:{status_code}, Response Data: {response}'.format(**args)
-                    raise ResourceException(ResourceException.GENERIC, msg)
-                    # response.raise_for_status()
-                    # print ('Error occurred in --> ' + response)
+                if event is not None:
+                    event.status_code = status_code
+                    event.bytes_sent += len(response.request.body or b'')
+                if stream and status_code == 200:
+                    chunks = _response_chunks(response, self.transfer_stats, event)
+                    response = None  # closed by the chunks generator
+                    if event is not None:
+                        event.bytes_received = None  # set by the chunks generator
+                    return status_code, chunks
+                data = response.content
+                wire_size = response.raw.tell()
+                self.transfer_stats.add_received(len(data), wire_size)
+                if event is not None:
+                    event.bytes_received += wire_size
+                response_json = process_response(method, response.url, status_code, data, response.headers)
+                if stream:
+                    return status_code, _json_chunks(response_json)
+                return status_code, response_json
         except requests.exceptions.HTTPError as err:
-            logger.error('Error in connection --> ' + str(err))
+            logger.error('Error in connection --> %s', err)
             raise Exception(str(err))
         except ValueError as e:
-            logger.error('Error with response ' + str(data))
+            logger.error('Error with response %s', LogTruncated(data))
             raise e
         finally:
-            if response: response.close()
+            if response is not None: response.close()
 
-    def _http_request(self, method, url, post_data, headers, offset=0, expanded=False):
+    def _http_request(self, method, url, post_data, headers, offset=0, expanded=False, limit=BULK_FETCH_LIMIT,
+                      stream=False):
         response = None
         try:
             if method in ['post', 'create']:
-                logger.debug('post payload:' + post_data)
-                response = requests.post(url, data=post_data, headers=headers, verify=False)
+                log_payload(method, post_data)
+                body, headers = self._encode_body(post_data, headers)
+                response = self.session.post(url, data=body, headers=headers)
             elif method in ['put']:
-                logger.debug('put payload ' + post_data)
-                response = requests.put(url, data=post_data, headers=headers, verify=False)
+                log_payload(method, post_data)
+                body, headers = self._encode_body(post_data, headers)
+                response = self.session.put(url, data=body, headers=headers)
             elif method == 'get':
-                response = requests.get(url, headers=headers, verify=False)
+                response = self.session.get(url, headers=headers)
             elif method == 'delete':
-                response = requests.delete(url, headers=headers, verify=False)
+                response = self.session.delete(url, headers=headers)
             elif method == 'list':
-                params = {'limit': BULK_FETCH_LIMIT, 'offset': offset, 'expanded': expanded}
-                response = requests.get(url, headers=headers, params=params, verify=False)
+                params = {'limit': limit, 'offset': offset, 'expanded': expanded}
+                response = self.session.get(url, headers=headers, params=params, stream=stream)
             else:
                 raise Exception('Unknown method ' + method)
+            if method not in ['post', 'create', 'put']:
+                self.transfer_stats.add_sent(0, 0)
         except Exception as e:
             raise e
         return response
 
+    def _encode_body(self, post_data, headers):
+        body, headers, size = encode_body(post_data, headers, self.compress_requests)
+        self.transfer_stats.add_sent(size, len(body))
+        return body, headers
+
     """
         The following json structure is retruned from FMC in case of list call
         {
@@ -253,24 +1022,20 @@ class FMCRawRestClient(object):
         }
     
     """
-    def _list(self, resource, offset=None, limit=None):
+    def _list(self, resource, offset=None, limit=None, lazy=False, stream=False):
+        if not offset:
+            offset = 0
+        if not limit or limit > BULK_FETCH_LIMIT:
+            limit = BULK_FETCH_LIMIT
         url_path = resource.get_api_path()
-        json_resp = self.rest_call('list', url_path, offset=offset, expanded=True)
-        objs = []
-        # print(json_resp['items'])
-        if 'items' in json_resp:
-            for json_obj in json_resp['items']:
-                obj = resource.__class__(json_obj['name'])
-                obj.json_load(json_obj)
-                objs.append(obj)
-                # print(objs)
-        paging = {}
-        if 'paging' in json_resp:
-            paging['pages'] = int(json_resp['paging']['pages'])
-            paging['offset'] = int(json_resp['paging']['offset'])
-            paging['count'] = int(json_resp['paging']['count'])
-            paging['limit'] = int(json_resp['paging']['limit'])
-        return objs, paging
+        if stream:
+            chunks = self.rest_call('list', url_path, offset=offset, expanded=True, limit=limit, stream=True)
+            return parse_list_stream(resource, chunks, offset, limit, lazy, self._cache_listed(url_path))
+        json_resp = self.rest_call('list', url_path, offset=offset, expanded=True, limit=limit)
+        put_items = self._cache_listed(url_path)
+        if put_items is not None and 'items' in json_resp:
+            put_items(json_resp['items'])
+        return parse_list_response(resource, json_resp, offset, limit, lazy)
 
     ######## Raw HTTP calls ###########
     ## these uses the raw payload which is json ##
@@ -279,18 +1044,32 @@ class FMCRawRestClient(object):
         return self.rest_call('get', url_path)
 
     def post(self, url_path, data):
-        return self.rest_call('post', url_path, data)
+        json_resp = self.rest_call('post', url_path, data)
+        if json_resp:
+            self._created(url_path, json_resp)
+        return json_resp
 
     def put(self, url_path, data):
-        return self.rest_call('put', url_path, data)
+        try:
+            json_resp = self.rest_call('put', url_path, data)
+        finally:
+            self._invalidate_cached(url_path)
+        if json_resp:
+            self._updated(url_path, json_resp)
+        return json_resp
 
     def delete(self, url_path):
-        return self.rest_call('delete', url_path)
+        try:
+            json_resp = self.rest_call('delete', url_path)
+        finally:
+            self._invalidate_cached(url_path)
+        self._removed(url_path)
+        return json_resp
 
 
 class FMCBaseRestClient(FMCRawRestClient):
-    def __init__(self, server, username=None, password=None, auth_token=None, domain='default'):
-        super(FMCBaseRestClient, self).__init__(server, username, password, auth_token, domain)
+    def __init__(self, server, username=None, password=None, auth_token=None, domain='default', **kwargs):
+        super(FMCBaseRestClient, self).__init__(server, username, password, auth_token, domain, **kwargs)
 
     def _single_create(self, resource):
         url_path = resource.get_api_path()
@@ -299,29 +1078,115 @@ class FMCBaseRestClient(FMCRawRestClient):
         resource.json_load(json_resp)
         return resource
 
-    def _bulk_create(self, resources, bulk_limit=BULK_FETCH_LIMIT):
+    def _bulk_create(self, resources, bulk_limit=BULK_FETCH_LIMIT, max_workers=BULK_MAX_WORKERS):
+        """
+        Creates resources using bulk POST, payload is split in chunks as per bulk_limit and FMC payload size limit.
+        Chunks are posted in parallel, created resources are returned in the order of the chunks.
+        Once a chunk fails no more chunks are posted, the ones in flight are waited for and the error of the failed
+        chunk is raised with the resources created by the others in its created attribute.
+        """
         url_path = resources[0].get_api_path() + '?bulk=true'
-        bulk_resources = resources
-        if len(resources) > bulk_limit:
-            bulk_resources = resources[:bulk_limit]
-        post_data = json_dump(bulk_resources, pretty=False, full_dump=False)
-        json_resp = self.post(url_path, post_data)
-        #print('Bulk response ' + str(json_resp))
+        chunks = split_bulk_payload(resources, bulk_limit)
+        logger.debug('Bulk create of %s resources in %s chunks', len(resources), len(chunks))
+        failed = threading.Event()
+
+        def post_chunk(chunk):
+            if failed.is_set():  # not posted after a chunk failed
+                return None
+            try:
+                return self.post(url_path, chunk[1])
+            except Exception:
+                failed.set()
+                raise
+
         new_resources = []
-        for item in json_resp['items']:
-            resource = resources[0].__class__()
-            resource.json_load(item)
-            new_resources.append(resource)
-        if len(resources) > bulk_limit:
-            tmp_resources = self._bulk_create(resources[bulk_limit:])
-            new_resources.extend(tmp_resources)
+        error = None
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = [executor.submit(post_chunk, chunk) for chunk in chunks]
+            for future in futures:
+                try:
+                    json_resp = future.result()
+                except Exception as e:
+                    error = error or e
+                    continue
+                if json_resp is None:
+                    continue
+                for item in json_resp['items']:
+                    resource = resources[0].__class__()
+                    resource.json_load(item)
+                    new_resources.append(resource)
+        if error is not None:
+            error.created = new_resources
+            raise error
         return new_resources
 
-    def create(self, resource, bulk_limit=BULK_FETCH_LIMIT):
+    def _bulk_create_recovering(self, url_path, resources, payload=None):
+        """
+        Posts resources in one bulk call, on failure splits them in halves and retries each half,
+        so that a bad resource costs O(log n) extra calls instead of failing all of them.
+        """
+        result = BulkCreateResult()
+        try:
+            if payload is None:
+                payload = json_dump(resources, pretty=False, full_dump=False)
+            json_resp = self.post(url_path, payload)
+            for item in json_resp['items']:
+                resource = resources[0].__class__()
+                resource.json_load(item)
+                result.created.append(resource)
+        except ResourceException as e:
+            if len(resources) == 1:
+                if e.code == ResourceException.NAME_EXISTS:
+                    result.existing.append(resources[0])
+                else:
+                    result.failed.append(BatchResult(resources[0], error=e))
+            elif is_payload_error(e):
+                logger.debug('Bulk create of %s resources failed, retrying in halves.', len(resources))
+                middle = len(resources) // 2
+                result.extend(self._bulk_create_recovering(url_path, resources[:middle]))
+                result.extend(self._bulk_create_recovering(url_path, resources[middle:]))
+            else:  # not caused by the payload e.g. 5xx, splitting won't help and would only load the server more
+                result.failed.extend([BatchResult(resource, error=e) for resource in resources])
+        except Exception as e:
+            result.failed.extend([BatchResult(resource, error=e) for resource in resources])
+        return result
+
+    def _create_recovering(self, resources, bulk_limit=BULK_FETCH_LIMIT, max_workers=BULK_MAX_WORKERS):
+        result = BulkCreateResult()
+        if 'POST' in resources[0].__class__.bulk_operations:
+            url_path = resources[0].get_api_path() + '?bulk=true'
+            chunks = split_bulk_payload(resources, bulk_limit)
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                for chunk_result in executor.map(lambda chunk: self._bulk_create_recovering(url_path, *chunk), chunks):
+                    result.extend(chunk_result)
+        else:
+            for item in self.create_many(resources, max_workers):
+                if item.ok:
+                    result.created.append(item.result)
+                elif isinstance(item.error, ResourceException) and item.error.code == ResourceException.NAME_EXISTS:
+                    result.existing.append(item.resource)
+                else:
+                    result.failed.append(item)
+        return result
+
+    def create(self, resource, bulk_limit=BULK_FETCH_LIMIT, max_workers=BULK_MAX_WORKERS, recover=False):
+        """
+        Creates a resource or a list of resources, using bulk POST when the resource type supports it.
+        With recover True a failure doesn't stop the rest, a failed bulk call is retried in halves to isolate
+        the failing resources, and a BulkCreateResult is returned instead of the created resources.
+        Without it the first failed bulk call stops the create, the raised error has the resources created so far in
+        its created attribute.
+        """
+        if recover:
+            if not isinstance(resource, list):
+                resource = [resource]
+            if len(resource) == 0:
+                return BulkCreateResult()
+            return self._create_recovering(resource, bulk_limit, max_workers)
         if isinstance(resource, list) and len(resource) > 0:
             response_resources = None
             if 'POST' in resource[0].__class__.bulk_operations:
-                response_resources = self._bulk_create(resource, bulk_limit)
+                response_resources = self._bulk_create(resource, bulk_limit, max_workers)
             else:
                 response_resources = []
                 for item in resource:
@@ -336,8 +1201,13 @@ class FMCBaseRestClient(FMCRawRestClient):
     def load(self, resource):
         url_path = resource.get_api_path()
         if resource.id:
-            url_path += '/' + str(resource.id)
-            json_resp = self.get(url_path)
+            json_resp = None
+            if self.cache is not None:
+                json_resp = self.cache.get(self.domain, url_path, resource.id)
+            if json_resp is None:
+                json_resp = self.get(url_path + '/' + str(resource.id))
+                if self.cache is not None:
+                    self.cache.put(self.domain, url_path, resource.id, json_resp)
             resource.json_load(json_resp)
             return resource
         else:
@@ -371,37 +1241,114 @@ class FMCBaseRestClient(FMCRawRestClient):
         else:
             return self.remove(resource)
 
-    def list(self, resource, offset=0, limit=0):
+    def name_index(self, resource, refresh=False):
+        """
+            Returns the NameIndex of the resources of the type of resource, e.g. of all the hosts or of the rules
+            of an access policy. It is built with one streaming list on first use, or again with refresh True.
+        """
+        url_path = resource.get_api_path()
+        index = self._name_indexes.get(url_path)
+        if index is None or refresh:
+            if index is None:
+                index = NameIndex(resource)
+            index.rebuild(RESTListStreamIterator(resource, self))
+            self._name_indexes[url_path] = index
+        return index
+
+    def get_by_name(self, resource, name, refresh=False):
+        """ Returns the resource of the type of resource having name, None if there is none, see name_index """
+        return self.name_index(resource, refresh).get(name)
+
+    def _run_batch(self, operation, resources, max_workers):
+        def run(resource):
+            try:
+                return BatchResult(resource, operation(resource))
+            except Exception as e:
+                return BatchResult(resource, error=e)
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            # map keeps the input order
+            return list(executor.map(run, resources))
+
+    def create_many(self, resources, max_workers=BATCH_MAX_WORKERS):
+        """
+        Creates resources one by one in parallel, useful for resources not supporting bulk create.
+        A failure doesn't stop the rest, a BatchResult is returned per resource in the input order.
+        """
+        return self._run_batch(self._single_create, resources, max_workers)
+
+    def update_many(self, resources, max_workers=BATCH_MAX_WORKERS):
+        """ Updates resources in parallel, returns a BatchResult per resource in the input order """
+        return self._run_batch(self.update, resources, max_workers)
+
+    def remove_many(self, resources, max_workers=BATCH_MAX_WORKERS):
+        """ Removes resources in parallel, returns a BatchResult per resource in the input order """
+        return self._run_batch(self.remove, resources, max_workers)
+
+    def list(self, resource, offset=0, limit=0, concurrent=False, max_workers=LIST_MAX_WORKERS, lazy=False,
+             stream=False):
         """
 
         :param resource:
-        :param offset:
+        :param offset: index of the first record to return
         :param limit: if 0 then all the records are returned
+        :param concurrent: fetch the pages after the first one in parallel, results are still in offset order
+        :param max_workers: max number of pages fetched in parallel when concurrent is True
+        :param lazy: return lazy views over the json, attributes other than id, name and type are loaded on access
+        :param stream: parse the pages as they are received, keeps the memory used by a page close to its resources
         :return:
         """
-        objs = []
-        result = self._list(resource, offset=offset, limit=min(limit,BULK_FETCH_LIMIT))
-        objs.extend(result[0])
+        if limit < 0:
+            limit = 0
+        listed_at = time.time()
+        objs, paging = self._list(resource, offset=offset, limit=limit, lazy=lazy, stream=stream)
+        if len(objs) == 0:
+            if offset == 0 and paging['count'] == 0:
+                self._listed_all(resource.get_api_path(), listed_at)
+            return objs
+        # records to be read from server, starting at offset
+        end = paging['count']
+        if limit > 0:
+            end = min(end, offset + limit)
+        page_size = paging['limit'] if paging['limit'] > 0 else len(objs)
+        offsets = range(offset + len(objs), end, page_size)
+        logger.debug('pages left %s, page size %s', len(offsets), page_size)
 
-        pages = result[1]['pages'] - 1  # we already read one page
-        while pages > 0:
-            if (len(objs) > limit):
-                break
-            offset += len(result[0])
-            logger.debug('pages ' + str(pages))
-            logger.debug('offset ' + str(offset) + ' len(objs) ' + str(len(objs)))
-            result = self._list(resource, offset=offset, limit=min(BULK_FETCH_LIMIT,limit-len(objs)))
-            pages -= 1
-            objs.extend(result[0])
-        #FIXME: Need to fetch based on limit
+        def fetch_page(page_offset):
+            return self._list(resource, offset=page_offset, limit=min(page_size, end - page_offset), lazy=lazy,
+                              stream=stream)[0]
+
+        if concurrent and len(offsets) > 1:
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                # map returns pages in the order of offsets
+                for page in executor.map(fetch_page, offsets):
+                    objs.extend(page)
+        else:
+            for page_offset in offsets:
+                page = fetch_page(page_offset)
+                if len(page) == 0:  # resources got deleted on server while listing
+                    break
+                objs.extend(page)
         if limit > 0:
             objs = objs[0:limit]
+        elif offset == 0 and len(objs) == paging['count']:
+            self._listed_all(resource.get_api_path(), listed_at)
         return objs
 
 
 class FMCRestClient(FMCBaseRestClient):
-    def __init__(self, server, username=None, password=None, auth_token=None, domain='default'):
-        super(FMCRestClient, self).__init__(server, username, password, auth_token, domain)
+    def __init__(self, server, username=None, password=None, auth_token=None, domain='default', **kwargs):
+        super(FMCRestClient, self).__init__(server, username, password, auth_token, domain, **kwargs)
 
-    def list_iterator(self, resource):
-        return RESTListIterator(resource, self)
+    def list_iterator(self, resource, prefetch=0, lazy=False, stream=False):
+        """
+        :param prefetch: number of pages to fetch in background ahead of the iteration
+        :param lazy: iterate over lazy views of the resources, see LazyResource
+        :param stream: return the resources as they are parsed from the response, see RESTListStreamIterator.
+            Pages can't be prefetched when streaming.
+        """
+        if stream:
+            if prefetch > 0:
+                raise ValueError('prefetch is not supported with stream')
+            return RESTListStreamIterator(resource, self, lazy)
+        return RESTListIterator(resource, self, prefetch, lazy)
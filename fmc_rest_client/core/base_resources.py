@@ -1,7 +1,9 @@
+import copy
 import inspect
 import json
 import logging
 
+from fmc_rest_client.core.codec import get_codec
 from fmc_rest_client.core.pluralize import pluralize
 
 logger = logging.getLogger('FMC_REST_CLIENT')
@@ -18,61 +20,313 @@ class ObjectJSONEncoder(json.JSONEncoder):
         return False
 
     def default(self, obj):
-        if hasattr(obj, 'to_json'):
-            return self.default(obj.to_json())
-        elif hasattr(obj, '__dict__'):
-            d = {}
-            for key, value in obj.__dict__.items():
-                if not key.startswith('__') and not self.hide_attr(obj, key) and value:
-                    d[key] = convert_to_references(value)
-            return d
+        return _json_default(obj, self.full_dump)
 
-        return obj
+
+def _json_default(obj, full_dump):
+    """ Converts the objects json codec doesn't support, used by ObjectJSONEncoder and json_dump """
+    serializer = get_serializer(type(obj))
+    if serializer.is_lazy:
+        obj.materialize()
+        serializer = get_serializer(type(obj))
+    if serializer.has_to_json:
+        return _json_default(obj.to_json(), full_dump)
+    elif serializer.has_attrs:
+        return serializer.dump(obj, full_dump)
+
+    return obj
+
+def _json_default_full(obj):
+    return _json_default(obj, True)
+
+def _json_default_partial(obj):
+    return _json_default(obj, False)
+
+
+class ResourceSerializer:
+    """
+        Serialization plan of a class, computed once per class by get_serializer.
+        Holds the json ignore set and how the instances are to be converted, so that serializing an object
+        is a single pass over its attributes.
+    """
+    def __init__(self, cls):
+        self.has_to_json = hasattr(cls, 'to_json')
+        # instances of classes with __slots__ only have no __dict__, their attributes are the slots
+        self.has_dict = cls.__dictoffset__ != 0
+        self.slots = None if self.has_dict else _slot_fields(cls)
+        self.has_attrs = self.has_dict or len(self.slots) > 0
+        self.is_reference = issubclass(cls, AbstractReferenceResource)
+        self.is_named = issubclass(cls, AbstractNamedResource)
+        self.is_lazy = issubclass(cls, LazyResource)
+        self.ignore_attrs = frozenset()
+        self.custom_hide = False
+        if issubclass(cls, AbstractResource):
+            self.ignore_attrs = _json_ignore_attrs(cls)
+            # a resource overriding hide_in_json is asked for each attribute
+            self.custom_hide = cls.hide_in_json is not AbstractResource.hide_in_json
+
+    def items(self, obj):
+        """ (name, value) of the attributes of obj """
+        if self.has_dict:
+            return obj.__dict__.items()
+        return [(key, value) for key in self.slots for value in (getattr(obj, key, _UNSET),) if value is not _UNSET]
+
+    def dump(self, obj, full_dump):
+        """ json dict of a top level object, skipping empty and ignored attributes """
+        if full_dump:
+            return {key: convert_to_references(value) for key, value in self.items(obj)
+                    if value and not key.startswith('__')}
+        if self.custom_hide:
+            return {key: convert_to_references(value) for key, value in self.items(obj)
+                    if value and not key.startswith('__') and not obj.hide_in_json(key)}
+        ignore_attrs = self.ignore_attrs
+        return {key: convert_to_references(value) for key, value in self.items(obj)
+                if value and key not in ignore_attrs and not key.startswith('__')}
+
+    def reference(self, obj):
+        """ json dict of a ReferenceType for obj """
+        if not obj.id:
+            logger.warning('Id missing for object %s.\nFMC may fail to resolve this reference.', dict(self.items(obj)))
+        if not self.is_named:
+            return {}
+        return {key: value for key, value in (('type', obj.type), ('id', obj.id), ('name', obj.name)) if value}
+
+
+_serializers = {}
+
+def get_serializer(cls):
+    serializer = _serializers.get(cls)
+    if serializer is None:
+        serializer = _serializers[cls] = ResourceSerializer(cls)
+    return serializer
+
+_SCALAR_TYPES = frozenset([str, int, float, bool, type(None)])
 
 def convert_to_references(obj):
     """ recursively converts all BaseReferenceResource to ReferenceType"""
-    if isinstance(obj, BaseReferenceResource):
-        if hasattr(obj, 'id') and not obj.id:
-            logger.warning('Id missing for object ' + str(obj.__dict__) + '.\nFMC may fail to resolve this reference.')
-        converted_obj = ReferenceType(obj)
-    elif isinstance(obj, list) or isinstance(obj, tuple) or isinstance(obj, set):
-        new_list = type(obj)()
-        for item in obj:
-            if isinstance(obj, set):
-                new_list.add(convert_to_references(item))
-            else:
-                new_list.append(convert_to_references(item))
-        converted_obj = new_list
+    obj_type = type(obj)
+    if obj_type in _SCALAR_TYPES:
+        return obj
+    elif obj_type is list or obj_type is tuple or isinstance(obj, (list, tuple, set)):
+        return [convert_to_references(item) for item in obj]
     elif isinstance(obj, dict):
-        new_dict = {}
-        for key, converted_obj in obj.items():
-            new_dict[key] = convert_to_references(converted_obj)
-        converted_obj = new_dict
-    elif obj and isinstance(obj, object) and hasattr(obj, '__dict__'):
-        converted_obj = convert_to_references(obj.__dict__)
-    else:
-        converted_obj = obj
-    return converted_obj
+        return {key: convert_to_references(value) for key, value in obj.items()}
+    serializer = get_serializer(obj_type)
+    if serializer.is_reference:
+        return serializer.reference(obj)
+    elif obj and serializer.has_attrs:
+        return {key: convert_to_references(value) for key, value in serializer.items(obj)}
+    return obj
 
 def json_dump(obj, pretty=True, full_dump=True):
-    indent = None
-    sort_keys = False
-    separators = (',', ': ')
-    if pretty:
-        indent = 2
-        sort_keys = True
-        separators = None
-    json_str = json.dumps(obj, cls=ObjectJSONEncoder, indent=indent,
-                          separators=separators, sort_keys=sort_keys, full_dump=full_dump)
-    return json_str
+    """ Serializes obj using the JSON codec, see fmc_rest_client.core.codec """
+    default = _json_default_full if full_dump else _json_default_partial
+    return get_codec().dumps(obj, pretty, default)
+
+_UNSET = object()
+
+def _slot_fields(cls):
+    """ Names of the __slots__ of cls and its bases, base class slots first """
+    fields = []
+    for klass in reversed(inspect.getmro(cls)):
+        slots = klass.__dict__.get('__slots__', ())
+        if isinstance(slots, str):
+            slots = [slots]
+        fields.extend(name for name in slots if name not in ('__dict__', '__weakref__'))
+    return tuple(fields)
+
+_json_ignore_attrs_cache = {}
+
+def _json_ignore_attrs(cls):
+    """ json_ignore_attrs aggregated over the class hierarchy, computed once per class """
+    attrs = _json_ignore_attrs_cache.get(cls)
+    if attrs is None:
+        alist = []
+        for klass in inspect.getmro(cls):
+            if 'json_ignore_attrs' in klass.__dict__:
+                alist.extend(klass.json_ignore_attrs())
+        attrs = _json_ignore_attrs_cache[cls] = frozenset(alist)
+    return attrs
+
+class ResourceLoader:
+    """
+        Deserialization plan of a resource class, computed once per class by get_loader.
+        Only the attributes the object already has are loaded from json, nested BaseResource attributes load
+        their part of the json, reference dicts become ReferenceType and items of typed_list_attrs become the
+        resource class registered for their type.
+    """
+    def __init__(self, cls):
+        self.typed_list_attrs = frozenset(cls.typed_list_attrs)
+        self.reference_class = cls.reference_class or ReferenceType
+        # resources with custom __setattr__ get attributes set through it
+        self.plain_setattr = cls.__setattr__ is object.__setattr__
+        # attributes of resources with __slots__ only
+        self.slots = None if cls.__dictoffset__ != 0 else frozenset(_slot_fields(cls))
+
+    def load_value(self, key, value, current):
+        """ Value of attribute key loaded from its json value, current is the present value of the attribute """
+        if isinstance(value, dict):
+            if isinstance(current, AbstractResource):
+                current.json_load(value)
+                return current
+            if 'id' in value and 'type' in value and 'name' in value:
+                ref = self.reference_class()
+                ref.json_load(value)
+                return ref
+        elif key in self.typed_list_attrs and isinstance(value, list):
+            return [resource_from_json(item) for item in value]
+        return value
+
+    def load(self, obj, json):
+        if self.slots is not None:
+            for key in self.slots & json.keys():
+                setattr(obj, key, self.load_value(key, json[key], getattr(obj, key, None)))
+            return
+        # same as load_value for each attribute, inlined as this is the hot path of list calls
+        attrs = obj.__dict__
+        typed_list_attrs = self.typed_list_attrs
+        plain_setattr = self.plain_setattr
+        for key in attrs.keys() & json.keys():
+            value = json[key]
+            if isinstance(value, dict):
+                current = attrs[key]
+                if isinstance(current, AbstractResource):
+                    current.json_load(value)
+                    continue
+                if 'id' in value and 'type' in value and 'name' in value:
+                    ref = self.reference_class()
+                    ref.json_load(value)
+                    value = ref
+            elif key in typed_list_attrs and isinstance(value, list):
+                value = [resource_from_json(item) for item in value]
+            if plain_setattr:
+                attrs[key] = value
+            else:
+                setattr(obj, key, value)
+
+
+_loaders = {}
+
+def get_loader(cls):
+    loader = _loaders.get(cls)
+    if loader is None:
+        loader = _loaders[cls] = ResourceLoader(cls)
+    return loader
+
+
+_resource_types = {}
+
+def register_resource_type(cls, type_name=None):
+    """ Registers cls as the resource class for FMC type type_name, defaults to class name """
+    _resource_types[type_name or cls.__name__] = cls
+    return cls
+
+def get_resource_type(type_name):
+    """ Resource class registered for FMC type, None if not known """
+    return _resource_types.get(type_name)
+
+def resource_from_json(json):
+    """
+        Builds the resource of the class registered for json['type'] and loads it from json.
+        json is returned as it is when its type is not registered.
+    """
+    cls = _resource_types.get(json.get('type')) if isinstance(json, dict) else None
+    if cls is None:
+        return json
+    resource = cls(json.get('name'))
+    resource.json_load(json)
+    return resource
+
+class LazyResource:
+    """
+        Mixin for a lazy view of a resource over its json, created by lazy_resource.
+        Only id, type and name are set upfront, any other attribute is loaded from json when first accessed.
+        Serializing, json_load or accessing an attribute not present in json materializes the view,
+        which turns it into an instance of the actual resource class.
+    """
+    __slots__ = ()
+    # actual resource class, set on the generated lazy classes
+    resource_class = None
+
+    def __getattr__(self, name):
+        # called only for attributes not loaded yet
+        attrs = self.__dict__
+        json = attrs.get('_json')
+        if json is None or name.startswith('__'):
+            raise AttributeError(name)
+        defaults = _prototype(self.resource_class).__dict__
+        if name in json and name in defaults:
+            current = defaults[name]
+            if isinstance(current, AbstractResource):
+                current = copy.deepcopy(current)
+            value = get_loader(self.resource_class).load_value(name, json[name], current)
+            attrs[name] = value
+            return value
+        self.materialize()
+        return getattr(self, name)
+
+    def materialize(self):
+        """ Loads all the attributes and turns this view into an instance of the actual resource class """
+        attrs = self.__dict__
+        json = attrs.pop('_json', None)
+        if json is None:
+            return self
+        cls = self.resource_class
+        # attributes already loaded or set on the view are kept, rest are loaded as done by list
+        state = cls(json.get('name')).__dict__
+        state.update(attrs)
+        self.__dict__ = state
+        self.__class__ = cls
+        self.json_load({key: value for key, value in json.items() if key not in attrs})
+        return self
+
+    def json_load(self, json):
+        self.materialize()
+        self.json_load(json)
+
+
+_lazy_classes = {}
+_prototypes = {}
+
+def _prototype(cls):
+    """ Instance of cls with the default attribute values """
+    prototype = _prototypes.get(cls)
+    if prototype is None:
+        prototype = _prototypes[cls] = cls(None)
+    return prototype
+
+def lazy_resource(cls, json):
+    """ Lazy view of a resource of class cls over json, see LazyResource """
+    if cls.__dictoffset__ == 0:
+        # compact resources with __slots__ are loaded right away
+        resource = cls(json.get('name'))
+        resource.json_load(json)
+        return resource
+    lazy_cls = _lazy_classes.get(cls)
+    if lazy_cls is None:
+        # LazyResource goes after cls to keep the layout of cls, which is needed to turn the view into cls,
+        # so its json_load is copied to take precedence over the one of cls
+        namespace = {'resource_class': cls, '__slots__': (), 'json_load': LazyResource.json_load}
+        lazy_cls = _lazy_classes[cls] = type('Lazy' + cls.__name__, (cls, LazyResource), namespace, register=False)
+    resource = lazy_cls.__new__(lazy_cls)
+    attrs = resource.__dict__
+    attrs['_json'] = json
+    for key in ('id', 'type', 'name'):
+        if key in json:
+            attrs[key] = json[key]
+    return resource
 
 def is_reference_type(json):
     return isinstance(json, dict) and set(['id', 'type','name']).issubset(json.keys())
 
-class BaseResource:
+class AbstractResource:
     """
-    Base Resource for all resources
+    Base of all resources, BaseResource and the compact resources of fmc_rest_client.resources.compact.
+    It has empty __slots__ so that the compact resources defining __slots__ have no per instance __dict__,
+    resource classes extend BaseResource or its subclasses.
     """
+    __slots__ = ()
+
     def json(self, pretty=True, full_dump=True):
         """
         Dumps the object in json format
@@ -81,19 +335,19 @@ class BaseResource:
         """
         return json_dump(self, pretty, full_dump)
 
+    # attributes having list of references of different resource types, e.g. objects of a NetworkGroup
+    # items of these are loaded as the resource class registered for their type
+    typed_list_attrs = []
+    # class of the objects loaded from reference json, ReferenceType if not set
+    reference_class = None
+
     def json_load(self, json):
         """ load this object from json """
         #print('json to load ' + str(json))
-        for key in self.__dict__.keys():
-            if key in json:
-                if isinstance(getattr(self, key), BaseResource):
-                    getattr(self, key).json_load(json[key])
-                elif is_reference_type(json[key]):
-                    ref = ReferenceType()
-                    ref.json_load(json[key])
-                    setattr(self, key, ref)
-                else:
-                    setattr(self, key, json[key])
+        loader = _loaders.get(self.__class__)
+        if loader is None:
+            loader = get_loader(self.__class__)
+        loader.load(self, json)
 
     @staticmethod
     def json_ignore_attrs():
@@ -104,34 +358,41 @@ class BaseResource:
         return ['metadata']
 
     def _aggregatted_json_ignore_attrs(self):
-        alist = []
-        for cls in inspect.getmro(self.__class__):
-            if 'json_ignore_attrs' in cls.__dict__:
-                alist.extend(cls.json_ignore_attrs())
-        return alist
+        return list(_json_ignore_attrs(self.__class__))
 
     def hide_in_json(self, attr_name):
-        alist = self._aggregatted_json_ignore_attrs()
-        # print('Attribute to hide in ' + self.type + ' ' + str(list))
-        # print('Attribute ' + attr_name + [' not found.', 'found'][attr_name in list])
-        return attr_name in alist
+        return attr_name in _json_ignore_attrs(self.__class__)
 
-class BaseContainedResource(BaseResource):
+class BaseResource(AbstractResource):
     """
-        This is a resource which is used inside a resource but can never be referenced independently.
-        This is a marker base class at this point, to make it easy to identify this kind of resources
+    Base Resource for all resources
     """
+
+class AbstractContainedResource(AbstractResource):
+    """ Base of BaseContainedResource and of the compact contained resources, see AbstractResource """
+    __slots__ = ()
+
     def __init__(self):
         super().__init__()
 
-class BaseReferenceResource(BaseResource):
+class BaseContainedResource(BaseResource, AbstractContainedResource):
     """
-    All REST Resources or URL endpoints should extend from this or its specific sub class
-    If this resource support bulk API add methods which support bulk operation in
-    bulk_operations list. Use following operations - POST, PUT etc.
+        This is a resource which is used inside a resource but can never be referenced independently.
+        This is a marker base class at this point, to make it easy to identify this kind of resources
     """
+
+class AbstractReferenceResource(AbstractResource):
+    """ Base of BaseReferenceResource and of the compact resources, see AbstractResource """
+    __slots__ = ()
     bulk_operations = []
 
+    # subclasses are registered as the resource class of their FMC type, see resource_from_json,
+    # the base classes which aren't FMC types are defined with register=False
+    def __init_subclass__(cls, register=True, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if register:
+            register_resource_type(cls)
+
     def __init__(self, id=None):
         self.id = id
         self.type = self.__class__.__name__
@@ -146,11 +407,24 @@ class BaseReferenceResource(BaseResource):
         """ The URL representing this REST Endpoint/Resource"""
         return self._get_api_base() + '/' + self._get_resource_suffix()
 
-class NamedResource(BaseReferenceResource):
+class BaseReferenceResource(BaseResource, AbstractReferenceResource, register=False):
+    """
+    All REST Resources or URL endpoints should extend from this or its specific sub class
+    If this resource support bulk API add methods which support bulk operation in
+    bulk_operations list. Use following operations - POST, PUT etc.
+    """
+
+class AbstractNamedResource(AbstractReferenceResource, register=False):
+    """ Base of NamedResource and of the compact resources, see AbstractResource """
+    __slots__ = ()
+
     def __init__(self, name, id=None):
         super().__init__(id)
         self.name = name
 
+class NamedResource(BaseReferenceResource, AbstractNamedResource, register=False):
+    pass
+
 
 class ReferenceType(BaseContainedResource):
     """
@@ -158,7 +432,7 @@ class ReferenceType(BaseContainedResource):
     Used for json encoding of references to keep only data required for reference
     """
     def __init__(self, obj=None):
-        if obj and isinstance(obj, NamedResource):
+        if obj and isinstance(obj, AbstractNamedResource):
             self.type = obj.type
             self.id = obj.id
             self.name = obj.name
@@ -183,7 +457,7 @@ class Metadata(BaseContainedResource):
             self.readOnly = ReadOnly()
 
 
-class ObjectResource(NamedResource):
+class ObjectResource(NamedResource, register=False):
     def __init__(self, name, id=None):
         super().__init__(name, id)
         self.metadata = Metadata()
@@ -193,7 +467,7 @@ class ObjectResource(NamedResource):
         return self._get_api_base() + '/object/' + self._get_resource_suffix()
 
 
-class PolicyResource(NamedResource):
+class PolicyResource(NamedResource, register=False):
     def __init__(self, name, id=None):
         super().__init__(name, id)
         self.metadata = Metadata()
@@ -202,7 +476,7 @@ class PolicyResource(NamedResource):
         return self._get_api_base() + '/policy/' + self._get_resource_suffix()
 
 
-class ContainedPolicyResource(PolicyResource):
+class ContainedPolicyResource(PolicyResource, register=False):
     def __init__(self, name, container, id = None):
         super().__init__(name, id)
         self.container = container
@@ -0,0 +1,90 @@
+import threading
+import time
+from collections import OrderedDict
+from fmc_rest_client.core.codec import get_codec
+
+# seconds a cached resource is used before loading it again
+CACHE_TTL = 300
+# resources kept, the least recently used are evicted beyond it
+CACHE_MAX_SIZE = 10000
+
+
+class ResourceCache:
+    """
+        In-process cache of resource json, keyed by domain, type and id. The type is the api path of the resource
+        e.g. /api/fmc_config/v1/domain/{DOMAIN}/object/hosts, which is also unique for contained resources.
+        Entries expire after ttl seconds and the least recently used are evicted beyond max_size entries.
+        The json is kept encoded, every get returns a new copy, so changes to loaded resources don't leak into it.
+        Thread safe, a cache can be shared by the clients of different domains.
+    """
+    def __init__(self, ttl=CACHE_TTL, max_size=CACHE_MAX_SIZE):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, domain, path, id):
+        """ Returns the json of the resource or None when it isn't cached or has expired """
+        key = (domain, path, str(id))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry[0] <= time.monotonic():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            data = entry[1]
+        return get_codec().loads(data)
+
+    def put(self, domain, path, id, json_obj):
+        self.put_items(domain, path, [json_obj], id)
+
+    def put_items(self, domain, path, items, id=None):
+        """ Caches the json items, e.g. of a list page, their ids are taken from the items when id isn't given """
+        codec = get_codec()
+        entries = [((domain, path, str(id if id is not None else item['id'])), codec.dumps(item))
+                   for item in items if id is not None or item.get('id')]
+        expires_at = time.monotonic() + self.ttl
+        with self._lock:
+            for key, data in entries:
+                self._entries[key] = (expires_at, data)
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, domain, path, id):
+        with self._lock:
+            if self._entries.pop((domain, path, str(id)), None) is not None:
+                self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def reset_stats(self):
+        with self._lock:
+            self.hits = self.misses = self.evictions = self.expirations = self.invalidations = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {'size': len(self._entries), 'hits': self.hits, 'misses': self.misses,
+                    'hit_ratio': self.hits / lookups if lookups else 0.0, 'evictions': self.evictions,
+                    'expirations': self.expirations, 'invalidations': self.invalidations}
+
+    def __repr__(self):
+        return 'ResourceCache({})'.format(self.stats())
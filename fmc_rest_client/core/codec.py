@@ -0,0 +1,68 @@
+"""
+JSON codec used for the REST payloads and json_dump.
+orjson is used when it is installed, install it using 'pip install fmc_rest_client[fast]', stdlib json otherwise.
+Use set_codec to choose one explicitly.
+"""
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class StdlibJSONCodec:
+    name = 'json'
+
+    def loads(self, data):
+        """ data can be str or bytes, bytes are decoded as utf-8 (or 16/32 when it has their BOM) """
+        return json.loads(data)
+
+    def dumps(self, obj, pretty=False, default=None):
+        """ default converts the objects json doesn't support, same as in json.dumps """
+        indent = None
+        sort_keys = False
+        separators = (',', ': ')
+        if pretty:
+            indent = 2
+            sort_keys = True
+            separators = None
+        return json.dumps(obj, default=default, indent=indent, separators=separators, sort_keys=sort_keys)
+
+
+class OrjsonCodec:
+    name = 'orjson'
+
+    def __init__(self):
+        if orjson is None:
+            raise ImportError('OrjsonCodec needs orjson, install it using pip install fmc_rest_client[fast]')
+
+    def loads(self, data):
+        return orjson.loads(data)
+
+    def dumps(self, obj, pretty=False, default=None):
+        option = orjson.OPT_INDENT_2 | orjson.OPT_SORT_KEYS if pretty else 0
+        return orjson.dumps(obj, default=default, option=option).decode('utf-8')
+
+
+_codecs = {StdlibJSONCodec.name: StdlibJSONCodec, OrjsonCodec.name: OrjsonCodec}
+_codec = OrjsonCodec() if orjson is not None else StdlibJSONCodec()
+
+
+def get_codec():
+    return _codec
+
+
+def set_codec(codec):
+    """
+        Sets the codec used by all the clients, codec is either a name, 'json' or 'orjson', or an object having
+        loads and dumps same as StdlibJSONCodec.
+        Returns the codec set.
+    """
+    global _codec
+    if isinstance(codec, str):
+        if codec not in _codecs:
+            raise ValueError('Unknown JSON codec ' + codec)
+        codec = _codecs[codec]()
+    _codec = codec
+    return codec
@@ -0,0 +1,272 @@
+"""
+Export of resources to gzip compressed JSON Lines files and restore of such files, both streamed so that the
+memory used doesn't grow with the number of resources.
+"""
+import gzip
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from fmc_rest_client.core.base_clients import BULK_FETCH_LIMIT, BULK_MAX_WORKERS, BatchResult, BulkCreateResult
+from fmc_rest_client.core.base_clients import ResourceException, is_payload_error, list_items, split_bulk_payload
+from fmc_rest_client.core.base_resources import AbstractResource, ContainedPolicyResource, get_resource_type, json_dump
+from fmc_rest_client.core.codec import get_codec
+
+logger = logging.getLogger('FMC_REST_CLIENT')
+
+# owned by FMC, dropped from the json before creating the resources again
+SERVER_OWNED_ATTRS = ['id', 'metadata', 'links']
+API_DOMAIN_PATH = '/api/fmc_config/v1/domain/'
+
+
+class JsonLinesWriter:
+    """
+        Writes json objects or resources one per line to path, gzip compressed when path ends with .gz.
+        Use it in a with block, or call close.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.count = 0
+        if path.endswith('.gz'):
+            self._file = gzip.open(path, 'wt', encoding='utf-8')
+        else:
+            self._file = open(path, 'w', encoding='utf-8')
+
+    def write(self, obj):
+        if isinstance(obj, AbstractResource):
+            line = json_dump(obj, pretty=False)
+        else:
+            line = get_codec().dumps(obj)
+        self._file.write(line)
+        self._file.write('\n')
+        self.count += 1
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+def read_json_lines(path):
+    """ Yields the json objects of a file written by JsonLinesWriter, one line at a time """
+    opener = gzip.open if path.endswith('.gz') else open
+    codec = get_codec()
+    with opener(path, 'rt', encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                yield codec.loads(line)
+
+
+def export_resources(rest_client, resources, path):
+    """
+        Writes the resources of the types of resources, e.g. [Host(), Network()], to path as JSON Lines, as FMC
+        sent them. The pages are parsed as they are received and each item is written as soon as it is parsed.
+        Returns the number of resources written.
+    """
+    if not isinstance(resources, list):
+        resources = [resources]
+    with JsonLinesWriter(path) as writer:
+        for resource in resources:
+            start = writer.count
+            for item in list_items(rest_client, resource):
+                writer.write(item)
+            logger.info('Exported %s %s resources', writer.count - start, resource.type)
+        return writer.count
+
+
+class RestoreResult:
+    """
+        Outcome of restore_resources, the number of resources created and of the ones skipped as their name
+        exists, and a BatchResult with the json for each one which failed.
+    """
+    def __init__(self):
+        self.created = 0
+        self.existing = 0
+        self.failed = []
+
+    def __repr__(self):
+        return 'RestoreResult(created={}, existing={}, failed={})'.format(self.created, self.existing,
+                                                                        len(self.failed))
+
+
+def strip_server_owned(json_obj, attrs=SERVER_OWNED_ATTRS):
+    """ Returns json_obj without the attributes set by FMC, id, metadata and links """
+    return {key: value for key, value in json_obj.items() if key not in attrs}
+
+
+def _remap_references(value, new_ids):
+    """ Replaces the ids of the references to restored resources with their new ids """
+    if isinstance(value, dict):
+        if 'id' in value and value['id'] in new_ids:
+            value['id'] = new_ids[value['id']]
+        for child in value.values():
+            if isinstance(child, (dict, list)):
+                _remap_references(child, new_ids)
+    elif isinstance(value, list):
+        for child in value:
+            if isinstance(child, (dict, list)):
+                _remap_references(child, new_ids)
+
+
+def _path_from_links(json_obj):
+    """
+        Api path of the type of json_obj taken from its links.self, for the types having no resource class,
+        e.g. /api/fmc_config/v1/domain/{DOMAIN}/object/fqdns. None if it has no such link.
+    """
+    links = json_obj.get('links')
+    link = links.get('self') if isinstance(links, dict) else None
+    if not link or API_DOMAIN_PATH not in link:
+        return None
+    # <domain uuid>/<type path>/<id>
+    parts = link[link.index(API_DOMAIN_PATH) + len(API_DOMAIN_PATH):].split('?')[0].split('/')
+    if len(parts) < 3 or parts[-1] != json_obj.get('id'):
+        return None
+    return API_DOMAIN_PATH + '{DOMAIN}/' + '/'.join(parts[1:-1])
+
+
+class _RestoreType:
+    """ Where and how the json of a type is posted, from its resource class when registered """
+    def __init__(self, json_obj, container):
+        self.cls = get_resource_type(json_obj.get('type'))
+        self.prototype = None
+        self.url_path = None
+        self.bulk = False
+        self.error = None
+        if self.cls is None:
+            self.url_path = _path_from_links(json_obj)
+            if self.url_path is None:
+                self.error = 'Unknown type ' + str(json_obj.get('type'))
+            return
+        self.prototype = self.cls(json_obj.get('name'))
+        if isinstance(self.prototype, ContainedPolicyResource):
+            if container is None or not container.id:
+                self.error = 'No container to restore ' + str(json_obj.get('type')) + ' in'
+                return
+            self.prototype.container = container
+        self.url_path = self.prototype.get_api_path()
+        self.bulk = 'POST' in self.cls.bulk_operations
+
+    def find_id(self, rest_client, name):
+        """ Id of the existing resource having name, None if it can't be looked up """
+        if self.prototype is None:
+            return None
+        found = rest_client.get_by_name(self.prototype, name)
+        return found.id if found is not None else None
+
+
+def _post_single(rest_client, url_path, item):
+    result = BulkCreateResult()
+    try:
+        result.created.append(rest_client.post(url_path, get_codec().dumps(item)))
+    except ResourceException as e:
+        if e.code == ResourceException.NAME_EXISTS:
+            result.existing.append(item)
+        else:
+            result.failed.append(BatchResult(item, error=e))
+    except Exception as e:
+        result.failed.append(BatchResult(item, error=e))
+    return result
+
+
+def _post_bulk(rest_client, url_path, items, payload=None):
+    """ Same as FMCBaseRestClient._bulk_create_recovering for json items, a failing chunk is split on payload errors """
+    if len(items) == 1:
+        return _post_single(rest_client, url_path.split('?')[0], items[0])
+    result = BulkCreateResult()
+    try:
+        if payload is None:
+            payload = get_codec().dumps(items)
+        result.created.extend(rest_client.post(url_path, payload)['items'])
+    except Exception as e:
+        if is_payload_error(e):
+            middle = len(items) // 2
+            result.extend(_post_bulk(rest_client, url_path, items[:middle]))
+            result.extend(_post_bulk(rest_client, url_path, items[middle:]))
+        else:
+            result.failed.extend([BatchResult(item, error=e) for item in items])
+    return result
+
+
+def _post_items(rest_client, restore_type, items, bulk_limit, max_workers):
+    """ Creates the json items, returns a BulkCreateResult of json """
+    if restore_type.bulk:
+        url_path = restore_type.url_path + '?bulk=true'
+        chunks = split_bulk_payload(items, bulk_limit)
+        post = lambda chunk: _post_bulk(rest_client, url_path, *chunk)
+    else:
+        chunks = items
+        post = lambda item: _post_single(rest_client, restore_type.url_path, item)
+    result = BulkCreateResult()
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for chunk_result in executor.map(post, chunks):
+            result.extend(chunk_result)
+    return result
+
+
+def restore_resources(rest_client, path, container=None, bulk_limit=BULK_FETCH_LIMIT, max_workers=BULK_MAX_WORKERS):
+    """
+        Creates the resources of a file written by export_resources or JsonLinesWriter, reading it one line at a
+        time. The json is posted as it was exported less the server owned attributes, so attributes the resource
+        classes don't have are kept. Resources are created in chunks of bulk_limit, using bulk POST when their type
+        supports it, a failing chunk is split to isolate the failing resources.
+        The resource class registered for the type gives the api path, for a type without one the path is taken
+        from links.self of the exported json.
+        References to the resources restored before, e.g. the hosts of a network group exported after them, are
+        changed to their new ids, or to the ids of the resources having their name when these exist.
+        container is the resource to restore the contained resources in, e.g. the AccessPolicy of AccessRules,
+        without it they are reported failed.
+        Returns a RestoreResult.
+    """
+    result = RestoreResult()
+    # old id -> new id of the restored resources
+    new_ids = {}
+    # type name -> _RestoreType
+    types = {}
+    chunk = []
+    old_ids = []
+    chunk_type = None
+
+    def flush():
+        if not chunk:
+            return
+        outcome = _post_items(rest_client, chunk_type, list(chunk), bulk_limit, max_workers)
+        ids_by_name = dict(zip((item.get('name') for item in chunk), old_ids))
+        for item in outcome.created:
+            if ids_by_name.get(item.get('name')):
+                new_ids[ids_by_name[item['name']]] = item['id']
+        for item in outcome.existing:
+            if ids_by_name.get(item.get('name')):
+                existing_id = chunk_type.find_id(rest_client, item['name'])
+                if existing_id is not None:
+                    new_ids[ids_by_name[item['name']]] = existing_id
+        result.created += len(outcome.created)
+        result.existing += len(outcome.existing)
+        result.failed.extend(outcome.failed)
+        del chunk[:]
+        del old_ids[:]
+
+    for json_obj in read_json_lines(path):
+        type_name = json_obj.get('type')
+        restore_type = types.get(type_name)
+        if restore_type is None or restore_type.cls is None:
+            # types without a class can differ by path, kept only for the ones having a class
+            restore_type = _RestoreType(json_obj, container)
+            if restore_type.cls is not None:
+                types[type_name] = restore_type
+        old_id = json_obj.get('id')
+        json_obj = strip_server_owned(json_obj)
+        if restore_type.error is not None:
+            result.failed.append(BatchResult(json_obj, error=ValueError(restore_type.error)))
+            continue
+        # a chunk has resources of one type, it is created before remapping the next resource as it can refer to them
+        if chunk and (chunk_type.url_path != restore_type.url_path or len(chunk) >= bulk_limit):
+            flush()
+        _remap_references(json_obj, new_ids)
+        chunk_type = restore_type
+        chunk.append(json_obj)
+        old_ids.append(old_id)
+    flush()
+    logger.info('Restored %s', result)
+    return result
@@ -0,0 +1,138 @@
+import codecs
+import json
+import re
+
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+
+# parser states
+_START = 0       # before the top level {
+_KEY = 1         # expecting a key or } of the top level object
+_COLON = 2       # after a key
+_VALUE = 3       # expecting the value of a key
+_ITEM = 4        # expecting an item or ] of the items array
+_ITEM_SEP = 5    # after an item, expecting , or ]
+_VALUE_SEP = 6   # after a value of the top level object, expecting , or }
+_END = 7         # after the top level }
+
+
+class ItemsStreamParser:
+    """
+        Incremental parser of a json object having an array of items, like the FMC list response
+        {"items": [...], "links": {...}, "paging": {...}}
+
+        Response body is fed in chunks of bytes as it is received, each item of the array is returned as soon as
+        it is complete so that the whole body, its decoded string and the full json tree are never held together.
+        Values of the other keys are collected in fields.
+    """
+    def __init__(self, items_key='items'):
+        self.items_key = items_key
+        self.fields = {}
+        self._decoder = codecs.getincrementaldecoder('utf-8')()
+        self._json_decoder = json.JSONDecoder()
+        self._buffer = ''
+        self._pos = 0
+        self._state = _START
+        self._key = None
+
+    def feed(self, data):
+        """ Parses the next chunk of the body, returns the list of items completed by it """
+        self._buffer = self._buffer[self._pos:] + self._decoder.decode(data)
+        self._pos = 0
+        return self._parse(False)
+
+    def close(self):
+        """ Parses the rest of the body, returns the list of remaining items """
+        self._buffer = self._buffer[self._pos:] + self._decoder.decode(b'', final=True)
+        self._pos = 0
+        items = self._parse(True)
+        if self._state != _END:
+            raise ValueError('Incomplete json')
+        return items
+
+    def _decode_value(self, pos, final):
+        """ Returns the value at pos and the position after it, None for the position if value is incomplete """
+        try:
+            value, end = self._json_decoder.raw_decode(self._buffer, pos)
+        except json.JSONDecodeError:
+            if final:
+                raise
+            return None, None
+        # a number or literal at the end of the buffer may continue in the next chunk
+        if end == len(self._buffer) and not final:
+            return None, None
+        return value, end
+
+    def _parse(self, final):
+        items = []
+        buffer = self._buffer
+        while True:
+            pos = _WHITESPACE.match(buffer, self._pos).end()
+            self._pos = pos
+            if pos == len(buffer):
+                break
+            char = buffer[pos]
+            state = self._state
+            if state == _START:
+                if char != '{':
+                    raise ValueError('Expecting a json object at {}'.format(pos))
+                self._state = _KEY
+                self._pos = pos + 1
+            elif state == _KEY:
+                if char == '}' and not self.fields and self._key is None:
+                    self._state = _END
+                    self._pos = pos + 1
+                    continue
+                key, end = self._decode_value(pos, final)
+                if end is None:
+                    break
+                if not isinstance(key, str):
+                    raise ValueError('Expecting a property name at {}'.format(pos))
+                self._key = key
+                self._state = _COLON
+                self._pos = end
+            elif state == _COLON:
+                if char != ':':
+                    raise ValueError('Expecting : at {}'.format(pos))
+                self._state = _VALUE
+                self._pos = pos + 1
+            elif state == _VALUE:
+                if self._key == self.items_key and char == '[':
+                    self._state = _ITEM
+                    self._pos = pos + 1
+                    continue
+                value, end = self._decode_value(pos, final)
+                if end is None:
+                    break
+                self.fields[self._key] = value
+                self._state = _VALUE_SEP
+                self._pos = end
+            elif state == _ITEM:
+                if char == ']':
+                    self._state = _VALUE_SEP
+                    self._pos = pos + 1
+                    continue
+                item, end = self._decode_value(pos, final)
+                if end is None:
+                    break
+                items.append(item)
+                self._state = _ITEM_SEP
+                self._pos = end
+            elif state == _ITEM_SEP:
+                if char == ',':
+                    self._state = _ITEM
+                elif char == ']':
+                    self._state = _VALUE_SEP
+                else:
+                    raise ValueError('Expecting , or ] at {}'.format(pos))
+                self._pos = pos + 1
+            elif state == _VALUE_SEP:
+                if char == ',':
+                    self._state = _KEY
+                elif char == '}':
+                    self._state = _END
+                else:
+                    raise ValueError('Expecting , or } at {}'.format(pos))
+                self._pos = pos + 1
+            else:
+                raise ValueError('Extra data at {}'.format(pos))
+        return items
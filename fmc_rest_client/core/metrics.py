@@ -0,0 +1,195 @@
+import logging
+import re
+import threading
+
+logger = logging.getLogger('FMC_REST_CLIENT')
+trace_logger = logging.getLogger('FMC_REST_CLIENT.trace')
+
+# upper bounds in seconds of the latency histogram buckets, same as the Prometheus client defaults
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# FMC object ids are UUIDs, some are numbers
+_ID_SEGMENT = re.compile(r'^([0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}|\d+)$')
+
+
+def endpoint_template(url_path):
+    """
+        Endpoint of a url path as used by the resources, e.g. /api/fmc_config/v1/domain/{DOMAIN}/object/hosts/{id}
+        for a host. Ids are replaced by {id} and the query is dropped so that all calls to an endpoint are counted
+        together.
+    """
+    path = url_path.split('?', 1)[0]
+    return '/'.join('{id}' if _ID_SEGMENT.match(segment) else segment for segment in path.split('/'))
+
+
+class CallEvent:
+    """
+        What happened in a REST call, passed to the hooks of the client once the call is over.
+        endpoint is the url path before {DOMAIN} substitution with ids replaced, see endpoint_template.
+        status_code is of the last attempt, None if no response was received.
+        retries are the attempts made again after a 429 and reauths the ones made again after a 401.
+        throttle_wait is the seconds waited on the rate limiter or for a 429.
+        latency is the seconds the call took, measured with the monotonic clock, including retries and waits.
+        A streamed response is read after the call returns, its event is reported once the body is read or the
+        stream closed, latency then includes reading the body.
+        error is the exception the call failed with.
+    """
+    __slots__ = ('method', 'endpoint', 'url', 'status_code', 'bytes_sent', 'bytes_received', 'retries',
+                 'reauths', 'throttle_wait', 'latency', 'error')
+
+    def __init__(self, method, endpoint, url=None):
+        self.method = method
+        self.endpoint = endpoint
+        self.url = url
+        self.status_code = None
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.retries = 0
+        self.reauths = 0
+        self.throttle_wait = 0.0
+        self.latency = 0.0
+        self.error = None
+
+    def __repr__(self):
+        return 'CallEvent({} {} status={} latency={:.3f}s)'.format(self.method.upper(), self.endpoint,
+                                                                  self.status_code, self.latency)
+
+
+def emit(hooks, event):
+    """ Calls the hooks with the event, a failing hook is logged and doesn't fail the call """
+    for hook in hooks:
+        try:
+            hook(event)
+        except Exception:
+            logger.exception('Call hook %r failed', hook)
+
+
+class CallTracer:
+    """
+        Hook logging each call as one line of key=value pairs to the FMC_REST_CLIENT.trace logger.
+        The CallEvent is set as fmc_call on the log record, for handlers writing structured logs e.g. JSON.
+        Nothing is formatted when level isn't enabled for the logger.
+    """
+    def __init__(self, level=logging.INFO, logger=trace_logger):
+        self.level = level
+        self.logger = logger
+
+    def __call__(self, event):
+        if not self.logger.isEnabledFor(self.level):
+            return
+        self.logger.log(self.level, 'method=%s endpoint=%s status=%s latency_ms=%.1f sent=%s received=%s '
+                                    'retries=%s reauths=%s throttle_wait_ms=%.1f error=%s',
+                        event.method, event.endpoint, event.status_code, event.latency * 1000, event.bytes_sent,
+                        event.bytes_received, event.retries, event.reauths, event.throttle_wait * 1000,
+                        type(event.error).__name__ if event.error is not None else None,
+                        extra={'fmc_call': event})
+
+
+class _EndpointStats:
+    __slots__ = ('statuses', 'buckets', 'latency_sum', 'count', 'retries', 'reauths', 'throttle_wait',
+                 'bytes_sent', 'bytes_received')
+
+    def __init__(self):
+        self.statuses = {}
+        self.buckets = [0] * len(LATENCY_BUCKETS)
+        self.latency_sum = 0.0
+        self.count = 0
+        self.retries = 0
+        self.reauths = 0
+        self.throttle_wait = 0.0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+
+
+def _label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class CallMetrics:
+    """
+        Aggregates CallEvents per method and endpoint, counts by status and a latency histogram.
+        It is a hook, clients have one as metrics. Thread safe.
+    """
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, event):
+        status = str(event.status_code) if event.status_code is not None else 'error'
+        with self._lock:
+            stats = self._stats.get((event.method, event.endpoint))
+            if stats is None:
+                stats = self._stats[(event.method, event.endpoint)] = _EndpointStats()
+            stats.statuses[status] = stats.statuses.get(status, 0) + 1
+            for index, bound in enumerate(self.buckets):
+                if event.latency <= bound:
+                    stats.buckets[index] += 1
+                    break
+            stats.latency_sum += event.latency
+            stats.count += 1
+            stats.retries += event.retries
+            stats.reauths += event.reauths
+            stats.throttle_wait += event.throttle_wait
+            stats.bytes_sent += event.bytes_sent
+            stats.bytes_received += event.bytes_received or 0
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+
+    def snapshot(self):
+        """ Returns {(method, endpoint): dict of the counters}, buckets are cumulative as in Prometheus """
+        with self._lock:
+            result = {}
+            for key, stats in self._stats.items():
+                cumulative = []
+                total = 0
+                for count in stats.buckets:
+                    total += count
+                    cumulative.append(total)
+                result[key] = {'statuses': dict(stats.statuses), 'count': stats.count,
+                               'latency_sum': stats.latency_sum, 'buckets': list(zip(self.buckets, cumulative)),
+                               'retries': stats.retries, 'reauths': stats.reauths,
+                               'throttle_wait': stats.throttle_wait, 'bytes_sent': stats.bytes_sent,
+                               'bytes_received': stats.bytes_received}
+            return result
+
+    def prometheus_text(self, prefix='fmc_rest_client'):
+        """ The metrics in Prometheus text exposition format """
+        snapshot = self.snapshot()
+        lines = []
+
+        def metric(name, metric_type, help_text):
+            lines.append('# HELP {}_{} {}'.format(prefix, name, help_text))
+            lines.append('# TYPE {}_{} {}'.format(prefix, name, metric_type))
+
+        def labels(method, endpoint, **extra):
+            pairs = [('method', method), ('endpoint', endpoint)] + sorted(extra.items())
+            return '{' + ','.join('{}="{}"'.format(key, _label(value)) for key, value in pairs) + '}'
+
+        metric('requests_total', 'counter', 'REST calls by method, endpoint and HTTP status.')
+        for (method, endpoint), stats in sorted(snapshot.items()):
+            for status, count in sorted(stats['statuses'].items()):
+                lines.append('{}_requests_total{} {}'.format(prefix, labels(method, endpoint, status=status), count))
+        metric('request_duration_seconds', 'histogram', 'Latency of REST calls including retries and waits.')
+        for (method, endpoint), stats in sorted(snapshot.items()):
+            for bound, count in stats['buckets']:
+                lines.append('{}_request_duration_seconds_bucket{} {}'.format(
+                    prefix, labels(method, endpoint, le=repr(float(bound))), count))
+            lines.append('{}_request_duration_seconds_bucket{} {}'.format(
+                prefix, labels(method, endpoint, le='+Inf'), stats['count']))
+            lines.append('{}_request_duration_seconds_sum{} {}'.format(
+                prefix, labels(method, endpoint), repr(stats['latency_sum'])))
+            lines.append('{}_request_duration_seconds_count{} {}'.format(
+                prefix, labels(method, endpoint), stats['count']))
+        for name, key, help_text in [('retries_total', 'retries', 'Attempts made again after 429.'),
+                                     ('reauths_total', 'reauths', 'Attempts made again after 401.'),
+                                     ('throttle_wait_seconds_total', 'throttle_wait',
+                                      'Seconds waited on the rate limiter or for 429.'),
+                                     ('bytes_sent_total', 'bytes_sent', 'Request body bytes sent.'),
+                                     ('bytes_received_total', 'bytes_received', 'Response body bytes received.')]:
+            metric(name, 'counter', help_text)
+            for (method, endpoint), stats in sorted(snapshot.items()):
+                lines.append('{}_{}{} {}'.format(prefix, name, labels(method, endpoint), stats[key]))
+        return '\n'.join(lines) + '\n'
@@ -0,0 +1,87 @@
+import threading
+import time
+from fmc_rest_client.core.base_resources import ContainedPolicyResource
+
+
+class NameIndex:
+    """
+        Resources of a type in a domain by name, see FMCBaseRestClient.name_index.
+        resource is the resource the index was built for, the indexed resources are of its class and have its
+        container for the contained resources like AccessRule.
+        Built from one list of the type and kept current with the creates, updates and removes made through the
+        client which built it. Changes made by others are seen only after a refresh, built_at is the monotonic time
+        of the last build.
+        Thread safe.
+    """
+    def __init__(self, resource):
+        self.resource = resource
+        self.built_at = None
+        self._by_name = {}
+        # id -> name, to find the old name when a resource gets renamed
+        self._names = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._by_name)
+
+    def __contains__(self, name):
+        return name in self._by_name
+
+    def get(self, name):
+        """ Returns the resource having name or None """
+        return self._by_name.get(name)
+
+    def get_id(self, name):
+        resource = self._by_name.get(name)
+        return resource.id if resource is not None else None
+
+    def names(self):
+        return list(self._by_name)
+
+    def add(self, resource):
+        """ Adds or replaces the resource, a resource renamed since it was added is moved to its new name """
+        with self._lock:
+            self._add(resource)
+
+    def add_json(self, items):
+        """ Adds the resources of the json items, e.g. of a create or update response """
+        resources = []
+        for item in items:
+            if item.get('id') and item.get('name') is not None:
+                resource = self.resource.__class__(item['name'])
+                resource.json_load(item)
+                resources.append(self._contained(resource))
+        with self._lock:
+            for resource in resources:
+                self._add(resource)
+
+    def _contained(self, resource):
+        if isinstance(self.resource, ContainedPolicyResource):
+            resource.container = self.resource.container
+        return resource
+
+    def _add(self, resource):
+        old_name = self._names.get(resource.id)
+        if old_name is not None and old_name != resource.name:
+            self._by_name.pop(old_name, None)
+        self._by_name[resource.name] = resource
+        self._names[resource.id] = resource.name
+
+    def discard(self, id):
+        """ Removes the resource having id if indexed """
+        with self._lock:
+            name = self._names.pop(id, None)
+            if name is not None and name in self._by_name and self._by_name[name].id == id:
+                del self._by_name[name]
+
+    def rebuild(self, resources):
+        """ Replaces the indexed resources, e.g. with the ones listed from FMC """
+        by_name = {}
+        names = {}
+        for resource in resources:
+            by_name[resource.name] = self._contained(resource)
+            names[resource.id] = resource.name
+        with self._lock:
+            self._by_name = by_name
+            self._names = names
+            self.built_at = time.monotonic()
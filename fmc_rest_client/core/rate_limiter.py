@@ -0,0 +1,60 @@
+import asyncio
+import threading
+import time
+
+# FMC allows 120 REST calls per minute per user
+FMC_RATE_LIMIT = 120
+FMC_RATE_BURST = 10
+
+
+class RateLimiter:
+    """
+        Token bucket rate limiter, rate is the number of requests per minute and burst the max requests
+        which can go without waiting after an idle period.
+        Thread safe, same instance can be shared by threads, coroutines and clients using the same FMC user.
+    """
+    def __init__(self, rate=FMC_RATE_LIMIT, burst=FMC_RATE_BURST):
+        if rate <= 0 or burst < 1:
+            raise ValueError('Rate and burst should be positive.')
+        self.rate = rate
+        self.burst = burst
+        self._tokens_per_sec = rate / 60.0
+        self._tokens = float(burst)
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self._tokens = min(self.burst, self._tokens + (now - self._updated_at) * self._tokens_per_sec)
+        self._updated_at = now
+
+    def reserve(self):
+        """ Takes a token, returns the seconds to wait before using it """
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens -= 1
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self._tokens_per_sec
+
+    def pause(self, seconds):
+        """
+            Makes all callers wait at least for given seconds, e.g. when server asks to retry after some time.
+            Pauses asked at the same time, e.g. by the threads all getting 429, don't add up.
+        """
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens = min(self._tokens, -seconds * self._tokens_per_sec)
+
+    def acquire(self):
+        """ Blocks till a request can be made, returns the seconds waited """
+        wait = self.reserve()
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    async def acquire_async(self):
+        """ Same as acquire but for asyncio """
+        wait = self.reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return wait
@@ -0,0 +1,178 @@
+"""
+Durable snapshot of the resources listed from FMC, kept in a SQLite database so that it outlives the process.
+"""
+import sqlite3
+import threading
+import time
+from fmc_rest_client.core.base_resources import ContainedPolicyResource
+from fmc_rest_client.core.codec import get_codec
+
+# rows read at a time when iterating a type
+SNAPSHOT_FETCH_SIZE = 1000
+
+_SCHEMA = [
+    'CREATE TABLE IF NOT EXISTS resources (domain TEXT NOT NULL, path TEXT NOT NULL, id TEXT NOT NULL, '
+    'type TEXT, name TEXT, json TEXT NOT NULL, stored_at REAL NOT NULL, PRIMARY KEY (domain, path, id))',
+    'CREATE INDEX IF NOT EXISTS resources_name ON resources (domain, path, name)',
+    'CREATE INDEX IF NOT EXISTS resources_type ON resources (domain, type)',
+]
+
+
+class SnapshotStore:
+    """
+        Resources json in a SQLite database, keyed by domain, type and id same as ResourceCache, the type being the
+        api path of the resource e.g. /api/fmc_config/v1/domain/{DOMAIN}/object/hosts.
+        Clients given one as snapshot_store write the resources they list, create and update into it and drop the
+        ones they remove, so a restarted process can read what it knew from it without listing FMC again.
+        A complete list of a type through the client, e.g. list with no offset and limit or iterating list_iterator
+        till the end, also drops the stored resources of the type it didn't return, like the ones removed by others.
+        Resources removed by others stay till then. The clients don't read from the store, read it with load,
+        load_by_name and list.
+        Lookups by id, name and type are served by indexes, iterating a type reads it in batches, nothing is loaded
+        whole in memory. See stored_at for how fresh a type is, ResourceSync finds what changed.
+        path is the database file, ':memory:' for a store not kept on disk. Thread safe.
+    """
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('PRAGMA synchronous=NORMAL')
+        for statement in _SCHEMA:
+            self._db.execute(statement)
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    ######## Writes, same as ResourceCache ###########
+    def put(self, domain, path, id, json_obj):
+        self.put_items(domain, path, [json_obj], id)
+
+    def put_items(self, domain, path, items, id=None):
+        """ Stores the json items, e.g. of a list page, their ids are taken from the items when id isn't given """
+        codec = get_codec()
+        stored_at = time.time()
+        rows = [(domain, path, str(id if id is not None else item['id']), item.get('type'), item.get('name'),
+                 codec.dumps(item), stored_at)
+                for item in items if id is not None or item.get('id')]
+        with self._lock:
+            # one transaction per page, not per row
+            self._db.execute('BEGIN')
+            try:
+                self._db.executemany('INSERT OR REPLACE INTO resources VALUES (?, ?, ?, ?, ?, ?, ?)', rows)
+            except Exception:
+                self._db.execute('ROLLBACK')
+                raise
+            self._db.execute('COMMIT')
+
+    def invalidate(self, domain, path, id):
+        """ Drops the resource """
+        with self._lock:
+            self._db.execute('DELETE FROM resources WHERE domain = ? AND path = ? AND id = ?', (domain, path, str(id)))
+
+    def prune(self, domain, path, stored_before):
+        """
+            Drops the resources of the type at path stored before stored_before, time.time(). Called by the clients
+            with the time a complete list of the type started, to drop the ones it didn't return.
+        """
+        with self._lock:
+            self._db.execute('DELETE FROM resources WHERE domain = ? AND path = ? AND stored_at < ?',
+                             (domain, path, stored_before))
+
+    def clear(self, domain=None, path=None):
+        """ Drops all the resources, or the ones of domain, or of the type at path in domain """
+        query = 'DELETE FROM resources'
+        params = ()
+        if domain is not None:
+            query, params = self._where(query, domain, path)
+        with self._lock:
+            self._db.execute(query, params)
+
+    ######## Reads of json ###########
+    def get(self, domain, path, id):
+        """ Returns the json of the resource or None """
+        return self._one('SELECT json FROM resources WHERE domain = ? AND path = ? AND id = ?',
+                         (domain, path, str(id)))
+
+    def get_by_name(self, domain, path, name):
+        return self._one('SELECT json FROM resources WHERE domain = ? AND path = ? AND name = ?',
+                         (domain, path, name))
+
+    def items(self, domain, path=None, type=None):
+        """
+            Yields the json of the resources of the type at path, or of type e.g. 'Host' in all the paths, or of all
+            the types, in domain. Read SNAPSHOT_FETCH_SIZE at a time.
+        """
+        query, params = self._where('SELECT path, id, json FROM resources', domain, path)
+        if type is not None:
+            query += ' AND type = ?'
+            params += (type,)
+        # pages by the last key read, no cursor is kept open between them
+        query += ' AND (path, id) > (?, ?) ORDER BY path, id LIMIT ' + str(SNAPSHOT_FETCH_SIZE)
+        codec = get_codec()
+        last_key = ('', '')
+        while True:
+            with self._lock:
+                rows = self._db.execute(query, params + last_key).fetchall()
+            for _, _, data in rows:
+                yield codec.loads(data)
+            if len(rows) < SNAPSHOT_FETCH_SIZE:
+                break
+            last_key = rows[-1][:2]
+
+    def count(self, domain=None, path=None):
+        query = 'SELECT COUNT(*) FROM resources'
+        params = ()
+        if domain is not None:
+            query, params = self._where(query, domain, path)
+        with self._lock:
+            return self._db.execute(query, params).fetchone()[0]
+
+    def stored_at(self, domain, path):
+        """ Unix time the oldest resource of the type at path was stored, None if none is """
+        with self._lock:
+            return self._db.execute('SELECT MIN(stored_at) FROM resources WHERE domain = ? AND path = ?',
+                                    (domain, path)).fetchone()[0]
+
+    ######## Reads of resources ###########
+    # resource is a resource of the type to read, e.g. Host() or AccessRule(container=policy)
+    def load(self, resource, domain='default'):
+        """ Returns a new resource loaded from the stored json of resource.id, None if not stored """
+        return self._resource(resource, self.get(domain, resource.get_api_path(), resource.id))
+
+    def load_by_name(self, resource, name, domain='default'):
+        return self._resource(resource, self.get_by_name(domain, resource.get_api_path(), name))
+
+    def list(self, resource, domain='default'):
+        """ Yields the stored resources of the type of resource """
+        for json_obj in self.items(domain, resource.get_api_path()):
+            yield self._resource(resource, json_obj)
+
+    ######## Helpers ###########
+    @staticmethod
+    def _where(query, domain, path):
+        if path is None:
+            return query + ' WHERE domain = ?', (domain,)
+        return query + ' WHERE domain = ? AND path = ?', (domain, path)
+
+    def _one(self, query, params):
+        with self._lock:
+            row = self._db.execute(query, params).fetchone()
+        return get_codec().loads(row[0]) if row is not None else None
+
+    @staticmethod
+    def _resource(resource, json_obj):
+        if json_obj is None:
+            return None
+        obj = resource.__class__(json_obj.get('name'))
+        obj.json_load(json_obj)
+        if isinstance(resource, ContainedPolicyResource):
+            obj.container = resource.container
+        return obj
@@ -0,0 +1,131 @@
+import hashlib
+import logging
+import threading
+from fmc_rest_client.core.base_clients import ResourceException, _load_list_items, list_items
+from fmc_rest_client.core.codec import get_codec
+
+logger = logging.getLogger('FMC_REST_CLIENT')
+
+# seconds between the syncs of ResourceSync.watch
+WATCH_INTERVAL = 60
+
+
+def resource_version(json_obj):
+    """
+        Version of a resource json to detect its changes, metadata.timestamp when FMC sends it, else a digest
+        of the json.
+    """
+    metadata = json_obj.get('metadata')
+    if isinstance(metadata, dict) and metadata.get('timestamp') is not None:
+        return metadata['timestamp']
+    return hashlib.sha1(get_codec().dumps(json_obj).encode('utf-8')).hexdigest()
+
+
+class SyncDelta:
+    """
+        Changes found by a ResourceSync, added and modified are the resources as listed now, removed are the
+        resources of the previous snapshot which are gone.
+    """
+    def __init__(self):
+        self.added = []
+        self.modified = []
+        self.removed = []
+
+    def __len__(self):
+        return len(self.added) + len(self.modified) + len(self.removed)
+
+    def __bool__(self):
+        return len(self) > 0
+
+    def __repr__(self):
+        return 'SyncDelta(added={}, modified={}, removed={})'.format(len(self.added), len(self.modified),
+                                                                     len(self.removed))
+
+
+class ResourceSync:
+    """
+        Incremental sync of the resources of a type, e.g. of all the hosts or of the rules of an access policy.
+        Keeps a snapshot of them, resources by id and their versions, see resource_version. Each sync lists the
+        type again, parsing the pages as they are received, and builds resources only for the items added or
+        modified since the previous sync, the unchanged items are never turned into resources.
+        The first sync returns all the resources as added.
+        Resources deleted on the server while listing shift the pages and can make others be missed, with
+        confirm_removed True, the default, the ones missing from the listing are checked with a GET before reporting
+        them removed.
+    """
+    def __init__(self, rest_client, resource, lazy=False, confirm_removed=True):
+        self.rest_client = rest_client
+        self.resource = resource
+        self.lazy = lazy
+        self.confirm_removed = confirm_removed
+        # id -> resource and id -> version, as of the last sync
+        self.resources = {}
+        self.versions = {}
+        self.sync_count = 0
+
+    def sync(self):
+        """
+            Lists the type and updates the snapshot, returns the SyncDelta since the previous sync.
+            The snapshot is replaced only once the sync completes, a sync failing midway leaves it as it was.
+        """
+        delta = SyncDelta()
+        # the snapshot being built, id -> resource and id -> version
+        resources = {}
+        versions = {}
+        for item in self._listed_items():
+            id = item.get('id')
+            if id is None or id in versions:  # pages shifted by resources created while listing
+                continue
+            self._apply(id, item, delta, resources, versions)
+        missing = [id for id in self.versions if id not in versions]
+        for id in missing:
+            item = self._load_missing(id) if self.confirm_removed else None
+            if item is None:
+                delta.removed.append(self.resources[id])
+            else:
+                self._apply(id, item, delta, resources, versions)
+        self.resources = resources
+        self.versions = versions
+        self.sync_count += 1
+        logger.debug('Sync of %s found %s', self.resource.get_api_path(), delta)
+        return delta
+
+    def watch(self, interval=WATCH_INTERVAL, stop=None, include_empty=False):
+        """
+            Generator syncing every interval seconds, yields the deltas having changes, or all of them with
+            include_empty True. The first one has all the resources as added.
+            Iterates till the caller stops or stop, a threading.Event, is set.
+        """
+        if stop is None:
+            stop = threading.Event()
+        while not stop.is_set():
+            delta = self.sync()
+            if delta or include_empty:
+                yield delta
+            stop.wait(interval)
+
+    def _apply(self, id, item, delta, resources, versions):
+        version = resource_version(item)
+        old_version = self.versions.get(id)
+        versions[id] = version
+        if old_version == version:
+            resources[id] = self.resources[id]
+            return
+        resource = _load_list_items(self.resource, [item], self.lazy)[0]
+        if old_version is None:
+            delta.added.append(resource)
+        else:
+            delta.modified.append(resource)
+        resources[id] = resource
+
+    def _load_missing(self, id):
+        """ Returns the json of the resource or None when it doesn't exist anymore """
+        try:
+            return self.rest_client.rest_call('get', self.resource.get_api_path() + '/' + id)
+        except ResourceException as e:
+            if e.status_code == 404:
+                return None
+            raise e
+
+    def _listed_items(self):
+        return list_items(self.rest_client, self.resource)
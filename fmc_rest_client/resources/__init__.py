@@ -2,3 +2,4 @@ from fmc_rest_client.resources.objects import *
 from fmc_rest_client.resources.access_policy import *
 from fmc_rest_client.resources.ftdnat_policy import *
 
+from fmc_rest_client.resources.compact import *
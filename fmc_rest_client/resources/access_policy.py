@@ -82,7 +82,8 @@ class AccessRule(ContainedPolicyResource):
 
     def json_load(self, json):
         super().json_load(json)
-        if self.metadata.accessPolicy.id:
+        # json without metadata, e.g. restored from an export, has no policy reference
+        if getattr(self.metadata.accessPolicy, 'id', None):
             self.container = AccessPolicy()
             self.container.id = self.metadata.accessPolicy.id
 
@@ -0,0 +1,165 @@
+"""
+Compact variants of the resource types which are found in large numbers, like Host or AccessRule.
+These use __slots__ instead of a per instance __dict__, including for the nested metadata, and take
+a fraction of the memory of the regular classes. They serialize and load the same way, using
+json_dump and json_load, and can be used with the REST client in place of the regular classes, e.g.
+
+    hosts = fmc.list(CompactHost())
+
+Differences from the regular classes -
+ * attributes not listed in __slots__ can't be set
+ * criteria of CompactAccessRule, like sourceNetworks, are None instead of empty dicts when not set
+ * lazy listing returns the loaded resources right away
+ * they extend the slotted AbstractNamedResource and AbstractContainedResource, not NamedResource or
+   BaseContainedResource which keep a __dict__
+"""
+from fmc_rest_client.core.base_resources import *
+from fmc_rest_client.resources.access_policy import AccessPolicy
+
+
+class CompactReference(AbstractContainedResource):
+    """ ReferenceType with __slots__ """
+    __slots__ = ('type', 'id', 'name')
+
+    def __init__(self, obj=None):
+        self.type = None
+        self.id = None
+        self.name = None
+        if obj and isinstance(obj, AbstractNamedResource):
+            self.type = obj.type
+            self.id = obj.id
+            self.name = obj.name
+
+    def json_load(self, json):
+        for key in ['id', 'name', 'type']:
+            if key in json:
+                setattr(self, key, json[key])
+
+
+class CompactReadOnly(AbstractContainedResource):
+    __slots__ = ('state', 'reason')
+
+    def __init__(self, state=False, reason=None):
+        self.state = state
+        self.reason = reason
+
+
+class CompactMetadata(AbstractContainedResource):
+    __slots__ = ('timestamp', 'domain', 'readOnly')
+    reference_class = CompactReference
+
+    def __init__(self, timestamp=0, domain=None, readOnly=None):
+        self.timestamp = timestamp
+        self.domain = domain
+        self.readOnly = readOnly if readOnly else CompactReadOnly()
+
+
+class CompactAccessRuleMetadata(CompactMetadata):
+    __slots__ = ('accessPolicy', 'section', 'category', 'ruleIndex')
+
+    def __init__(self, ruleIndex=-1, accessPolicy=None, domain=None, readOnly=None):
+        super().__init__(0, domain, readOnly)
+        #set so that json_load can find the type
+        self.accessPolicy = accessPolicy if accessPolicy else CompactReference()
+        self.section = 'Mandatory'
+        self.category = None
+        self.ruleIndex = ruleIndex
+
+
+class CompactObjectResource(AbstractNamedResource, register=False):
+    """
+    Base for compact object resources, fmc_type is the FMC type of the resource which is the
+    name of the regular resource class.
+    """
+    __slots__ = ('id', 'type', 'name', 'metadata')
+    fmc_type = None
+    reference_class = CompactReference
+
+    def __init__(self, name=None, id=None):
+        super().__init__(name, id)
+        self.type = self.fmc_type
+        self.metadata = CompactMetadata()
+
+    def get_api_path(self):
+        return self._get_api_base() + '/object/' + self._get_resource_suffix()
+
+
+class CompactHost(CompactObjectResource, register=False):
+    __slots__ = ('value',)
+    fmc_type = 'Host'
+    bulk_operations = ['POST']
+
+    def __init__(self, name=None, value=None):
+        super().__init__(name)
+        self.value = value
+
+
+class CompactNetwork(CompactObjectResource, register=False):
+    __slots__ = ('value',)
+    fmc_type = 'Network'
+    bulk_operations = ['POST']
+
+    def __init__(self, name=None, value=None):
+        super().__init__(name)
+        self.value = value
+
+
+class CompactRange(CompactObjectResource, register=False):
+    __slots__ = ('value',)
+    fmc_type = 'Range'
+    bulk_operations = ['POST']
+
+    def __init__(self, name=None, value=None):
+        super().__init__(name)
+        self.value = value
+
+
+class CompactProtocolPortObject(CompactObjectResource, register=False):
+    __slots__ = ('protocol', 'description', 'port')
+    fmc_type = 'ProtocolPortObject'
+    bulk_operations = ['POST']
+
+    def __init__(self, name=None, protocol='tcp', port='1-65535', desc=None):
+        super().__init__(name)
+        self.protocol = protocol
+        self.description = desc
+        self.port = port
+
+
+class CompactAccessRule(AbstractNamedResource, register=False):
+    __slots__ = ('id', 'type', 'name', 'metadata', 'container', 'action', 'sendEventsToFMC', 'logBegin', 'logEnd',
+                 'enabled', 'newComments', 'sourceZones', 'destinationZones', 'sourceNetworks', 'destinationNetworks',
+                 'sourcePorts', 'destinationPorts')
+    bulk_operations = ['POST']
+    reference_class = CompactReference
+
+    def __init__(self, name=None, container=None):
+        super().__init__(name)
+        self.type = 'AccessRule'
+        self.container = container
+        self.action = 'ALLOW'
+        self.sendEventsToFMC = False
+        self.logBegin = False
+        self.logEnd = False
+        self.enabled = True
+        self.newComments = None
+        self.sourceZones = None
+        self.destinationZones = None
+        self.sourceNetworks = None
+        self.destinationNetworks = None
+        self.sourcePorts = None
+        self.destinationPorts = None
+        self.metadata = CompactAccessRuleMetadata()
+
+    def get_api_path(self):
+        return self.container.get_api_path() + '/' + self.container.id + '/' + self._get_resource_suffix()
+
+    @staticmethod
+    def json_ignore_attrs():
+        return ['container']
+
+    def json_load(self, json):
+        super().json_load(json)
+        if self.metadata.accessPolicy.id:
+            self.container = AccessPolicy()
+            self.container.id = self.metadata.accessPolicy.id
@@ -1,6 +1,8 @@
 from fmc_rest_client.core.base_resources import *
 
-class ObjectGroupResource(ObjectResource):
+class ObjectGroupResource(ObjectResource, register=False):
+    typed_list_attrs = ['objects']
+
     def __init__(self, name=None, objects=None, id=None):
         super().__init__(name, id)
         if objects is None:
@@ -50,7 +52,7 @@ class NetworkGroup(ObjectGroupResource):
         super().__init__(name, objects)
 
 
-class Port(ObjectResource):
+class Port(ObjectResource, register=False):
     def __init__(self, name=None, protocol=None, desc=None):
         super().__init__(name)
         self.protocol = protocol
@@ -64,7 +66,7 @@ class ProtocolPortObject(Port):
         self.port = port
 
 
-class ICMPPortObject(Port):
+class ICMPPortObject(Port, register=False):
     def __init__(self, name=None, protocol=None, type=None, code=None, desc=None):
         super().__init__(name, protocol, desc)
         self.icmpType = type
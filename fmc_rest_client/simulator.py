@@ -0,0 +1,505 @@
+"""
+Local stand-in for the FMC REST API, to run the client, samples and benchmarks without a real FMC.
+
+It implements the part of the API the client uses -
+ * generatetoken and refreshtoken, tokens expire and bad or expired tokens get 401
+ * list with offset, limit and expanded, returning the paging block, and 404 when the list is empty
+ * POST of a single object or a list with ?bulk=true, GET, PUT and DELETE by id
+ * 429 when a user makes more than rate_limit calls in a minute or more than max_concurrent calls are in progress
+ * 400 for duplicate or invalid names, 413 for too large bulk payloads
+ * gzip responses and gzip request bodies
+Objects are kept in memory per collection, e.g. 'object/hosts' or 'policy/accesspolicies/<id>/accessrules',
+any collection path is accepted.
+
+In a script or test
+
+    with FMCSimulator(latency=0.01) as sim:
+        sim.add_objects('object/hosts', [{'name': 'h1', 'type': 'Host', 'value': '1.1.1.1'}])
+        fmc = FMCRestClient(sim.url, 'admin', 'admin')
+
+or from the command line, then pass http://127.0.0.1:8080 as the FMC server url to the samples
+
+    python -m fmc_rest_client.simulator --port 8080 --latency 0.05 --hosts 5000
+
+Only plain HTTP is served.
+"""
+import argparse
+import base64
+import copy
+import gzip
+import json
+import logging
+import math
+import random
+import re
+import threading
+import time
+import uuid
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+logger = logging.getLogger('FMC_SIMULATOR')
+
+API_AUTH_PATH = '/api/fmc_platform/v1/auth/generatetoken'
+API_REFRESH_PATH = '/api/fmc_platform/v1/auth/refreshtoken'
+API_CONFIG_PATH = re.compile(r'^/api/fmc_config/v1/domain/([^/]+)/(.+?)/?$')
+GLOBAL_DOMAIN = {'name': 'Global', 'id': 'e276abec-e0f2-11e3-8169-6d9ed49b625f', 'type': 'Domain'}
+# characters FMC accepts in object names
+OBJECT_NAME = re.compile(r'^[\w .+\-]+$')
+
+# defaults same as FMC
+TOKEN_LIFETIME = 30 * 60
+TOKEN_MAX_REFRESH = 3
+RATE_LIMIT = 120
+MAX_CONCURRENT = 10
+DEFAULT_PAGE_SIZE = 25
+MAX_PAGE_SIZE = 1000
+BULK_LIMIT = 1000
+MAX_PAYLOAD = 2048000
+
+
+def _error(description):
+    return {'error': {'category': 'FRAMEWORK', 'messages': [{'description': description}], 'severity': 'ERROR'}}
+
+
+class _Token:
+    def __init__(self, username, lifetime, refresh_count=0):
+        self.access_token = str(uuid.uuid4())
+        self.refresh_token = str(uuid.uuid4())
+        self.username = username
+        self.expires_at = time.monotonic() + lifetime
+        self.refresh_count = refresh_count
+
+
+class FMCSimulator:
+    """
+        In memory FMC REST API server, see the module doc.
+        users maps username to password, None accepts any.
+        latency is the seconds every call takes, plus random 0 to jitter seconds and latency_per_item for each
+        object returned or posted.
+        rate_limit is the calls allowed per user per minute and max_concurrent the calls in progress at a time,
+        0 for no limit. Calls over the limit get 429 with Retry-After.
+        page_size is the limit of list when not given, max_page_size the max limit, bulk_limit the max objects
+        in a bulk POST and max_payload its max bytes.
+        With compress False responses are not gzipped, with accept_compressed False gzipped requests get 415.
+        stats counts the calls by method, the generatetoken and refreshtoken calls, and the 401 and 429 responses.
+    """
+    def __init__(self, host='127.0.0.1', port=0, users=None, token_lifetime=TOKEN_LIFETIME,
+                 max_refresh=TOKEN_MAX_REFRESH, rate_limit=RATE_LIMIT, max_concurrent=MAX_CONCURRENT,
+                 latency=0.0, jitter=0.0, latency_per_item=0.0, page_size=DEFAULT_PAGE_SIZE,
+                 max_page_size=MAX_PAGE_SIZE, bulk_limit=BULK_LIMIT, max_payload=MAX_PAYLOAD,
+                 compress=True, accept_compressed=True):
+        self.host = host
+        self.port = port
+        self.users = users
+        self.token_lifetime = token_lifetime
+        self.max_refresh = max_refresh
+        self.rate_limit = rate_limit
+        self.max_concurrent = max_concurrent
+        self.latency = latency
+        self.jitter = jitter
+        self.latency_per_item = latency_per_item
+        self.page_size = page_size
+        self.max_page_size = max_page_size
+        self.bulk_limit = bulk_limit
+        self.max_payload = max_payload
+        self.compress = compress
+        self.accept_compressed = accept_compressed
+        self.stats = {}
+        self._collections = {}
+        self._tokens = {}
+        self._calls = {}  # username -> deque of call times in the last minute
+        self._in_progress = 0
+        self._lock = threading.RLock()
+        self._server = None
+        self._thread = None
+
+    @property
+    def url(self):
+        return 'http://{}:{}'.format(self.host, self.port)
+
+    def _bind(self):
+        self._server = ThreadingHTTPServer((self.host, self.port), _SimulatorRequestHandler)
+        self._server.daemon_threads = True
+        self._server.simulator = self
+        # port 0 binds to a free port
+        self.port = self._server.server_address[1]
+        logger.info('FMC simulator listening on %s', self.url)
+
+    def start(self):
+        """ Starts serving in a background thread, returns the url """
+        self._bind()
+        self._thread = threading.Thread(target=self._server.serve_forever, name='fmc-simulator', daemon=True)
+        self._thread.start()
+        return self.url
+
+    def serve_forever(self):
+        self._bind()
+        try:
+            self._server.serve_forever()
+        finally:
+            self._server.server_close()
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    ######## Data ###########
+    @staticmethod
+    def _collection_path(path):
+        """ Accepts the collection as 'object/hosts' or an api path like Host().get_api_path() """
+        match = API_CONFIG_PATH.match(path)
+        return match.group(2) if match else path.strip('/')
+
+    def add_objects(self, path, objects):
+        """ Adds objects to a collection as if they were posted, returns them with id and metadata set """
+        collection = self._collection_path(path)
+        with self._lock:
+            return [self._store(collection, copy.deepcopy(obj)) for obj in objects]
+
+    def objects(self, path):
+        """ Objects of a collection """
+        with self._lock:
+            return list(self._collections.get(self._collection_path(path), {}).values())
+
+    def clear(self):
+        with self._lock:
+            self._collections.clear()
+
+    def expire_tokens(self):
+        """ Expires all the access tokens, the next calls get 401 """
+        with self._lock:
+            for token in self._tokens.values():
+                token.expires_at = 0
+
+    def _store(self, collection, obj, obj_id=None):
+        obj['id'] = obj_id or str(uuid.uuid4()).upper()
+        if 'type' not in obj:
+            obj['type'] = collection.rsplit('/', 1)[-1]
+        metadata = {'timestamp': int(time.time() * 1000), 'lastUser': {'name': 'admin'},
+                    'domain': dict(GLOBAL_DOMAIN), 'readOnly': {'state': False}}
+        parts = collection.split('/')
+        if len(parts) == 4 and parts[:2] == ['policy', 'accesspolicies'] and parts[3] == 'accessrules':
+            rules = self._collections.get(collection, {})
+            rule_index = rules[obj['id']]['metadata']['ruleIndex'] if obj['id'] in rules else len(rules) + 1
+            metadata.update({'accessPolicy': {'type': 'AccessPolicy', 'id': parts[2]}, 'ruleIndex': rule_index,
+                             'section': 'Default', 'category': '--Undefined--'})
+        obj['metadata'] = metadata
+        obj['links'] = {'self': '{}/api/fmc_config/v1/domain/{}/{}/{}'.format(self.url, GLOBAL_DOMAIN['id'],
+                                                                               collection, obj['id'])}
+        self._collections.setdefault(collection, {})[obj['id']] = obj
+        return obj
+
+    def _count(self, key):
+        with self._lock:
+            self.stats[key] = self.stats.get(key, 0) + 1
+
+    ######## Auth and quotas ###########
+    def _generate_token(self, authorization):
+        if not authorization or not authorization.startswith('Basic '):
+            return None
+        try:
+            username, password = base64.b64decode(authorization[6:]).decode('utf-8').split(':', 1)
+        except ValueError:
+            return None
+        if self.users is not None and self.users.get(username) != password:
+            return None
+        token = _Token(username, self.token_lifetime)
+        with self._lock:
+            self._tokens[token.access_token] = token
+        return token
+
+    def _refresh_token(self, access_token, refresh_token):
+        with self._lock:
+            old = self._tokens.get(access_token)
+            if old is None or old.refresh_token != refresh_token or old.refresh_count >= self.max_refresh:
+                return None
+            del self._tokens[access_token]
+            token = _Token(old.username, self.token_lifetime, old.refresh_count + 1)
+            self._tokens[token.access_token] = token
+            return token
+
+    def _check_token(self, access_token):
+        """ Returns the user of a valid token """
+        with self._lock:
+            token = self._tokens.get(access_token)
+            if token is None or token.expires_at <= time.monotonic():
+                return None
+            return token.username
+
+    def _acquire_quota(self, username):
+        """ Returns None if the call can go ahead, else the seconds after which it can be retried """
+        with self._lock:
+            now = time.monotonic()
+            if self.rate_limit:
+                calls = self._calls.setdefault(username, deque())
+                while calls and calls[0] <= now - 60:
+                    calls.popleft()
+                if len(calls) >= self.rate_limit:
+                    return max(1, math.ceil(calls[0] + 60 - now))
+            if self.max_concurrent and self._in_progress >= self.max_concurrent:
+                return 1
+            if self.rate_limit:
+                calls.append(now)
+            self._in_progress += 1
+            return None
+
+    def _release_quota(self):
+        with self._lock:
+            self._in_progress -= 1
+
+    def _delay(self, items=0):
+        delay = self.latency + items * self.latency_per_item
+        if self.jitter:
+            delay += random.uniform(0, self.jitter)
+        if delay > 0:
+            time.sleep(delay)
+
+    ######## API ###########
+    def handle(self, method, path, query, body):
+        """ Returns (status code, json response, headers) for an authorized call on an object path """
+        collection = path
+        obj_id = None
+        with self._lock:
+            parent, _, last = path.rpartition('/')
+            if parent and last in self._collections.get(parent, {}):
+                collection, obj_id = parent, last
+            items = self._collections.get(collection, {})
+            if obj_id is None:
+                if method == 'GET':
+                    return self._list(collection, items, query)
+                if method == 'POST':
+                    return self._create(collection, items, query, body)
+                return 404, _error('Object not found'), None
+            if method == 'GET':
+                return 200, copy.deepcopy(items[obj_id]), None
+            if method == 'PUT':
+                if not isinstance(body, dict):
+                    return 400, _error('Invalid request body'), None
+                obj = copy.deepcopy(body)
+                for key in ['metadata', 'links']:
+                    obj.pop(key, None)
+                obj.setdefault('name', items[obj_id].get('name'))
+                names = {other.get('name') for other in items.values() if other['id'] != obj_id}
+                error = self._validate_name(names, obj)
+                if error:
+                    return 400, _error(error), None
+                return 200, copy.deepcopy(self._store(collection, obj, obj_id)), None
+            if method == 'DELETE':
+                return 200, items.pop(obj_id), None
+            return 405, _error('Method not allowed'), None
+
+    def _list(self, collection, items, query):
+        offset = int(query.get('offset', ['0'])[0])
+        limit = min(int(query.get('limit', [str(self.page_size)])[0]), self.max_page_size)
+        expanded = query.get('expanded', ['false'])[0].lower() == 'true'
+        if not items:  # same as FMC
+            return 404, _error('No objects found'), None
+        values = list(items.values())
+        page = values[offset:offset + limit] if limit > 0 else []
+        if expanded:
+            page = copy.deepcopy(page)
+        else:
+            page = [{'id': obj['id'], 'type': obj['type'], 'name': obj.get('name'), 'links': obj['links']}
+                    for obj in page]
+        count = len(values)
+        paging = {'offset': offset, 'limit': limit, 'count': count,
+                  'pages': int(math.ceil(count / limit)) if limit > 0 else 0}
+        base = '{}/api/fmc_config/v1/domain/{}/{}?expanded={}&limit={}&offset='.format(
+            self.url, GLOBAL_DOMAIN['id'], collection, str(expanded).lower(), limit)
+        if offset + limit < count:
+            paging['next'] = [base + str(offset + limit)]
+        if offset > 0:
+            paging['previous'] = [base + str(max(0, offset - limit))]
+        response = {'links': {'self': base + str(offset)}, 'paging': paging}
+        if page:
+            response['items'] = page
+        return 200, response, None
+
+    @staticmethod
+    def _validate_name(names, obj):
+        """ names are the names already taken """
+        name = obj.get('name')
+        if not name or not OBJECT_NAME.match(name):
+            return 'Invalid Object Name: {}'.format(name)
+        if name in names:
+            return 'The object name {} already exists. Enter a new name.'.format(name)
+        return None
+
+    def _create(self, collection, items, query, body):
+        bulk = query.get('bulk', ['false'])[0].lower() == 'true'
+        if bulk and not isinstance(body, list):
+            return 400, _error('Bulk payload should be a list'), None
+        if not bulk and not isinstance(body, dict):
+            return 400, _error('Invalid request body, list payload needs bulk=true'), None
+        objects = body if bulk else [body]
+        if len(objects) > self.bulk_limit:
+            return 400, _error('Bulk operation supports at most {} objects'.format(self.bulk_limit)), None
+        names = {other.get('name') for other in items.values()}
+        for obj in objects:
+            if not isinstance(obj, dict):
+                return 400, _error('Invalid request body'), None
+            error = self._validate_name(names, obj)
+            if error:
+                return 400, _error(error), None
+            names.add(obj['name'])
+        created = []
+        for obj in objects:
+            obj = copy.deepcopy(obj)
+            obj.pop('id', None)
+            created.append(copy.deepcopy(self._store(collection, obj)))
+        if bulk:
+            return 201, {'items': created}, None
+        return 201, created[0], None
+
+
+class _SimulatorRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # headers and body are written separately, without this the delayed ACK of the client stalls each call
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        logger.debug('%s - ' + format, self.address_string(), *args)
+
+    def do_GET(self):
+        self._handle('GET')
+
+    def do_POST(self):
+        self._handle('POST')
+
+    def do_PUT(self):
+        self._handle('PUT')
+
+    def do_DELETE(self):
+        self._handle('DELETE')
+
+    def _send(self, status_code, response=None, headers=None):
+        simulator = self.server.simulator
+        body = json.dumps(response).encode('utf-8') if response is not None else b''
+        self.send_response(status_code)
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        if body and simulator.compress and 'gzip' in (self.headers.get('Accept-Encoding') or ''):
+            body = gzip.compress(body, 6)
+            self.send_header('Content-Encoding', 'gzip')
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_body(self):
+        """ Returns the body, or raises ValueError with the status code and message to reply with """
+        length = int(self.headers.get('Content-Length') or 0)
+        data = self.rfile.read(length) if length else b''
+        if self.headers.get('Content-Encoding') == 'gzip':
+            if not self.server.simulator.accept_compressed:
+                raise ValueError(415, 'Unsupported Content-Encoding')
+            data = gzip.decompress(data)
+        if len(data) > self.server.simulator.max_payload:
+            raise ValueError(413, 'Payload too large')
+        if not data:
+            return None
+        try:
+            return json.loads(data)
+        except ValueError:
+            raise ValueError(400, 'Invalid json')
+
+    def _handle(self, method):
+        simulator = self.server.simulator
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        simulator._count(method)
+        try:
+            body = self._read_body()
+        except ValueError as e:
+            return self._send(e.args[0], _error(e.args[1]))
+        if url.path == API_AUTH_PATH and method == 'POST':
+            simulator._count('generatetoken')
+            simulator._delay()
+            token = simulator._generate_token(self.headers.get('Authorization'))
+            if token is None:
+                return self._send(401, _error('Invalid username or password'))
+            return self._send(204, None, {'X-auth-access-token': token.access_token,
+                                          'X-auth-refresh-token': token.refresh_token,
+                                          'DOMAIN_UUID': GLOBAL_DOMAIN['id']})
+        if url.path == API_REFRESH_PATH and method == 'POST':
+            simulator._count('refreshtoken')
+            simulator._delay()
+            token = simulator._refresh_token(self.headers.get('X-auth-access-token'),
+                                             self.headers.get('X-auth-refresh-token'))
+            if token is None:
+                return self._send(401, _error('Invalid refresh token'))
+            return self._send(204, None, {'X-auth-access-token': token.access_token,
+                                          'X-auth-refresh-token': token.refresh_token,
+                                          'DOMAIN_UUID': GLOBAL_DOMAIN['id']})
+        match = API_CONFIG_PATH.match(url.path)
+        if not match:
+            return self._send(404, _error('Unknown path'))
+        username = simulator._check_token(self.headers.get('X-auth-access-token'))
+        if username is None:
+            simulator._count('401')
+            return self._send(401, _error('Access token invalid.'))
+        retry_after = simulator._acquire_quota(username)
+        if retry_after is not None:
+            simulator._count('429')
+            return self._send(429, {'reasonPhrase': 'Too Many Requests'}, {'Retry-After': str(retry_after)})
+        try:
+            status_code, response, headers = simulator.handle(method, match.group(2), query, body)
+            items = response.get('items', ()) if isinstance(response, dict) else ()
+            simulator._delay(len(items) if method == 'GET' else len(body) if isinstance(body, list) else 1)
+        finally:
+            simulator._release_quota()
+        self._send(status_code, response, headers)
+
+
+def _sample_hosts(count):
+    return [{'name': 'host-{}'.format(i), 'type': 'Host',
+             'value': '10.{}.{}.{}'.format(i >> 16 & 255, i >> 8 & 255, i & 255)} for i in range(count)]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Local stand-in for the FMC REST API')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--user', action='append', default=[], metavar='USERNAME:PASSWORD',
+                        help='allowed user, any user is allowed when not given')
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds each call takes')
+    parser.add_argument('--jitter', type=float, default=0.0, help='random extra seconds up to this for each call')
+    parser.add_argument('--latency-per-item', type=float, default=0.0,
+                        help='extra seconds for each object listed or posted')
+    parser.add_argument('--rate-limit', type=int, default=RATE_LIMIT, help='calls per minute per user, 0 for none')
+    parser.add_argument('--max-concurrent', type=int, default=MAX_CONCURRENT,
+                        help='calls in progress at a time, 0 for no limit')
+    parser.add_argument('--token-lifetime', type=int, default=TOKEN_LIFETIME, help='seconds')
+    parser.add_argument('--hosts', type=int, default=0, help='number of Host objects to start with')
+    parser.add_argument('--no-compress', action='store_true', help="don't gzip responses")
+    args = parser.parse_args(argv)
+    users = dict(user.split(':', 1) for user in args.user) if args.user else None
+    simulator = FMCSimulator(args.host, args.port, users=users, token_lifetime=args.token_lifetime,
+                             rate_limit=args.rate_limit, max_concurrent=args.max_concurrent, latency=args.latency,
+                             jitter=args.jitter, latency_per_item=args.latency_per_item,
+                             compress=not args.no_compress)
+    if args.hosts:
+        simulator.add_objects('object/hosts', _sample_hosts(args.hosts))
+    logging.basicConfig(level=logging.INFO)
+    try:
+        simulator.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
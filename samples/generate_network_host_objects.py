@@ -120,11 +120,13 @@ def create_range_objects(rest_client, nwObjCount, nwObjName, first_nwObjvalue, s
     
     if len(hosts) > 0:
         if rest_client:
-            try:           
-                rest_client.create(hosts)
-            except ResourceException as e:
-                if ResourceException.NAME_EXISTS == e.code:
-                    print('Object already exists in FMC\n')
+            result = rest_client.create(hosts, recover=True)
+            print('Created {} objects.'.format(len(result.created)))
+            if len(result.existing) > 0:
+                print('{} objects already exist in FMC\n'.format(len(result.existing)))
+            for failed in result.failed:
+                error = failed.error.message if isinstance(failed.error, ResourceException) else failed.error
+                print('Failed to create object {}: {}'.format(failed.resource.name, error))
 
 
 if __name__ == "__main__":
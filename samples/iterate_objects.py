@@ -8,6 +8,7 @@ from datetime import datetime
 
 from fmc_rest_client import FMCRestClient
 from fmc_rest_client import ResourceException
+from fmc_rest_client import ResourceCache
 from fmc_rest_client.resources import *
 
 logging.basicConfig(level=logging.DEBUG)
@@ -86,7 +87,8 @@ if __name__ == "__main__":
     username, password, auth_token, fmc_server_url, object_types, repeat = parse_args(sys.argv[1:])
     start_time = datetime.now().replace(microsecond=0)
     print('Connecting to FMC {} ...'.format(fmc_server_url))
-    rest_client = FMCRestClient(fmc_server_url, username, password, auth_token)
+    # objects loaded after listing them are served from the cache
+    rest_client = FMCRestClient(fmc_server_url, username, password, auth_token, cache=ResourceCache())
     end_time = datetime.now().replace(microsecond=0)
     print('Connected Successfully in {}s'.format(str(end_time - start_time)))
     start_time = datetime.now().replace(microsecond=0)
@@ -105,5 +107,6 @@ if __name__ == "__main__":
             print('Total {} objects of type {} iterated.'.format(count, type(obj_type).__name__))
     end_time = datetime.now().replace(microsecond=0)
     print('Script completed in {}s.'.format(str(end_time - start_time)))
+    print('Cache stats {}'.format(rest_client.cache.stats()))
 
 
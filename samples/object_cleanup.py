@@ -4,7 +4,7 @@ import getopt
 import sys
 from _datetime import datetime
 
-from fmc_rest_client import FMCRestClient
+from fmc_rest_client import FMCRestClient, JsonLinesWriter
 from fmc_rest_client.resources import *
 
 logging.basicConfig(level=logging.INFO)
@@ -91,11 +91,16 @@ def get_object_list(type_list):
     return obj_list
 
 
-def delete_objects(rest_client, obj_types, skip_read_only=False, obj_name_prefix=None):
+def delete_objects(rest_client, obj_types, dump_writer, skip_read_only=False, obj_name_prefix=None):
+    """
+    Deletes the objects, each one is written to dump_writer, a JsonLinesWriter, as it is deleted so that it can be
+    restored with restore_resources. Only the names of the deleted objects are kept for the report.
+    """
     failed_obj_dict = {}
     deleted_obj_list = []
     for obj_type in obj_types:
-        resource_iterator = rest_client.list_iterator(obj_type)
+        # lazy, as most objects are only checked for name
+        resource_iterator = rest_client.list_iterator(obj_type, lazy=True)
         print('Found total {} objects at this point: {}'.format(type(obj_type).__name__, str(resource_iterator.total)))
         print('Deleting objects of type {}'.format(type(obj_type).__name__), end='')
         if obj_name_prefix:
@@ -108,10 +113,11 @@ def delete_objects(rest_client, obj_types, skip_read_only=False, obj_name_prefix
                         #print (obj.__dict__)
                         print('\tSkipping delete for read only object {}'.format(resource.name))
                         continue
-                    print('\tDeleting {} object {}'.format(type(resource).__name__, resource.name), end='')
+                    print('\tDeleting {} object {}'.format(resource.type, resource.name), end='')
                     delete_object(resource)
                     print(' \t\tdone.')
-                    deleted_obj_list.append(resource)
+                    dump_writer.write(resource)
+                    deleted_obj_list.append(resource.name)
             except Exception as e:
                 failed_obj_dict[resource] = str(e)
     return failed_obj_dict, deleted_obj_list
@@ -121,7 +127,7 @@ def delete_object(resource):
     """
     Deletes an object, for interface group and security zone, it first unlink interfaces.
     """
-    if type(resource) == SecurityZone or type(resource) == InterfaceGroup:
+    if isinstance(resource, SecurityZone):  # InterfaceGroup too
         resource.interfaces = []
         rest_client.update(resource)
     rest_client.remove(resource)
@@ -140,23 +146,19 @@ def _write_to_file(text, fh,do_print=True):
 '''
     create report
 '''
-def write_report(report_filename, failed_obj_dict, deleted_obj_list, dump_deleted_obj=True):
-    deleted_dump = 'DeletedObjectsDump-{}.json'.format(datetime.now().strftime('%Y%m%d%H%M%S'))
-    with open(report_filename, 'w') as fh, open(deleted_dump,'w') as dh:
+def write_report(report_filename, failed_obj_dict, deleted_obj_list, deleted_dump=None):
+    with open(report_filename, 'w') as fh:
         if len(deleted_obj_list) > 0:
             write_line_to_file('-' * 120, fh)
             msg='Total number of deleted objects: '+str(len(deleted_obj_list))
             write_line_to_file(msg, fh)
+            if deleted_dump:
+                write_line_to_file('Deleted objects are saved in {}, restore them with restore_resources'.format(
+                    deleted_dump), fh)
             write_line_to_file('List of deleted object names:', fh)
             write_line_to_file('-' * 120, fh)
-            if dump_deleted_obj:
-                write_line_to_file('{\n\"items\": [', dh, do_print=False)
-            for obj in deleted_obj_list:
-                write_line_to_file('\t' + obj.name, fh)
-                if dump_deleted_obj:
-                    write_line_to_file(obj.json() + ',', dh,do_print=False)
-            if dump_deleted_obj:
-                write_line_to_file('\n]}', dh, do_print=False)
+            for name in deleted_obj_list:
+                write_line_to_file('\t' + name, fh)
             write_line_to_file('-' * 120, fh)
         if len(failed_obj_dict)>0:
             write_line_to_file('-' * 120, fh)
@@ -165,7 +167,7 @@ def write_report(report_filename, failed_obj_dict, deleted_obj_list, dump_delete
             write_line_to_file('Failed objects list:', fh)
             write_line_to_file('-' * 120, fh)
             for resource,reason in failed_obj_dict.items():
-                resource = '{}: {}'.format(type(resource).__name__, resource.name)
+                resource = '{}: {}'.format(resource.type, resource.name)
                 reason = '\tReason for failure: ' + reason
                 write_line_to_file(resource, fh)
                 write_line_to_file(reason, fh)
@@ -180,7 +182,9 @@ if __name__ == '__main__':
     rest_client = FMCRestClient(fmc_server_url, username, password)
     print('Connected Successfully')
     report_file = 'ObjectCleanupReport.txt'
-    result = delete_objects(rest_client, obj_types, skip_read_only, obj_name_prefix)
-    write_report(report_file, result[0], result[1])
+    deleted_dump = 'DeletedObjectsDump-{}.jsonl.gz'.format(datetime.now().strftime('%Y%m%d%H%M%S'))
+    with JsonLinesWriter(deleted_dump) as dump_writer:
+        result = delete_objects(rest_client, obj_types, dump_writer, skip_read_only, obj_name_prefix)
+    write_report(report_file, result[0], result[1], deleted_dump)
     end_time = datetime.now().replace(microsecond=0)
     print("Script completed in {}s.".format(str(end_time - start_time)))
@@ -51,11 +51,7 @@ def get_fmc_rest_client():
     return  rest_client
 
 def get_policy_by_name(policyName, policyType):
-    alist = rest_client.list(globals()[policyType]())
-    for policy in alist:
-        #print(policy.json())
-        if policyName == policy.name:
-            return policy
+    return rest_client.get_by_name(globals()[policyType](), policyName)
 
 """
     Parameters:
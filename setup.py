@@ -35,5 +35,9 @@ setup(
     install_requires=[
         'requests'
     ],
+    extras_require={
+        'async': ['aiohttp'],
+        'fast': ['orjson']
+    },
     include_package_data=True,
     zip_safe=False)
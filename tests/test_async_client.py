@@ -0,0 +1,90 @@
+import asyncio
+import pytest
+from fmc_rest_client import SnapshotStore
+from fmc_rest_client.core.async_clients import AsyncFMCRestClient
+from fmc_rest_client.resources import Host, NetworkGroup
+from fmc_rest_client.simulator import FMCSimulator
+
+
+def by_id(cls, id):
+    resource = cls()
+    resource.id = id
+    return resource
+
+
+def run(sim, work, **kwargs):
+    async def main():
+        async with AsyncFMCRestClient(sim.url, 'admin', 'admin', rate_limit=None, **kwargs) as fmc:
+            return await work(fmc)
+    return asyncio.run(main())
+
+
+def test_create_load_update_remove():
+    with FMCSimulator(rate_limit=0) as sim:
+        async def work(fmc):
+            host = await fmc.create(Host('host1', '10.0.0.1'))
+            assert host.id is not None
+            loaded = await fmc.load(by_id(Host, host.id))
+            assert (loaded.name, loaded.value) == ('host1', '10.0.0.1')
+            loaded.value = '10.0.0.2'
+            await fmc.update(loaded)
+            assert (await fmc.get_by_name(Host(), 'host1')).value == '10.0.0.2'
+            await fmc.remove(loaded)
+            assert await fmc.get_by_name(Host(), 'host1') is None
+            return host.id
+
+        host_id = run(sim, work)
+        assert sim.objects('object/hosts') == []
+        assert sim.stats['PUT'] == 1 and sim.stats['DELETE'] == 1
+        assert host_id
+
+
+def test_bulk_create_and_list_pages():
+    with FMCSimulator(rate_limit=0, max_page_size=7) as sim:
+        async def work(fmc):
+            created = await fmc.create([Host('host%d' % i, '10.0.0.1') for i in range(30)], bulk_limit=10)
+            listed = await fmc.list(Host())
+            streamed = [host.name async for host in fmc.list_iterator(Host(), stream=True)]
+            iterated = [host.name async for host in fmc.list_iterator(Host())]
+            return created, listed, streamed, iterated
+
+        created, listed, streamed, iterated = run(sim, work)
+        # chunks are posted concurrently, listed in the order the server created them
+        names = [host['name'] for host in sim.objects('object/hosts')]
+        assert sorted(host.name for host in created) == sorted('host%d' % i for i in range(30))
+        assert [host.name for host in listed] == names
+        assert streamed == names
+        assert iterated == names
+
+
+def test_snapshot_store_and_metrics():
+    with FMCSimulator(rate_limit=0) as sim, SnapshotStore(':memory:') as store:
+        sim.add_objects('object/hosts', [{'name': 'host%d' % i, 'type': 'Host', 'value': '10.0.0.1'}
+                                         for i in range(3)])
+
+        async def work(fmc):
+            await fmc.list(Host())
+            group = await fmc.create(NetworkGroup('group1'))
+            await fmc.remove((await fmc.list(Host()))[0])
+            return fmc, group
+
+        fmc, group = run(sim, work, snapshot_store=store)
+        assert sorted(host.name for host in store.list(Host())) == ['host1', 'host2']
+        assert store.load(by_id(NetworkGroup, group.id)).name == 'group1'
+        # list, create, list and remove
+        assert sum(stats['count'] for stats in fmc.metrics.snapshot().values()) == 4
+
+
+def test_too_many_requests_retried():
+    with FMCSimulator(rate_limit=0, max_concurrent=1, latency=0.2) as sim:
+        sim.add_objects('object/hosts', [{'name': 'host1', 'type': 'Host', 'value': '10.0.0.1'}])
+
+        async def work(fmc):
+            results = await asyncio.gather(fmc.list(Host()), fmc.list(Host()))
+            return fmc, results
+
+        fmc, results = run(sim, work)
+        assert [len(result) for result in results] == [1, 1]
+        assert sim.stats['429'] >= 1
+        events = fmc.metrics.snapshot()
+        assert sum(stats['retries'] for stats in events.values()) == sim.stats['429']
@@ -0,0 +1,103 @@
+import asyncio
+import threading
+import time
+from fmc_rest_client import FMCRestClient
+from fmc_rest_client.core.async_clients import AsyncFMCRestClient
+from fmc_rest_client.resources import Host
+from fmc_rest_client.simulator import FMCSimulator
+
+WORKERS = 20
+
+
+def simulator(**kwargs):
+    sim = FMCSimulator(rate_limit=0, **kwargs)
+    sim.start()
+    sim.add_objects('object/hosts', [{'name': 'host1', 'type': 'Host', 'value': '10.0.0.1'}])
+    return sim
+
+
+def test_concurrent_401s_refresh_once():
+    sim = simulator()
+    try:
+        fmc = FMCRestClient(sim.url, 'admin', 'admin', rate_limit=None, pool_maxsize=WORKERS)
+        sim.expire_tokens()
+        barrier = threading.Barrier(WORKERS)
+        errors = []
+
+        def work():
+            barrier.wait()
+            try:
+                assert len(fmc.list(Host())) == 1
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=work) for _ in range(WORKERS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert errors == []
+        assert sim.stats['refreshtoken'] == 1
+        assert sim.stats['generatetoken'] == 1
+        assert fmc.reauth_count == 1
+    finally:
+        sim.stop()
+
+
+def test_token_refreshed_before_expiry():
+    sim = simulator()
+    try:
+        fmc = FMCRestClient(sim.url, 'admin', 'admin', rate_limit=None)
+        fmc.token_expires_at = time.monotonic()
+        fmc.list(Host())
+        assert sim.stats['refreshtoken'] == 1
+        assert sim.stats.get('401', 0) == 0
+        assert fmc.token_refresh_count == 1
+    finally:
+        sim.stop()
+
+
+def test_fourth_renewal_generates_new_token():
+    sim = simulator()
+    try:
+        fmc = FMCRestClient(sim.url, 'admin', 'admin', rate_limit=None)
+        for _ in range(4):
+            sim.expire_tokens()
+            fmc.list(Host())
+        assert sim.stats['refreshtoken'] == 3
+        assert sim.stats['generatetoken'] == 2
+        assert fmc.token_refresh_count == 0
+    finally:
+        sim.stop()
+
+
+def test_refused_refresh_generates_new_token():
+    sim = simulator(max_refresh=0)
+    try:
+        fmc = FMCRestClient(sim.url, 'admin', 'admin', rate_limit=None)
+        sim.expire_tokens()
+        assert len(fmc.list(Host())) == 1
+        assert sim.stats['refreshtoken'] == 1
+        assert sim.stats['generatetoken'] == 2
+    finally:
+        sim.stop()
+
+
+def test_async_concurrent_401s_refresh_once():
+    sim = simulator()
+
+    async def main():
+        async with AsyncFMCRestClient(sim.url, 'admin', 'admin', rate_limit=None) as fmc:
+            sim.expire_tokens()
+            results = await asyncio.gather(*[fmc.list(Host()) for _ in range(WORKERS)])
+            assert [len(result) for result in results] == [1] * WORKERS
+            fmc.token_expires_at = time.monotonic()
+            await fmc.list(Host())
+            return fmc.reauth_count
+
+    try:
+        assert asyncio.run(main()) == 2
+        assert sim.stats['refreshtoken'] == 2
+        assert sim.stats['generatetoken'] == 1
+    finally:
+        sim.stop()
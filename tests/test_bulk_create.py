@@ -0,0 +1,68 @@
+import pytest
+import requests
+from fmc_rest_client import FMCRestClient, ResourceException
+from fmc_rest_client.resources import Host
+
+
+class ScriptedClient(FMCRestClient):
+    """ Client whose POSTs are answered by respond(payload) instead of FMC """
+    def __init__(self, respond):
+        super().__init__('https://fmc.invalid', auth_token='token', rate_limit=None)
+        self.respond = respond
+        self.post_count = 0
+
+    def post(self, url_path, data):
+        self.post_count += 1
+        return self.respond(data)
+
+
+def hosts(count):
+    return [Host('host' + str(i), '10.0.0.1') for i in range(count)]
+
+
+def test_server_error_fails_chunk_without_bisecting():
+    def respond(data):
+        raise ResourceException(ResourceException.GENERIC, 'Internal Server Error', status_code=500)
+
+    client = ScriptedClient(respond)
+    result = client.create(hosts(1000), recover=True)
+    assert client.post_count == 1
+    assert len(result.failed) == 1000
+    assert result.created == []
+
+
+def test_connection_error_fails_chunk_without_bisecting():
+    def respond(data):
+        raise requests.exceptions.ConnectionError('connection reset')
+
+    client = ScriptedClient(respond)
+    result = client.create(hosts(100), recover=True)
+    assert client.post_count == 1
+    assert len(result.failed) == 100
+
+
+def test_payload_error_bisects_to_bad_resource():
+    def respond(data):
+        if '"host3"' in data:
+            raise ResourceException(ResourceException.GENERIC, 'Invalid value', status_code=400)
+        return {'items': [{'id': str(i), 'name': 'h', 'type': 'Host'} for i in range(data.count('"Host"'))]}
+
+    client = ScriptedClient(respond)
+    result = client.create(hosts(8), recover=True)
+    assert [failed.resource.name for failed in result.failed] == ['host3']
+    assert len(result.created) == 7
+    assert client.post_count == 7
+
+
+def test_failed_chunk_stops_create_and_reports_created():
+    def respond(data):
+        if '"host250"' in data:
+            raise ResourceException(ResourceException.GENERIC, 'Internal Server Error', status_code=500)
+        return {'items': [{'id': str(i), 'name': 'h', 'type': 'Host'} for i in range(data.count('"Host"'))]}
+
+    client = ScriptedClient(respond)
+    with pytest.raises(ResourceException) as raised:
+        client.create(hosts(1000), bulk_limit=100, max_workers=1)
+    assert raised.value.status_code == 500
+    assert len(raised.value.created) == 200
+    assert client.post_count == 3
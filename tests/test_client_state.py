@@ -0,0 +1,42 @@
+import pytest
+from fmc_rest_client import FMCRestClient, ResourceException
+from fmc_rest_client.core.base_clients import REAUTH_RETRIES, REQUEST_RETRIES, RETRY_REAUTH, TOO_MANY_REQUESTS_WAIT
+from fmc_rest_client.core.metrics import CallEvent
+
+
+def retry(error, retries):
+    fmc = FMCRestClient('https://fmc.invalid', auth_token='token', rate_limit=None)
+    event = CallEvent('get', '/api')
+    return fmc._retry_after(error, event, retries), event
+
+
+def new_retries():
+    return {'reauth': REAUTH_RETRIES, 'request': REQUEST_RETRIES}
+
+
+def test_auth_failed_renews_token_until_retries_run_out():
+    retries = new_retries()
+    error = ResourceException(ResourceException.AUTH_FAILED)
+    for _ in range(REAUTH_RETRIES):
+        wait, event = retry(error, retries)
+        assert wait == RETRY_REAUTH
+        assert event.reauths == 1
+    with pytest.raises(ResourceException):
+        retry(error, retries)
+
+
+def test_too_many_requests_waits_retry_after():
+    retries = new_retries()
+    wait, event = retry(ResourceException(ResourceException.TOO_MANY_REQUESTS, retry_after=7), retries)
+    assert (wait, event.retries, retries['request']) == (7, 1, REQUEST_RETRIES - 1)
+    wait, event = retry(ResourceException(ResourceException.TOO_MANY_REQUESTS), retries)
+    assert wait == TOO_MANY_REQUESTS_WAIT
+    retries['request'] = 0
+    with pytest.raises(ResourceException):
+        retry(ResourceException(ResourceException.TOO_MANY_REQUESTS), retries)
+
+
+@pytest.mark.parametrize('error', [ResourceException(ResourceException.GENERIC, status_code=500), ValueError('bad')])
+def test_other_errors_raised(error):
+    with pytest.raises(type(error)):
+        retry(error, new_retries())
@@ -0,0 +1,59 @@
+from fmc_rest_client import FMCRestClient, export_resources, read_json_lines, restore_resources
+from fmc_rest_client.core.base_resources import ObjectResource
+from fmc_rest_client.resources import AccessPolicy, Host, NetworkGroup
+from fmc_rest_client.simulator import FMCSimulator
+
+
+def client(sim):
+    return FMCRestClient(sim.url, 'admin', 'admin', rate_limit=None)
+
+
+def fqdn_type():
+    """ FQDN has no resource class, listed through its path """
+    resource = ObjectResource(None)
+    resource.type = 'FQDN'
+    return resource
+
+
+def test_export_restore_round_trip(tmp_path):
+    path = str(tmp_path / 'objects.jsonl.gz')
+    with FMCSimulator(rate_limit=0) as source:
+        hosts = source.add_objects('object/hosts', [
+            {'name': 'host%d' % i, 'type': 'Host', 'value': '10.0.0.%d' % i, 'description': 'important',
+             'overridable': True} for i in range(5)])
+        source.add_objects('object/networkgroups', [
+            {'name': 'group1', 'type': 'NetworkGroup', 'description': 'web servers',
+             'objects': [{'type': 'Host', 'id': host['id'], 'name': host['name']} for host in hosts[3:]]}])
+        source.add_objects('object/fqdns', [{'name': 'fqdn1', 'type': 'FQDN', 'value': 'www.example.com',
+                                             'dnsResolution': 'IPV4_ONLY'}])
+        assert export_resources(client(source), [Host(), NetworkGroup(), fqdn_type()], path) == 7
+    assert all('id' in item for item in read_json_lines(path))
+
+    with FMCSimulator(rate_limit=0) as target:
+        target.add_objects('object/hosts', [{'name': 'host4', 'type': 'Host', 'value': '10.0.0.4'}])
+        result = restore_resources(client(target), path, bulk_limit=2)
+        assert (result.created, result.existing, result.failed) == (6, 1, [])
+
+        restored = {host['name']: host for host in target.objects('object/hosts')}
+        assert restored['host0']['description'] == 'important'
+        assert restored['host0']['overridable'] is True
+        group = target.objects('object/networkgroups')[0]
+        assert group['description'] == 'web servers'
+        assert [ref['id'] for ref in group['objects']] == [restored['host3']['id'], restored['host4']['id']]
+        fqdn = target.objects('object/fqdns')[0]
+        assert (fqdn['value'], fqdn['dnsResolution']) == ('www.example.com', 'IPV4_ONLY')
+
+
+def test_restore_contained_needs_container(tmp_path):
+    path = str(tmp_path / 'rules.jsonl')
+    with open(path, 'w') as f:
+        f.write('{"type": "AccessRule", "name": "rule1", "action": "ALLOW"}\n')
+    with FMCSimulator(rate_limit=0) as sim:
+        fmc = client(sim)
+        result = restore_resources(fmc, path)
+        assert (result.created, len(result.failed)) == (0, 1)
+        policy = fmc.create(AccessPolicy('policy1'))
+        result = restore_resources(fmc, path, container=policy)
+        assert result.created == 1
+        assert [rule['name'] for rule in sim.objects(policy.get_api_path() + '/' + policy.id + '/accessrules')] == \
+            ['rule1']
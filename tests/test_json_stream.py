@@ -0,0 +1,116 @@
+import json
+import pytest
+from fmc_rest_client import FMCRestClient
+from fmc_rest_client.core.base_clients import list_items
+from fmc_rest_client.core.json_stream import ItemsStreamParser
+from fmc_rest_client.resources import Host
+from fmc_rest_client.simulator import FMCSimulator
+
+ITEMS = [
+    {'id': '1', 'name': 'café 日本 \U0001f600', 'value': -12.5e3, 'flags': [True, False, None]},
+    {'id': '2', 'name': 'quote " and \\ backslash', 'count': 1234567890, 'nested': {'a': [1, [2, {}]]}},
+    {'id': '3', 'name': '', 'empty': [], 'value': 0},
+]
+PAGING = {'offset': 0, 'limit': 25, 'count': 3, 'pages': 1}
+
+
+def body(items_first=True):
+    links = '"links": {"self": "https://fmc/api?offset=0"}'
+    items = '"items": ' + json.dumps(ITEMS, ensure_ascii=False)
+    paging = '"paging": ' + json.dumps(PAGING)
+    parts = [items, links, paging] if items_first else [paging, links, items]
+    return ('{\n  ' + ',\n  '.join(parts) + '\n}').encode('utf-8')
+
+
+def parse(chunks):
+    parser = ItemsStreamParser()
+    items = []
+    for chunk in chunks:
+        items.extend(parser.feed(chunk))
+    items.extend(parser.close())
+    return items, parser.fields
+
+
+@pytest.mark.parametrize('items_first', [True, False])
+def test_every_split_point(items_first):
+    data = body(items_first)
+    for split in range(len(data) + 1):
+        items, fields = parse([data[:split], data[split:]])
+        assert items == ITEMS, split
+        assert fields['paging'] == PAGING, split
+        assert fields['links'] == {'self': 'https://fmc/api?offset=0'}
+
+
+def test_byte_at_a_time():
+    data = body()
+    items, fields = parse([data[i:i + 1] for i in range(len(data))])
+    assert items == ITEMS
+    assert fields['paging'] == PAGING
+
+
+def test_items_returned_as_completed():
+    data = body()
+    parser = ItemsStreamParser()
+    # up to the end of the first item
+    first_end = data.index(b'"2"')
+    assert parser.feed(data[:first_end]) == ITEMS[:1]
+    assert parser.feed(data[first_end:]) == ITEMS[1:]
+    assert parser.close() == []
+
+
+def test_number_split_at_chunk_end():
+    items, fields = parse([b'{"paging": {"count": 12', b'34}, "total": 5', b'6, "items": [7', b'8]}'])
+    assert items == [78]
+    assert fields == {'paging': {'count': 1234}, 'total': 56}
+
+
+def test_empty_body():
+    assert parse([b'{}']) == ([], {})
+    assert parse([b' { ', b' } ']) == ([], {})
+
+
+def test_empty_items():
+    assert parse([b'{"links": {}, "items": [', b']}']) == ([], {'links': {}})
+
+
+def test_truncated_input_raises():
+    data = body()
+    for end in range(len(data)):
+        with pytest.raises(ValueError):
+            parse([data[:end]])
+
+
+@pytest.mark.parametrize('data', [b'[]', b'{"items": [1 2]}', b'{"a" 1}', b'{"a": 1 "b": 2}', b'{"a": 1}}'])
+def test_invalid_input_raises(data):
+    with pytest.raises(ValueError):
+        parse([data])
+
+
+def hosts(count):
+    return [{'name': 'höst-日-%d' % i, 'type': 'Host', 'value': '10.0.%d.%d' % (i // 250, i % 250),
+             'description': '"quoted" \\ %d' % i} for i in range(count)]
+
+
+@pytest.mark.parametrize('compress', [True, False])
+def test_list_items_pages(compress):
+    with FMCSimulator(rate_limit=0, max_page_size=7, compress=compress) as sim:
+        expected = sim.add_objects('object/hosts', hosts(30))
+        fmc = FMCRestClient(sim.url, 'admin', 'admin', rate_limit=None)
+        items = list(list_items(fmc, Host()))
+        assert [item['id'] for item in items] == [host['id'] for host in expected]
+        assert items[5]['name'] == 'höst-日-5'
+        assert items[5]['description'] == '"quoted" \\ 5'
+
+        iterator = fmc.list_iterator(Host(), stream=True)
+        resources = list(iterator)
+        assert [host.name for host in resources] == [host['name'] for host in expected]
+        assert iterator.total == 30
+
+
+def test_list_items_empty():
+    with FMCSimulator(rate_limit=0) as sim:
+        fmc = FMCRestClient(sim.url, 'admin', 'admin', rate_limit=None)
+        assert list(list_items(fmc, Host())) == []
+        iterator = fmc.list_iterator(Host(), stream=True)
+        assert list(iterator) == []
+        assert iterator.total == 0
@@ -0,0 +1,73 @@
+import pytest
+from fmc_rest_client import FMCRestClient
+from fmc_rest_client.resources import Host
+from fmc_rest_client.simulator import FMCSimulator
+
+
+def hosts(start, count):
+    return [{'name': 'host%d' % i, 'type': 'Host', 'value': '10.0.0.1'} for i in range(start, start + count)]
+
+
+@pytest.fixture
+def sim():
+    with FMCSimulator(rate_limit=0, max_page_size=5, jitter=0.005) as sim:
+        yield sim
+
+
+def client(sim):
+    return FMCRestClient(sim.url, 'admin', 'admin', rate_limit=None)
+
+
+@pytest.mark.parametrize('prefetch', [0, 1, 3])
+def test_pages_in_order(sim, prefetch):
+    sim.add_objects('object/hosts', hosts(0, 48))
+    with client(sim).list_iterator(Host(), prefetch=prefetch) as iterator:
+        assert [host.name for host in iterator] == ['host%d' % i for i in range(48)]
+        assert iterator.total == 48
+
+
+@pytest.mark.parametrize('prefetch', [0, 2])
+def test_size_grows_while_iterating(sim, prefetch):
+    sim.add_objects('object/hosts', hosts(0, 30))
+    names = []
+    with client(sim).list_iterator(Host(), prefetch=prefetch) as iterator:
+        for host in iterator:
+            names.append(host.name)
+            # the pages prefetched by then have the old count, the next ones the new
+            if len(names) == 7:
+                sim.add_objects('object/hosts', hosts(30, 6))
+        assert iterator.total == 36
+    assert names == ['host%d' % i for i in range(36)]
+
+
+@pytest.mark.parametrize('prefetch', [0, 2])
+def test_size_shrinks_while_iterating(sim, prefetch):
+    sim.add_objects('object/hosts', hosts(0, 12))
+    names = []
+    with client(sim).list_iterator(Host(), prefetch=prefetch) as iterator:
+        for host in iterator:
+            names.append(host.name)
+            if len(names) == 3:
+                sim.clear()
+                sim.add_objects('object/hosts', hosts(0, 4))
+    # the rest of the first page, then the hosts left after offset 5
+    assert names == ['host%d' % i for i in range(5)]
+    assert iterator.total == 4
+
+
+def test_with_block_stops_prefetch(sim):
+    sim.add_objects('object/hosts', hosts(0, 40))
+    fmc = client(sim)
+    with fmc.list_iterator(Host(), prefetch=3) as iterator:
+        assert next(iterator).name == 'host0'
+        assert len(iterator._pending) == 3
+    assert iterator._executor is None
+    assert len(iterator._pending) == 0
+
+
+def test_close_stops_stream(sim):
+    sim.add_objects('object/hosts', hosts(0, 12))
+    with client(sim).list_iterator(Host(), stream=True) as iterator:
+        assert next(iterator).name == 'host0'
+    with pytest.raises(StopIteration):
+        next(iterator)
@@ -0,0 +1,59 @@
+import asyncio
+from fmc_rest_client import FMCRestClient
+from fmc_rest_client.core.async_clients import AsyncFMCRestClient
+from fmc_rest_client.core.base_clients import list_items
+from fmc_rest_client.resources import Host
+from fmc_rest_client.simulator import FMCSimulator
+
+
+def hosts(count):
+    return [{'name': 'host%d' % i, 'type': 'Host', 'value': '10.0.0.1'} for i in range(count)]
+
+
+def received(fmc):
+    return sum(stats['bytes_received'] for stats in fmc.metrics.snapshot().values())
+
+
+def test_streamed_pages_report_bytes_received():
+    with FMCSimulator(rate_limit=0, max_page_size=10) as sim:
+        sim.add_objects('object/hosts', hosts(25))
+        fmc = FMCRestClient(sim.url, 'admin', 'admin', rate_limit=None)
+        events = []
+        fmc.add_hook(events.append)
+        assert len(list(fmc.list_iterator(Host(), stream=True))) == 25
+        assert len(list(list_items(fmc, Host()))) == 25
+        assert len(fmc.list(Host(), stream=True)) == 25
+        assert len(events) == 9
+        assert all(event.bytes_received > 0 for event in events)
+        assert received(fmc) == fmc.transfer_stats.bytes_received
+
+
+def test_closed_stream_reports_bytes_read():
+    with FMCSimulator(rate_limit=0, max_page_size=10) as sim:
+        sim.add_objects('object/hosts', hosts(25))
+        fmc = FMCRestClient(sim.url, 'admin', 'admin', rate_limit=None)
+        events = []
+        fmc.add_hook(events.append)
+        with fmc.list_iterator(Host(), stream=True) as iterator:
+            next(iterator)
+        assert len(events) == 1
+        assert events[0].bytes_received is not None
+        assert received(fmc) == fmc.transfer_stats.bytes_received
+
+
+def test_async_streamed_pages_report_bytes_received():
+    with FMCSimulator(rate_limit=0, max_page_size=10) as sim:
+        sim.add_objects('object/hosts', hosts(25))
+
+        async def main():
+            async with AsyncFMCRestClient(sim.url, 'admin', 'admin', rate_limit=None) as fmc:
+                events = []
+                fmc.add_hook(events.append)
+                assert len([host async for host in fmc.list_iterator(Host(), stream=True)]) == 25
+                assert len(await fmc.list(Host(), stream=True)) == 25
+                return fmc, events
+
+        fmc, events = asyncio.run(main())
+        assert len(events) == 6
+        assert all(event.bytes_received > 0 for event in events)
+        assert received(fmc) == fmc.transfer_stats.bytes_received
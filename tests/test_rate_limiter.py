@@ -0,0 +1,33 @@
+import threading
+import pytest
+from fmc_rest_client import RateLimiter
+
+
+def test_burst_then_rate():
+    limiter = RateLimiter(rate=120, burst=2)
+    assert limiter.reserve() == 0.0
+    assert limiter.reserve() == 0.0
+    assert limiter.reserve() == pytest.approx(0.5, abs=0.01)
+
+
+def test_pause_waits_at_least_given_seconds():
+    limiter = RateLimiter(rate=120, burst=10)
+    limiter.pause(5)
+    assert 5.0 <= limiter.reserve() <= 5.6
+
+
+def test_concurrent_pauses_do_not_add_up():
+    limiter = RateLimiter(rate=120, burst=10)
+    threads = [threading.Thread(target=limiter.pause, args=(5,)) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert 5.0 <= limiter.reserve() <= 5.6
+
+
+def test_pause_keeps_longer_wait():
+    limiter = RateLimiter(rate=120, burst=1)
+    limiter.pause(10)
+    limiter.pause(2)
+    assert limiter.reserve() >= 10.0
@@ -0,0 +1,26 @@
+from fmc_rest_client.core.base_resources import AbstractResource, NamedResource, ObjectResource, PolicyResource
+from fmc_rest_client.core.base_resources import BaseReferenceResource, ContainedPolicyResource, _resource_types
+from fmc_rest_client.core.base_resources import get_resource_type, resource_from_json
+from fmc_rest_client.resources import *
+from fmc_rest_client.resources.compact import CompactHost
+from fmc_rest_client.resources.objects import ICMPPortObject, ObjectGroupResource
+
+
+def test_registry_has_no_abstract_bases():
+    abstract_bases = [AbstractResource, BaseReferenceResource, NamedResource, ObjectResource, PolicyResource,
+                      ContainedPolicyResource, ObjectGroupResource, Port, ICMPPortObject]
+    registered = set(_resource_types.values())
+    for cls in abstract_bases:
+        assert cls not in registered, cls.__name__
+        assert get_resource_type(cls.__name__) is None, cls.__name__
+
+
+def test_registry_has_concrete_types():
+    for cls in [Host, Network, Range, NetworkGroup, ProtocolPortObject, ICMPV4Object, AccessPolicy, AccessRule]:
+        assert get_resource_type(cls.__name__) is cls
+    assert get_resource_type('Host') is not CompactHost
+
+
+def test_abstract_type_json_stays_dict():
+    json = {'type': 'ObjectResource', 'id': '1', 'name': 'x'}
+    assert resource_from_json(json) is json
@@ -0,0 +1,48 @@
+from fmc_rest_client import FMCRestClient, SnapshotStore
+from fmc_rest_client.resources import Host
+from fmc_rest_client.simulator import FMCSimulator
+
+
+def stored_names(store):
+    return sorted(host.name for host in store.list(Host()))
+
+
+def hosts(count):
+    return [{'name': 'host%d' % i, 'type': 'Host', 'value': '10.0.0.%d' % i} for i in range(count)]
+
+
+def test_full_list_drops_removed_resources():
+    with FMCSimulator(rate_limit=0, max_page_size=2) as sim, SnapshotStore(':memory:') as store:
+        fmc = FMCRestClient(sim.url, 'admin', 'admin', rate_limit=None, snapshot_store=store)
+        sim.add_objects('object/hosts', hosts(5))
+        fmc.list(Host())
+        assert stored_names(store) == ['host0', 'host1', 'host2', 'host3', 'host4']
+
+        # removed by another client
+        sim.clear()
+        sim.add_objects('object/hosts', hosts(3))
+        fmc.list(Host(), limit=2)
+        assert store.load_by_name(Host(), 'host4') is not None
+        fmc.list(Host())
+        assert stored_names(store) == ['host0', 'host1', 'host2']
+        assert store.load_by_name(Host(), 'host4') is None
+
+        sim.clear()
+        list(fmc.list_iterator(Host()))
+        assert stored_names(store) == []
+
+
+def test_partial_iteration_keeps_stored_resources():
+    with FMCSimulator(rate_limit=0, max_page_size=2) as sim, SnapshotStore(':memory:') as store:
+        fmc = FMCRestClient(sim.url, 'admin', 'admin', rate_limit=None, snapshot_store=store)
+        sim.add_objects('object/hosts', hosts(4))
+        fmc.list(Host())
+        sim.clear()
+        sim.add_objects('object/hosts', hosts(2))
+        iterator = fmc.list_iterator(Host())
+        next(iterator)
+        iterator.close()
+        # the first page is stored, the old hosts stay as the list didn't complete
+        assert len(stored_names(store)) == 6
+        list(fmc.list_iterator(Host()))
+        assert stored_names(store) == ['host0', 'host1']
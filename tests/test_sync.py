@@ -0,0 +1,57 @@
+import itertools
+import pytest
+from fmc_rest_client import FMCRestClient, ResourceSync
+from fmc_rest_client.resources import Host
+from fmc_rest_client.simulator import FMCSimulator
+
+
+class FailingSync(ResourceSync):
+    """ ResourceSync whose listing fails after fail_after items when set """
+    fail_after = None
+
+    def _listed_items(self):
+        items = super()._listed_items()
+        if self.fail_after is None:
+            return items
+        return itertools.chain(itertools.islice(items, self.fail_after), self._fail())
+
+    @staticmethod
+    def _fail():
+        raise ConnectionError('connection dropped')
+        yield
+
+
+def test_failed_sync_keeps_previous_snapshot():
+    with FMCSimulator(rate_limit=0, page_size=4) as sim:
+        sim.add_objects('object/hosts', [{'name': 'host-%d' % i, 'type': 'Host', 'value': '10.0.0.%d' % i}
+                                         for i in range(20)])
+        fmc = FMCRestClient(sim.url, 'admin', 'admin', rate_limit=None)
+        sync = FailingSync(fmc, Host())
+        assert len(sync.sync().added) == 20
+
+        host = fmc.get_by_name(Host(), 'host-0')
+        host.value = '10.1.1.1'
+        fmc.update(host)
+        sync.fail_after = 5
+        with pytest.raises(ConnectionError):
+            sync.sync()
+        assert len(sync.versions) == 20
+
+        sync.fail_after = None
+        delta = sync.sync()
+        assert [resource.value for resource in delta.modified] == ['10.1.1.1']
+        assert (delta.added, delta.removed) == ([], [])
+
+
+def test_sync_reports_added_and_removed():
+    with FMCSimulator(rate_limit=0) as sim:
+        fmc = FMCRestClient(sim.url, 'admin', 'admin', rate_limit=None)
+        hosts = fmc.create([Host('host-%d' % i, '10.0.0.%d' % i) for i in range(3)])
+        sync = ResourceSync(fmc, Host())
+        sync.sync()
+        fmc.remove(hosts[0])
+        fmc.create(Host('host-9', '10.0.0.9'))
+        delta = sync.sync()
+        assert [resource.name for resource in delta.added] == ['host-9']
+        assert [resource.name for resource in delta.removed] == ['host-0']
+        assert not sync.sync()